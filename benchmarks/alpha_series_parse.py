@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Parse time of every Alpha series endpoint: the former
+    from_dict/astype/sort path against endpoints.series_frame, the
+    parser of Alpha.py and fct/alpha_fct.py. Payloads
+    are synthetic unless recorded json responses are given.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# alpha_vantage/endpoints.py loads as in the standalone Alpha.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'apys'))
+from alpha_vantage.endpoints import ENDPOINTS, series_frame
+
+
+# --------------------------------------------------
+def synthetic_payloads(rows:int = 5000) -> dict:
+    """{endpoint: {date: {'1. open': '12.3400', ...}}}, newest first"""
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end = '2024-05-01', periods = rows)[::-1].strftime('%Y-%m-%d')
+    payloads = {}
+    for name, (function, payload, columns, kind) in ENDPOINTS.items():
+        if kind != 'series':
+            continue
+        fields = [f'{i + 1}. {c}' for i, c in enumerate(columns or ['SMA'])]
+        payloads[name] = {
+            d: {f: f'{v:.4f}' for f, v in zip(fields, row)}
+            for d, row in zip(dates, rng.random((rows, len(fields))) * 100)
+        }
+    return payloads
+
+def recorded_payloads(paths:list) -> dict:
+    """Series of recorded json responses, by file name"""
+    payloads = {}
+    for path in paths:
+        with open(path) as json_file:
+            data = json.load(json_file)
+        key = next(k for k in data if k != 'Meta Data')
+        payloads[os.path.basename(path)] = data[key]
+    return payloads
+
+# --------------------------------------------------
+def from_dict(data:dict) -> pd.DataFrame:
+    """Parse path before the endpoint registry"""
+    df = pd.DataFrame.from_dict(data, orient = 'index')
+    df = df.astype('float')
+    df.index.name = 'date'
+    df = df.sort_values('date', ascending = True)
+    df.index = pd.to_datetime(df.index)
+    return df
+
+def benchmark(payloads:dict, repeat:int = 5) -> pd.DataFrame:
+    results = []
+    for name, data in payloads.items():
+        before, after = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            from_dict(data)
+            before.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            series_frame(data)
+            after.append(time.perf_counter() - start)
+        results.append((name, len(data), min(before), min(after)))
+    df = pd.DataFrame(results, columns = ['payload', 'rows', 'from_dict_s', 'series_frame_s'])
+    df['speedup'] = df['from_dict_s'] / df['series_frame_s']
+    return df
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Benchmark the Alpha series parser',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'payload',
+        metavar = 'payload',
+        nargs = '*',
+        type = str,
+        help = "Recorded json responses. Synthetic ones if none is given")
+
+    parser.add_argument(
+        '-r', '--rows',
+        metavar = 'rows',
+        default = 5000,
+        type = int,
+        help = "Rows of the synthetic payloads")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    args = get_args()
+    if args.payload:
+        payloads = recorded_payloads(args.payload)
+    else:
+        payloads = synthetic_payloads(args.rows)
+    print(benchmark(payloads))
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From the repository root
+    # python benchmarks/alpha_series_parse.py
+    # python benchmarks/alpha_series_parse.py aapl_daily_full.json
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Flattening time of a recorded financials_reported payload:
+    the former per filing frames against Finnhub._flatten_financials.
+    The payload can be recorded first with --record and a token.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Finnhub.py is a standalone module next to Exceptions.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'apys'))
+from Finnhub import Finnhub
+
+
+# --------------------------------------------------
+def record_payload(path:str, symbol:str, token:str, freq:str = 'quarterly'):
+    """Save the raw /stock/financials-reported response of symbol"""
+    with Finnhub(api_key = token) as client:
+        data = client.financials_reported(
+            symbol = symbol, freq = freq, subset = None, output_df = False)
+    with open(path, 'w') as json_file:
+        json.dump(data, json_file)
+
+def load_payload(path:str) -> list:
+    """Filings of a recorded response (or of its "data" list)"""
+    with open(path) as json_file:
+        payload = json.load(json_file)
+    if isinstance(payload, dict):
+        payload = payload['data']
+    return payload
+
+# --------------------------------------------------
+def per_filing_frames(payload:list) -> pd.DataFrame:
+    """financials_reported flattening before _flatten_financials"""
+    df = []
+    for i in payload:
+        data_filter = {k: i[k] for k in list(i)[:-1]}
+        reports = {}
+        for k in i['report']:
+            reports[k] = pd.DataFrame(i['report'][k]).set_index(['label'])
+        reports = pd.concat(reports)
+        df.append(reports.join(pd.DataFrame(
+            data_filter, index=reports.index
+        )))
+    df = pd.concat(df).reset_index()
+    df.rename({'level_0': 'fs'}, axis=1, inplace=True)
+    df.set_index(['symbol', 'year', 'quarter', 'fs', 'label'], inplace=True)
+    return df
+
+def benchmark(payload:list, repeat:int = 5) -> pd.DataFrame:
+    results = []
+    for name, func in [
+            ('per_filing_frames', per_filing_frames),
+            ('flatten_financials', Finnhub._flatten_financials)]:
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            df = func(payload)
+            seconds.append(time.perf_counter() - start)
+        results.append((name, len(df), min(seconds),
+                        df.memory_usage(deep = True).sum() / 2**20))
+    return pd.DataFrame(
+        results, columns = ['flatten', 'rows', 'seconds', 'mib']).set_index('flatten')
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Benchmark the Finnhub financials_reported flattening',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'payload',
+        metavar = 'payload',
+        type = str,
+        help = "Recorded json response of /stock/financials-reported")
+
+    parser.add_argument(
+        '--record',
+        metavar = 'symbol',
+        default = None,
+        type = str,
+        help = "Download the financials of symbol into payload first")
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type = str,
+        help = "Finnhub token, needed by --record")
+
+    parser.add_argument(
+        '-r', '--repeat',
+        metavar = 'repeat',
+        default = 5,
+        type = int,
+        help = "Runs of each implementation, the fastest is kept")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    args = get_args()
+    if args.record != None:
+        if args.password == '':
+            sys.exit('--record needs the Finnhub token (-p)')
+        record_payload(args.payload, args.record, args.password)
+    elif not os.path.isfile(args.payload):
+        sys.exit(f'{args.payload} does not exist, record it with --record')
+    print(benchmark(load_payload(args.payload), args.repeat))
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From the repository root
+    # python benchmarks/finnhub_financials.py aapl_financials.json --record AAPL -p <token>
+    # python benchmarks/finnhub_financials.py aapl_financials.json
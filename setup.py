@@ -12,11 +12,14 @@ setup(
         'datar-numpy',
         'datar-pandas',
         'pandas',
+        'pyarrow',
         'numpy',
         'pyhomebroker',
         'requests',
         'SQLAlchemy>=1,<2',
         'urllib3',
         'pyRofex',
+        'websocket-client',
+        'websockets',
     ]
 )
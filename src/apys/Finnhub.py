@@ -1,17 +1,36 @@
 # %%
 import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import requests
 import pandas as pd
 from datetime import datetime as dt
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from Exceptions import APIException
 from Exceptions import APIRequestException
 
+# Seconds per bar of every candle resolution
+RESOLUTION_SECONDS = {
+    "1": 60, "5": 300, "15": 900, "30": 1800, "60": 3600,
+    "D": 86400, "W": 7 * 86400, "M": 31 * 86400,
+}
+# Intraday and daily bars only exist while the exchange is open:
+# 6.5 hours a session, 5 sessions a week and ~10 holidays a year
+SESSION_SECONDS = 6.5 * 3600
+
 
 class Finnhub:
     data = None
     API_URL = "https://finnhub.io/api/v1"
     DEFAULT_TIMEOUT = 10
+    # Longer ranges come back truncated, so they are split in
+    # windows of at most MAX_POINTS bars fetched by MAX_WORKERS threads
+    MAX_POINTS = 5000
+    MAX_WORKERS = 4
 
     def __init__(self, api_key, proxies = None):
         self._session = self._init_session(api_key, proxies)
@@ -20,6 +39,13 @@ class Finnhub:
     def _init_session(api_key, proxies):
         session = requests.session()
         session.params["token"] = api_key
+        # Over the quota (429) wait what Retry-After says and try again.
+        # Out of retries the last response is returned (APIException)
+        adapter = HTTPAdapter(pool_connections = 4, pool_maxsize = 8,
+            max_retries = Retry(total = 5, backoff_factor = 1,
+            status_forcelist = [429, 500, 502, 503, 504],
+            raise_on_status = False))
+        session.mount("https://", adapter)
         if proxies is not None:
             session.proxies.update(proxies)
         return session
@@ -64,6 +90,114 @@ class Finnhub:
     def _get(self, path = None, **kwargs):
         return self._request("get", path, **kwargs)
 
+    @staticmethod
+    def _warmup_seconds(resolution, warmup):
+        # Calendar seconds holding warmup bars of exchange sessions:
+        # nights, weekends and holidays have no bars
+        seconds = RESOLUTION_SECONDS[str(resolution)]
+        if seconds > 86400:
+            return warmup * seconds
+        sessions = math.ceil(warmup * seconds / SESSION_SECONDS) if seconds < 86400 else warmup
+        return (math.ceil(sessions * 7 / 5 * 1.05) + 3) * 86400 if sessions else 0
+
+    def _windows(self, from_ts, to_ts, resolution, warmup = 0):
+        # Consecutive windows share their edge bar, dropped on merge.
+        # warmup bars are asked again before every window but the first
+        if not 0 <= warmup < self.MAX_POINTS:
+            raise ValueError("warmup must be between 0 and {} bars, got {}".format(
+            self.MAX_POINTS - 1, warmup))
+        step = (self.MAX_POINTS - warmup) * RESOLUTION_SECONDS[str(resolution)]
+        margin = self._warmup_seconds(resolution, warmup)
+        edges = list(range(int(from_ts), int(to_ts), step)) + [int(to_ts)]
+        return [
+            (max(start - margin, int(from_ts)) if i else start, end)
+            for i, (start, end) in enumerate(zip(edges[:-1], edges[1:]))
+        ] or [(int(from_ts), int(to_ts))]
+
+    @staticmethod
+    def _merge(parts):
+        # Concatenate the arrays of every window, keep the first bar
+        # of each timestamp and sort by it
+        parts = [p for p in parts if p.get("s") == "ok" and p.get("t")]
+        if not parts:
+            return {"s": "no_data"}
+        t = np.concatenate([np.asarray(p["t"], dtype = "int64") for p in parts])
+        t, first = np.unique(t, return_index = True)
+        size = len(parts[0]["t"])
+        merged = {}
+        for key, value in parts[0].items():
+            if isinstance(value, list) and len(value) == size:
+                merged[key] = np.concatenate(
+                    [np.asarray(p[key]) for p in parts])[first].tolist()
+            else:
+                merged[key] = value
+        return merged
+
+    def _get_range(self, path, params, warmup = 0):
+        windows = self._windows(params["from"], params["to"],
+        params["resolution"], warmup)
+        if len(windows) == 1:
+            return self._get(path, params=params)
+        def fetch(window):
+            return self._get(path, params={**params,
+            "from": window[0], "to": window[1]})
+        with ThreadPoolExecutor(max_workers = self.MAX_WORKERS) as executor:
+            parts = list(executor.map(fetch, windows))
+        return self._merge(parts)
+
+    @staticmethod
+    def _candles_frame(data):
+        if data.get("s") != "ok":
+            return pd.DataFrame(columns = ["close", "high", "low", "open",
+            "status", "volume"], index = pd.DatetimeIndex([], name = "date"))
+        df = pd.DataFrame({
+            "close": np.asarray(data["c"], dtype = "float64"),
+            "high": np.asarray(data["h"], dtype = "float64"),
+            "low": np.asarray(data["l"], dtype = "float64"),
+            "open": np.asarray(data["o"], dtype = "float64"),
+            "status": data["s"],
+            "date": pd.to_datetime(np.asarray(data["t"], dtype = "int64"), unit='s'),
+            "volume": np.asarray(data["v"], dtype = "float64"),
+        })
+        df.set_index("date", drop=True, inplace=True)
+        return df
+
+    @staticmethod
+    def _repeat(values, counts):
+        values = pd.Series(values)
+        if values.dtype == object:
+            values = values.astype("category")
+        return values.iloc[np.repeat(np.arange(len(values)), counts)].values
+
+    @staticmethod
+    def _flatten_financials(data):
+        # One pass over filings, sections and items filling plain
+        # lists; the filing fields are repeated once per filing
+        # and the frame is built a single time
+        fs, label, concept, unit, value, counts = [], [], [], [], [], []
+        for filing in data:
+            n = len(label)
+            for section, items in filing["report"].items():
+                for item in items:
+                    label.append(item.get("label"))
+                    concept.append(item.get("concept"))
+                    unit.append(item.get("unit"))
+                    value.append(item.get("value"))
+                fs.extend([section] * (len(label) - len(fs)))
+            counts.append(len(label) - n)
+        meta = [k for k in (data[0] if data else {}) if k != "report"]
+        df = pd.DataFrame({
+            "fs": pd.Categorical(fs), "label": label,
+            "concept": concept, "unit": pd.Categorical(unit),
+            "value": pd.to_numeric(pd.Series(value, dtype = object),
+            errors = "ignore"),
+            **{k: Finnhub._repeat([f.get(k) for f in data], counts)
+            for k in meta},
+        })
+        df.set_index(["symbol", "year", "quarter",
+        "fs", "label"], inplace=True)
+        return df
+
     @property
     def api_key(self):
         return self._session.params.get("token")
@@ -223,21 +357,7 @@ class Finnhub:
             data = data[subset]
 
         if output_df == True:
-            df = []
-            for i in data:
-                data_filter = {k: i[k] for k in list(i)[:-1]}
-                reports = {}
-                for k in i["report"]:
-                    reports[k] = pd.DataFrame(i["report"][k]).set_index(["label"])
-                reports = pd.concat(reports)
-                df.append(reports.join(pd.DataFrame(
-                    data_filter, index=reports.index
-                )))
-            df = pd.concat(df).reset_index()
-            df.rename({'level_0': 'fs'}, axis=1, inplace=True)
-            df.set_index(["symbol", "year", "quarter", 
-            "fs", "label"], inplace=True)
-            self.data = df
+            self.data = self._flatten_financials(data)
         else:
             self.data = data
         return self.data
@@ -360,16 +480,10 @@ class Finnhub:
         params = {"symbol":symbol, "resolution":resolution,
                 "from":int(from_date), "to":int(to_date),
                 "adjusted":adj}
-        data = self._get("/stock/candle", 
-        params=params)
+        data = self._get_range("/stock/candle", params)
 
         if output_df == True:
-            df = pd.DataFrame(data)
-            df.columns = ["close","high", "low", "open", 
-            "status", "date", "volume"]
-            df.date = pd.to_datetime(df.date, unit='s')
-            df.set_index("date", drop=True, inplace=True)
-            self.data = df
+            self.data = self._candles_frame(data)
         else:
             self.data = data
         return self.data
@@ -456,16 +570,10 @@ class Finnhub:
         to_date = dt.timestamp(dt.strptime(to_date, '%Y-%m-%d'))
         params = {"symbol":symbol, "resolution":resolution,
                 "from":int(from_date), "to":int(to_date)}
-        data = self._get("/crypto/candle",
-        params=params)
+        data = self._get_range("/crypto/candle", params)
 
         if output_df == True:
-            df = pd.DataFrame(data)
-            df.columns = ["close","high", "low", "open", 
-            "status", "date", "volume"]
-            df.date = pd.to_datetime(df.date, unit='s')
-            df.set_index("date", drop=True, inplace=True)
-            self.data = df
+            self.data = self._candles_frame(data)
         else:
             self.data = data
         return self.data
@@ -492,13 +600,15 @@ class Finnhub:
 
     def technical_indicator(self, symbol, from_date, to_date, 
     indicator, resolution = "D", subset = None, 
-    output_df = True, **indicator_fields):
+    output_df = True, warmup = 200, **indicator_fields):
+        #warmup = bars (of exchange sessions) asked again before
+        # every window of a long range so the indicator starts settled
         from_date = dt.timestamp(dt.strptime(from_date, '%Y-%m-%d'))
         to_date = dt.timestamp(dt.strptime(to_date, '%Y-%m-%d'))
         params = {"symbol":symbol, "resolution":resolution,
                 "from":int(from_date), "to":int(to_date),
                 "indicator":indicator, **indicator_fields}
-        data = self._get("/indicator", params=params)
+        data = self._get_range("/indicator", params, warmup)
 
         if subset != None:
             data = data[subset]
@@ -15,9 +15,12 @@ import os
 import sys
 from dataclasses import dataclass, field
 
+import pandas as pd
 import requests
 
 from ..general_requests import APIRequests
+from ..utils.rate_limiter import RateLimiter
+from .csv_series import parse_csv_series
 
 
 # --------------------------------------------------
@@ -27,8 +30,13 @@ class AlphaVantage(APIRequests):
     API_URL = "https://www.alphavantage.co/query"
     DEFAULT_TIMEOUT = 10
 
-    def __init__(self, api_key, proxies = None):
+    def __init__(self, api_key, proxies = None, limiter:RateLimiter = None,
+                 max_wait:float = 60):
         self._session = self._init_session(api_key, proxies)
+        # Every request waits for a slot of the limiter, if any, but
+        # never more than max_wait seconds
+        self.limiter = limiter
+        self.max_wait = max_wait
 
     @staticmethod
     def _init_session(api_key, proxies):
@@ -52,6 +60,10 @@ class AlphaVantage(APIRequests):
         kwargs["timeout"] = kwargs.get("timeout", self.DEFAULT_TIMEOUT)
         kwargs["params"] = self._format_params(kwargs.get("params", {}))
 
+        if self.limiter is not None and not self.limiter.acquire(self.max_wait):
+            raise APIRequestException(
+                'Quota used, next request in {:.0f} minutes'.format(
+                    self.limiter.delay() / 60))
         response = getattr(self._session, method)(uri, **kwargs)
         return self._handle_response(response)
         #return response.json()[subset]
@@ -63,7 +75,8 @@ class AlphaVantage(APIRequests):
             content_type = response.headers.get('Content-Type', '')
             if 'application/json' in content_type:
                 return response.json()
-            if 'text/csv' in content_type:
+            if 'text/csv' in content_type or 'application/x-download' in content_type:
+                # datatype=csv, sent as a download attachment
                 return response.text
             if 'text/plain' in content_type:
                 return response.text
@@ -90,6 +103,21 @@ class AlphaVantage(APIRequests):
     def get_generic(self, endpoint = "", **params):
         return self._get(endpoint, params=params)
 
+# --------------------------------------------------
+def read_csv_series(data:str, columns:list = None) -> pd.DataFrame:
+    """
+    csv_series.parse_csv_series, with the json errors and quota notes
+    AlphaVantage sends instead of the csv, and any text that isn't a
+    csv series, raised as APIRequestException
+    """
+    if isinstance(data, dict):
+        raise APIRequestException(
+            data.get('Error Message') or data.get('Note') or data.get('Information') or data)
+    try:
+        return parse_csv_series(data, columns)
+    except ValueError as e:
+        raise APIRequestException(str(e)) from e
+
 # --------------------------------------------------
 class APIException(Exception):
     def __init__(self, response):
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Download quotes or daily history of many symbols from
+    AlphaVantage within the free tier quota (5 per minute, 25 per day).
+    Responses are requested as csv and written to disk untouched; a
+    progress file lets an interrupted or quota limited run resume
+    where it stopped.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from ..utils.pydyverse import PrintTibble
+from ..utils.rate_limiter import ALPHA_VANTAGE_FREE, RateLimiter
+from ..utils.schema import apply_schema
+from .alpha_vantage_login import AlphaVantage
+
+QUOTE_COLUMNS = {
+    'symbol': 'symbol', 'open': 'open', 'high': 'high', 'low': 'low',
+    'price': 'close', 'volume': 'volume', 'latestDay': 'date',
+    'previousClose': 'previous_close', 'change': 'change',
+    'changePercent': 'percent_change',
+}
+_TEXT_COLUMNS = ['symbol', 'latestDay', 'changePercent', 'timestamp']
+
+
+# --------------------------------------------------
+def default_limiter() -> RateLimiter:
+    """Free tier limiter shared by every script through rate_limit.sqlite"""
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    return RateLimiter(ALPHA_VANTAGE_FREE, state_path=dir_path + '/rate_limit.sqlite')
+
+def quota_get(alpha:AlphaVantage, limiter:RateLimiter, params:dict,
+              max_wait:float):
+    """
+    alpha._get within the quota of limiter. None (and no request) when
+    the next slot is more than max_wait seconds away.
+    """
+    if alpha.limiter is None:
+        if not limiter.acquire(max_wait):
+            return None
+    elif alpha.limiter.delay() > max_wait:
+        return None
+    # A client with its own limiter waits for it inside _get
+    return alpha._get("", params=params)
+
+# --------------------------------------------------
+@dataclass
+class BulkDownload():
+    """
+    :param function: GLOBAL_QUOTE or a TIME_SERIES_* function
+    :param out_dir: one csv per symbol plus progress.json. Defaults to
+    bulk/<function> next to this module.
+    :param max_wait: stop (to resume later) instead of waiting longer
+    than these seconds for the next slot of the quota
+    The quota is the limiter of alpha if it has one, else the free tier
+    one of default_limiter(). alpha itself is not modified.
+    """
+    alpha: AlphaVantage
+    symbols: list
+    function: str = 'GLOBAL_QUOTE'
+    size: str = 'compact'
+    out_dir: str = None
+    max_wait: float = 120
+    progress: dict = field(init=False, repr=False)
+    df: pd.DataFrame = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.out_dir == None:
+            dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+            self.out_dir = os.path.join(dir_path, 'bulk', self.function.lower())
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._limiter = self.alpha.limiter or default_limiter()
+        self.load_progress()
+
+    # --------------------------------------------------
+    @property
+    def progress_path(self) -> str:
+        return os.path.join(self.out_dir, 'progress.json')
+
+    def csv_path(self, symbol:str) -> str:
+        return os.path.join(self.out_dir, re.sub(r'[^\w.-]', '_', symbol) + '.csv')
+
+    def load_progress(self) -> dict:
+        self.progress = {'done': [], 'failed': {}}
+        if os.path.isfile(self.progress_path):
+            with open(self.progress_path) as json_file:
+                self.progress = json.load(json_file)
+        return self.progress
+
+    def save_progress(self):
+        tmp_path = self.progress_path + '.tmp'
+        with open(tmp_path, 'w') as json_file:
+            json.dump(self.progress, json_file)
+        os.replace(tmp_path, self.progress_path)
+
+    def pending(self) -> list:
+        done = set(self.progress['done']) | set(self.progress['failed'])
+        return [s for s in dict.fromkeys(self.symbols) if s not in done]
+
+    # --------------------------------------------------
+    def run(self) -> list:
+        """
+        Download pending symbols while the quota allows it.
+        Returns the symbols still pending.
+        """
+        for symbol in self.pending():
+            params = {'function': self.function, 'symbol': symbol, 'datatype': 'csv'}
+            if self.function != 'GLOBAL_QUOTE':
+                params['outputsize'] = self.size
+            data = quota_get(self.alpha, self._limiter, params, self.max_wait)
+            if data is None:
+                print(f'Quota used, {self._limiter.delay() / 60:.0f} minutes until '
+                      'the next request. Run again to resume.')
+                break
+            if isinstance(data, dict):
+                # Errors and quota notes come as json even for csv
+                if 'Error Message' in data:
+                    self.progress['failed'][symbol] = data['Error Message']
+                    self.save_progress()
+                    continue
+                print(f"AlphaVantage refused the request: {data.get('Note') or data.get('Information')}")
+                break
+            with open(self.csv_path(symbol), 'w') as csv_file:
+                csv_file.write(data)
+            self.progress['done'].append(symbol)
+            self.save_progress()
+        return self.pending()
+
+    # --------------------------------------------------
+    def to_dataframe(self) -> pd.DataFrame:
+        """One frame with every symbol downloaded so far"""
+        df_list = []
+        for symbol in self.progress['done']:
+            if symbol not in self.symbols:
+                continue
+            df = pd.read_csv(self.csv_path(symbol))
+            numeric = [c for c in df.columns if c not in _TEXT_COLUMNS]
+            df[numeric] = df[numeric].astype('float64')
+            if self.function == 'GLOBAL_QUOTE':
+                df = df.rename(columns=QUOTE_COLUMNS)
+                df['percent_change'] = df['percent_change'].str.rstrip('%').astype(float)
+            else:
+                df = df.rename(columns={'timestamp': 'date'})
+                df.insert(0, 'symbol', symbol)
+            df['date'] = pd.to_datetime(df['date'])
+            df_list.append(df)
+        if not df_list:
+            self.df = pd.DataFrame()
+        else:
+            self.df = apply_schema(pd.concat(df_list, ignore_index=True))
+        return self.df
+
+    def print_tibble(self):
+        print(PrintTibble(self.df))
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Download many symbols from AlphaVantage within the quota',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'symbol',
+        metavar = 'Symbol',
+        nargs='*',
+        default = None,
+        type=str,
+        help = "List of symbols to look up")
+
+    parser.add_argument(
+        '-f', '--function',
+        metavar = 'function',
+        default = 'GLOBAL_QUOTE',
+        type=str,
+        help = "GLOBAL_QUOTE or TIME_SERIES_DAILY, TIME_SERIES_WEEKLY, ...")
+
+    parser.add_argument(
+        '-s', '--size',
+        metavar = 'size',
+        default = 'compact',
+        type=str,
+        help = "compact or full history")
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type=str,
+        help = "Password to log in ALphaVantage")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    json_path = dir_path + '/credentials.json'
+    if args.password != '':
+        alpha = AlphaVantage(api_key = args.password)
+    else:
+        if os.path.isfile(json_path):
+            with open(json_path) as json_file:
+                data_json = json.load(json_file)
+                alpha = AlphaVantage(
+                    api_key = data_json['password'],
+                )
+            json_file.close()
+        else:
+            msg = (
+                f'If {json_path} with username and password ' +
+                'as keys does not exist in the directory, ' +
+                'both arguments must be given.'
+            )
+            sys.exit(msg)
+
+    bulk = BulkDownload(
+        alpha = alpha,
+        symbols = args.symbol,
+        function = args.function,
+        size = args.size,
+    )
+    pending = bulk.run()
+    bulk.to_dataframe()
+    bulk.print_tibble()
+    if pending:
+        print(f'{len(pending)} symbols pending: {pending}')
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.alpha_vantage.bulk_download AAPL MSFT KO
+    # python -m apys.alpha_vantage.bulk_download AAPL MSFT -f TIME_SERIES_DAILY -s full
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Cross rates of N currencies (physical or crypto) from N
+    CURRENCY_EXCHANGE_RATE requests instead of N². Only the legs
+    against USD are requested (and kept for a short TTL); every other
+    pair is triangulated locally, bid and ask included.
+"""
+
+import argparse
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from ..utils.pydyverse import PrintTibble
+from .alpha_vantage_login import AlphaVantage, APIRequestException
+from .bulk_download import default_limiter
+
+_PAYLOAD_KEY = 'Realtime Currency Exchange Rate'
+
+
+# --------------------------------------------------
+class CrossRates():
+    """
+    :param client: AlphaVantage (or the standalone Alpha), anything
+    with _get("", params=...)
+    :param ttl: seconds a USD leg is reused before asking again
+    """
+
+    def __init__(self, client, base:str = 'USD', ttl:float = 60,
+                 max_workers:int = 4, clock = time.monotonic):
+        self.client = client
+        self.base = base.upper()
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.clock = clock
+        self._legs = {}
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    def _fetch_leg(self, currency:str) -> tuple:
+        data = self.client._get("", params={
+            'function': 'CURRENCY_EXCHANGE_RATE',
+            'from_currency': currency, 'to_currency': self.base})
+        if _PAYLOAD_KEY not in data:
+            raise APIRequestException(
+                data.get('Error Message') or data.get('Note') or
+                data.get('Information') or data)
+        data = data[_PAYLOAD_KEY]
+        rate = float(data['5. Exchange Rate'])
+        # Some pairs come without bid/ask ('-'), use the rate then
+        bid = pd.to_numeric(data.get('8. Bid Price'), errors='coerce')
+        ask = pd.to_numeric(data.get('9. Ask Price'), errors='coerce')
+        bid = rate if pd.isna(bid) else float(bid)
+        ask = rate if pd.isna(ask) else float(ask)
+        return rate, bid, ask
+
+    def legs(self, currencies:list) -> pd.DataFrame:
+        """rate, bid and ask of every currency in base, cached for ttl"""
+        currencies = list(dict.fromkeys(c.upper() for c in currencies))
+        now = self.clock()
+        with self._lock:
+            stale = [
+                c for c in currencies if c != self.base and (
+                    c not in self._legs or now - self._legs[c][0] >= self.ttl)
+            ]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetched = list(executor.map(self._fetch_leg, stale))
+        with self._lock:
+            for currency, leg in zip(stale, fetched):
+                self._legs[currency] = (now, *leg)
+            rows = [
+                (1.0, 1.0, 1.0) if c == self.base else self._legs[c][1:]
+                for c in currencies
+            ]
+        return pd.DataFrame(rows, index=currencies, columns=['rate', 'bid', 'ask'])
+
+    # --------------------------------------------------
+    def matrix(self, currencies:list) -> dict:
+        """
+        {'rate', 'bid', 'ask'} of N x N frames: row currency quoted in
+        column currency. Selling i for j gets bid_i / ask_j and buying
+        costs ask_i / bid_j.
+        """
+        legs = self.legs(currencies)
+        rate, bid, ask = (legs[col].to_numpy() for col in ['rate', 'bid', 'ask'])
+        index = pd.Index(legs.index, name='from')
+        columns = pd.Index(legs.index, name='to')
+        return {
+            'rate': pd.DataFrame(rate[:, None] / rate[None, :], index, columns),
+            'bid': pd.DataFrame(bid[:, None] / ask[None, :], index, columns),
+            'ask': pd.DataFrame(ask[:, None] / bid[None, :], index, columns),
+        }
+
+    def to_dataframe(self, currencies:list) -> pd.DataFrame:
+        """Long from/to/rate/bid/ask frame of every pair but i -> i"""
+        matrix = self.matrix(currencies)
+        df = pd.concat({k: v.stack() for k, v in matrix.items()}, axis=1).reset_index()
+        return df[df['from'] != df['to']].reset_index(drop=True)
+
+    def rate(self, from_currency:str, to_currency:str) -> float:
+        legs = self.legs([from_currency, to_currency])
+        return float(legs['rate'].iloc[0] / legs['rate'].iloc[-1])
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Cross rates triangulated from the USD legs',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'currency',
+        metavar = 'Currency',
+        nargs='+',
+        type=str,
+        help = "Currencies (physical or crypto) of the matrix")
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type=str,
+        help = "Password to log in ALphaVantage")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    json_path = dir_path + '/credentials.json'
+    if args.password != '':
+        alpha = AlphaVantage(api_key = args.password)
+    else:
+        if os.path.isfile(json_path):
+            with open(json_path) as json_file:
+                data_json = json.load(json_file)
+                alpha = AlphaVantage(
+                    api_key = data_json['password'],
+                )
+            json_file.close()
+        else:
+            msg = (
+                f'If {json_path} with username and password ' +
+                'as keys does not exist in the directory, ' +
+                'both arguments must be given.'
+            )
+            sys.exit(msg)
+    alpha.limiter = default_limiter()
+
+    cross = CrossRates(alpha)
+    print(cross.matrix(args.currency)['rate'].round(6))
+    print(PrintTibble(cross.to_dataframe(args.currency)))
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.alpha_vantage.cross_rates ARS EUR BRL BTC
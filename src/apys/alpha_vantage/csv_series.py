@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Parser of the AlphaVantage datatype=csv time series, shared by
+    alpha_vantage_login and the standalone Alpha.py. No package
+    relative imports so both can load it.
+"""
+
+import io
+
+import pandas as pd
+
+
+# --------------------------------------------------
+def parse_csv_series(data:str, columns:list = None) -> pd.DataFrame:
+    """
+    Parse a datatype=csv time series into the frame the json path
+    builds: float64 columns and an ascending DatetimeIndex named date.
+    AlphaVantage sends the newest row first, so rows are just reversed.
+    :param columns: new column names, else 'open (USD)' -> 'open_usd'.
+    Raises ValueError if their count differs from the response's, or
+    if data isn't a csv time series (an html or plain text answer).
+    """
+    header = data.partition('\n')[0].strip().split(',')
+    if len(header) < 2:
+        raise ValueError(f'Not a csv time series: {data[:200]!r}')
+    try:
+        df = pd.read_csv(
+            io.StringIO(data), index_col=0,
+            dtype={col: 'float64' for col in header[1:]})
+        index = pd.to_datetime(df.index)
+    except (ValueError, pd.errors.ParserError) as e:
+        raise ValueError(f'Not a csv time series ({e}): {data[:200]!r}') from e
+    df.index = index
+    df = df.iloc[::-1]
+    df.index.name = 'date'
+    if columns != None:
+        if len(columns) != df.shape[1]:
+            raise ValueError(
+                f'{len(columns)} columns given for the {df.shape[1]} '
+                f'of the response: {list(df.columns)}')
+        df.columns = columns
+    else:
+        df.columns = [
+            col.lower().replace(' (', '_').replace(')', '').replace(' ', '_')
+            for col in df.columns
+        ]
+    return df
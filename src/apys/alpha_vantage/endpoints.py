@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: AlphaVantage endpoint registry, parsers and response cache
+    shared by the standalone Alpha.py and fct/alpha_fct.py. No imports
+    outside alpha_vantage so both can load it.
+"""
+
+import threading
+import time
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from .csv_series import parse_csv_series
+
+OHLC = ['open', 'high', 'low', 'close']
+OHLCV = OHLC + ['volume']
+OHLC_ADJ = ['open', 'high', 'low', 'close', 'adj_close', 'volume', 'div']
+CRYPTO = ['open_{market}', 'open_usd', 'high_{market}', 'high_usd',
+    'low_{market}', 'low_usd', 'close_{market}', 'close_usd',
+    'volume', 'market_cap_usd']
+QUOTE = ['symbol', 'open', 'high', 'low', 'close', 'volume',
+    'date', 'previous_close', 'change', 'percent_change']
+FX_QUOTE = ['from_code', 'from_name', 'to_code', 'to_name',
+    'exchange_rate', 'last_refresh', 'timezone', 'bid_price', 'ask_price']
+SEARCH = ['symbol', 'name', 'type', 'region', 'market_open',
+    'market_close', 'timezone', 'currency', 'match_score']
+
+# Every endpoint: AlphaVantage function, payload key and columns.
+# '{...}' are filled with the request params (function, interval,
+# market, ...). kind: series (dict of dated rows), record (one row)
+# or table (list of rows)
+ENDPOINTS = {
+    'stock_search': ('SYMBOL_SEARCH', 'bestMatches', SEARCH, 'table'),
+    'stock_intra': ('TIME_SERIES_INTRADAY', 'Time Series ({interval})', OHLCV, 'series'),
+    'stock_daily': ('TIME_SERIES_DAILY', 'Time Series (Daily)', OHLCV, 'series'),
+    'stock_daily_adjusted': ('TIME_SERIES_DAILY_ADJUSTED', 'Time Series (Daily)',
+        OHLC_ADJ + ['split'], 'series'),
+    'stock_weekly': ('TIME_SERIES_WEEKLY', 'Weekly Time Series', OHLCV, 'series'),
+    'stock_weekly_adjusted': ('TIME_SERIES_WEEKLY_ADJUSTED', 'Weekly Adjusted Time Series',
+        OHLC_ADJ, 'series'),
+    'stock_monthly': ('TIME_SERIES_MONTHLY', 'Monthly Time Series', OHLCV, 'series'),
+    'stock_monthly_adjusted': ('TIME_SERIES_MONTHLY_ADJUSTED', 'Monthly Adjusted Time Series',
+        OHLC_ADJ, 'series'),
+    'stock_quote': ('GLOBAL_QUOTE', 'Global Quote', QUOTE, 'record'),
+    'fx_intra': ('FX_INTRADAY', 'Time Series FX ({interval})', OHLC, 'series'),
+    'fx_daily': ('FX_DAILY', 'Time Series FX (Daily)', OHLC, 'series'),
+    'fx_weekly': ('FX_WEEKLY', 'Time Series FX (Weekly)', OHLC, 'series'),
+    'fx_monthly': ('FX_MONTHLY', 'Time Series FX (Monthly)', OHLC, 'series'),
+    'fx_quote': ('CURRENCY_EXCHANGE_RATE', 'Realtime Currency Exchange Rate', FX_QUOTE, 'record'),
+    'crypto_intra': ('CRYPTO_INTRADAY', 'Time Series Crypto ({interval})', OHLCV, 'series'),
+    'crypto_daily': ('DIGITAL_CURRENCY_DAILY', 'Time Series (Digital Currency Daily)',
+        CRYPTO, 'series'),
+    'crypto_weekly': ('DIGITAL_CURRENCY_WEEKLY', 'Time Series (Digital Currency Weekly)',
+        CRYPTO, 'series'),
+    'crypto_monthly': ('DIGITAL_CURRENCY_MONTHLY', 'Time Series (Digital Currency Monthly)',
+        CRYPTO, 'series'),
+    # Indicators keep AlphaVantage column names (SMA, EMA, ...)
+    'mov_avg': (None, 'Technical Analysis: {function}', None, 'series'),
+    'sma': ('SMA', 'Technical Analysis: SMA', None, 'series'),
+    'ema': ('EMA', 'Technical Analysis: EMA', None, 'series'),
+}
+
+
+# --------------------------------------------------
+def api_error(data):
+    """Message of the json errors and quota notes AlphaVantage answers with"""
+    return data.get('Error Message') or data.get('Note') or data.get('Information') or data
+
+def is_api_error(data) -> bool:
+    return isinstance(data, dict) and (
+        'Error Message' in data or 'Note' in data or 'Information' in data)
+
+# --------------------------------------------------
+def series_frame(data:dict, columns:list = None) -> pd.DataFrame:
+    """
+    {date: {'1. open': '1.2', ...}} straight into one float64 array,
+    no intermediate object frame nor astype. Ascending DatetimeIndex
+    named date.
+    """
+    if not data:
+        return pd.DataFrame(columns = columns,
+        index = pd.DatetimeIndex([], name = 'date'), dtype = 'float64')
+    fields = list(next(iter(data.values())))
+    getter = itemgetter(*fields)
+    values = np.array([getter(row) for row in data.values()], dtype = 'float64')
+    values = values.reshape(len(data), len(fields))
+    index = pd.to_datetime(list(data.keys()))
+    if index.is_monotonic_decreasing:
+        # AlphaVantage sends the newest row first
+        values, index = values[::-1], index[::-1]
+    elif not index.is_monotonic_increasing:
+        order = np.argsort(index.values, kind = 'stable')
+        values, index = values[order], index[order]
+    index.name = 'date'
+    return pd.DataFrame(values, index = index,
+    columns = columns if columns != None else fields)
+
+# --------------------------------------------------
+class ResponseCache():
+    """
+    Same request within ttl seconds is not sent again (free tier: 25
+    requests per day). At most size responses are kept, the oldest go
+    first. Errors and quota notes are not kept.
+    """
+
+    def __init__(self, ttl:float = 60, size:int = 32):
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, params:dict, fetch):
+        """Cached response of params, else fetch() (called unlocked)"""
+        key = tuple(sorted(params.items()))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._items.get(key)
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        data = fetch()
+        with self._lock:
+            # Expired responses are dropped, not only skipped on read
+            for k in [k for k, v in self._items.items() if now - v[0] >= self.ttl]:
+                del self._items[k]
+            if self.size > 0 and not is_api_error(data):
+                self._items.pop(key, None)
+                while len(self._items) >= self.size:
+                    # dicts keep insertion order: the first one is the oldest
+                    del self._items[next(iter(self._items))]
+                self._items[key] = (now, data)
+        return data
+
+# --------------------------------------------------
+def call(get, name:str, subset = True, output_df:bool = True,
+         datatype:str = 'json', error = ValueError, **params):
+    """
+    Request endpoint name of ENDPOINTS and parse it.
+    :param get: get(params) returns the json (or csv text) response
+    :param subset: payload key to keep, True for the registry's one
+    :param error: exception class raised with the AlphaVantage message
+    """
+    function, payload, columns, kind = ENDPOINTS[name]
+    if function != None:
+        params = {'function':function, **params}
+    if datatype != 'json':
+        params['datatype'] = datatype
+    data = get(params)
+
+    fill = {k: str(v).lower() if k == 'market' else v for k, v in params.items()}
+    if columns != None:
+        columns = [col.format(**fill) for col in columns]
+
+    if datatype == 'csv':
+        if isinstance(data, dict):
+            # Errors and quota notes come as json even for csv
+            raise error(api_error(data))
+        if output_df == True:
+            try:
+                data = parse_csv_series(data, columns)
+            except ValueError as e:
+                raise error(str(e)) from e
+        return data
+
+    if subset == True:
+        subset = payload.format(**fill)
+    if subset != None:
+        if subset not in data:
+            raise error(api_error(data))
+        data = data[subset]
+
+    if output_df != True:
+        return data
+    if kind == 'series':
+        return series_frame(data, columns)
+    # Records and tables keep the strings AlphaVantage sends
+    df = pd.DataFrame([data] if kind == 'record' else data)
+    df.columns = columns
+    return df
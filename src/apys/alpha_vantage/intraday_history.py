@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Multi-year intraday history from AlphaVantage, one month
+    slice (TIME_SERIES_INTRADAY month=YYYY-MM) per request. Slices are
+    downloaded concurrently within the quota and every one is written
+    as soon as it arrives to <root>/<symbol>/<interval>/<YYYY-MM>.parquet
+    with the time it was fetched, so months fetched after they were
+    over are never requested again.
+Require package:
+    -   pip install pyarrow
+"""
+
+import argparse
+import datetime as dt
+import inspect
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
+from .alpha_vantage_login import AlphaVantage, APIRequestException, read_csv_series
+from .bulk_download import default_limiter, quota_get
+
+INTERVALS = ['1min', '5min', '15min', '30min', '60min']
+# AlphaVantage intraday history starts in 2000-01
+FIRST_MONTH = '2000-01'
+# Parquet metadata: UTC time the slice was downloaded
+_FETCHED_KEY = b'apys.fetched'
+
+
+# --------------------------------------------------
+def month_range(start:str, end:str) -> list:
+    """['2023-11', '2023-12', '2024-01'] from '2023-11' to '2024-01'"""
+    return list(pd.period_range(start, end, freq='M').strftime('%Y-%m'))
+
+# --------------------------------------------------
+@dataclass
+class IntradayHistory():
+    """
+    :param start: first month, YYYY-MM
+    :param end: last month, YYYY-MM. Defaults to the current month.
+    A month fetched before it was over is downloaded again on the
+    next run.
+    :param root: directory of the store. Defaults to intraday/ next
+    to this module.
+    :param max_wait: stop (to resume later) instead of waiting longer
+    than these seconds for the next slot of the quota
+    The quota is the limiter of alpha if it has one, else the free tier
+    one of default_limiter(). alpha itself is not modified.
+    """
+    alpha: AlphaVantage
+    symbol: str
+    interval: str = '5min'
+    start: str = None
+    end: str = None
+    root: str = None
+    adjusted: bool = True
+    extended_hours: bool = True
+    max_workers: int = 2
+    max_wait: float = 120
+    failed: dict = field(init=False, repr=False, default_factory=dict)
+    df: pd.DataFrame = field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.interval not in INTERVALS:
+            raise ValueError(f'interval must be one of {INTERVALS}')
+        if self.root == None:
+            dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+            self.root = os.path.join(dir_path, 'intraday')
+        if self.end == None:
+            self.end = dt.date.today().strftime('%Y-%m')
+        if self.start == None:
+            self.start = self.end
+        self._limiter = self.alpha.limiter or default_limiter()
+
+    # --------------------------------------------------
+    @property
+    def dir_path(self) -> str:
+        return os.path.join(self.root, re.sub(r'[^\w.-]', '_', self.symbol), self.interval)
+
+    def slice_path(self, month:str) -> str:
+        return os.path.join(self.dir_path, month + '.parquet')
+
+    def plan(self) -> list:
+        """Every month slice between start and end"""
+        return month_range(max(self.start, FIRST_MONTH), self.end)
+
+    def is_complete(self, month:str) -> bool:
+        """
+        The slice on disk was fetched once its month was over. A day
+        of margin covers the late bars of every timezone. Slices
+        without the fetch time count as incomplete.
+        """
+        path = self.slice_path(month)
+        if not os.path.isfile(path):
+            return False
+        fetched = (pq.read_schema(path).metadata or {}).get(_FETCHED_KEY)
+        if fetched is None:
+            return False
+        next_month = (pd.Period(month, freq='M') + 1).start_time.to_pydatetime()
+        over = next_month.replace(tzinfo=dt.timezone.utc) + dt.timedelta(days=1)
+        return dt.datetime.fromisoformat(fetched.decode()) >= over
+
+    def pending(self) -> list:
+        """Months not on disk yet or fetched before they were over"""
+        return [month for month in self.plan() if not self.is_complete(month)]
+
+    # --------------------------------------------------
+    def write_slice(self, month:str, df:pd.DataFrame):
+        os.makedirs(self.dir_path, exist_ok=True)
+        path = self.slice_path(month)
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            _FETCHED_KEY: dt.datetime.now(dt.timezone.utc).isoformat().encode(),
+        })
+        # Replace the file at once so readers never see half of it
+        pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    def fetch_slice(self, month:str) -> str:
+        """Download and store one month. Returns done, failed or quota"""
+        params = {
+            'function': 'TIME_SERIES_INTRADAY', 'symbol': self.symbol,
+            'interval': self.interval, 'month': month, 'outputsize': 'full',
+            'adjusted': self.adjusted, 'extended_hours': self.extended_hours,
+            'datatype': 'csv',
+        }
+        data = quota_get(self.alpha, self._limiter, params, self.max_wait)
+        if data is None or isinstance(data, dict) and 'Error Message' not in data:
+            # Note or Information: quota used up
+            return 'quota'
+        try:
+            df = read_csv_series(data, columns=['open', 'high', 'low', 'close', 'volume'])
+        except APIRequestException as e:
+            self.failed[month] = e.message
+            return 'failed'
+        self.write_slice(month, apply_schema(df))
+        return 'done'
+
+    # --------------------------------------------------
+    def run(self) -> list:
+        """
+        Download pending months while the quota allows it.
+        Returns the months still pending.
+        """
+        self.failed = {}
+        months = self.pending()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            status = dict(zip(months, executor.map(self.fetch_slice, months)))
+        if 'quota' in status.values():
+            print('Quota used. Run again to resume.')
+        return [month for month, s in status.items() if s != 'done']
+
+    # --------------------------------------------------
+    def to_dataframe(self, start:str = None, end:str = None) -> pd.DataFrame:
+        """Stored bars between start and end months (all by default)"""
+        months = month_range(start or self.start, end or self.end)
+        tables = [
+            pq.read_table(self.slice_path(month)) for month in months
+            if os.path.isfile(self.slice_path(month))
+        ]
+        if not tables:
+            self.df = pd.DataFrame(columns=['open', 'high', 'low', 'close', 'volume'])
+        else:
+            self.df = pa.concat_tables(tables).to_pandas()
+        return self.df
+
+    def print_tibble(self):
+        print(PrintTibble(self.df))
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Download intraday history from AlphaVantage by month',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'symbol',
+        metavar = 'Symbol',
+        type=str,
+        help = "Symbol to look up")
+
+    parser.add_argument(
+        'start',
+        metavar = 'start',
+        type=str,
+        help = "First month - format YYYY-MM")
+
+    parser.add_argument(
+        '-e', '--end',
+        metavar = 'end',
+        default = None,
+        type=str,
+        help = "Last month - format YYYY-MM (current month by default)")
+
+    parser.add_argument(
+        '-i', '--interval',
+        metavar = 'interval',
+        default = '5min',
+        choices = INTERVALS,
+        type=str,
+        help = "Bars interval")
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type=str,
+        help = "Password to log in ALphaVantage")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    json_path = dir_path + '/credentials.json'
+    if args.password != '':
+        alpha = AlphaVantage(api_key = args.password)
+    else:
+        if os.path.isfile(json_path):
+            with open(json_path) as json_file:
+                data_json = json.load(json_file)
+                alpha = AlphaVantage(
+                    api_key = data_json['password'],
+                )
+            json_file.close()
+        else:
+            msg = (
+                f'If {json_path} with username and password ' +
+                'as keys does not exist in the directory, ' +
+                'both arguments must be given.'
+            )
+            sys.exit(msg)
+
+    history = IntradayHistory(
+        alpha = alpha,
+        symbol = args.symbol,
+        interval = args.interval,
+        start = args.start,
+        end = args.end,
+    )
+    pending = history.run()
+    history.to_dataframe()
+    history.print_tibble()
+    if pending:
+        print(f'{len(pending)} months pending: {pending}')
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.alpha_vantage.intraday_history AAPL 2022-01
+    # python -m apys.alpha_vantage.intraday_history AAPL 2022-01 -e 2022-12 -i 1min
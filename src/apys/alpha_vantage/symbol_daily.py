@@ -20,19 +20,22 @@ from ..utils.pydyverse import PrintTibble
 from ..utils.validation import valid_date
 from ..utils.sql_utils import SQLUtils
 # from ..models.iol_model import IOLModel
-from .alpha_vantage_login import AlphaVantage
+from .alpha_vantage_login import AlphaVantage, read_csv_series
 
 
 # --------------------------------------------------
 @dataclass
 class SymbolDaily(SQLUtils):
     """
-    Get daily symbol data from IOL
-    :param IOL must be initialized first
+    Get daily symbol data from AlphaVantage
+    :param datatype: json (default) or csv, parsed straight into
+    typed columns. Both build the same frame; with output_df=False
+    self.df is the payload dict or the csv text.
     """
     alpha: AlphaVantage
     symbol: str
     size: str = 'compact'
+    datatype: str = 'json'
     subset: str = 'Time Series (Daily)'
     output_df: bool = True
     df: pd.DataFrame = field(init=False, repr=False)
@@ -50,17 +53,22 @@ class SymbolDaily(SQLUtils):
         function = 'TIME_SERIES_DAILY'
         params = {
         'function':function, 'symbol':self.symbol,
-        'outputsize':self.size
+        'outputsize':self.size, 'datatype':self.datatype
         }
         data = self.alpha._get("", params=params)
 
-        if self.subset != None:
+        # csv comes as text, parsed in toDataFrame
+        if self.datatype == 'json' and self.subset != None:
             data = data[self.subset]
 
         self.df = data
         return self.df
 
     def toDataFrame(self):
+        if self.datatype == 'csv':
+            self.df = read_csv_series(
+                self.df, columns = ['open', 'high', 'low', 'close', 'volume'])
+            return self.df
         df = pd.DataFrame.from_dict(self.df, orient = 'index')
         df = df.astype('float')
         df.index.name = 'date'
@@ -12,20 +12,99 @@
 # ## Import packages and API Key
 
 # %%
-import pandas as pd
-import requests
 import json
 import os
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-if os.path.exists('alpha.json'):
-    with open('alpha.json', 'r') as file:
-        js = json.loads(file.read())
-        TOKEN = js["token"]
-        file.close()
-else:
-    TOKEN = ''
+from ..alpha_vantage.bulk_download import default_limiter
+from ..alpha_vantage.cross_rates import CrossRates
+from ..alpha_vantage.endpoints import ResponseCache, call
+from ..utils.schema import apply_schema
 
 ENDPOINT = 'https://www.alphavantage.co/query'
+TOKEN = None
+_SESSION = None
+_LIMITER = None
+_MAX_WAIT = 60
+_CROSS = {}
+# Same request within 60 seconds is not sent again
+_CACHE = ResponseCache(ttl = 60, size = 32)
+
+# %%
+def get_token(path = 'alpha.json'):
+    """API key from alpha.json, read once on first use"""
+    global TOKEN
+    if TOKEN == None:
+        TOKEN = ''
+        if os.path.exists(path):
+            with open(path, 'r') as file:
+                TOKEN = json.loads(file.read())["token"]
+    return TOKEN
+
+def get_session():
+    """One keep-alive session for every function"""
+    global _SESSION
+    if _SESSION == None:
+        _SESSION = requests.session()
+        adapter = HTTPAdapter(pool_connections = 4, pool_maxsize = 8,
+            max_retries = Retry(total = 3, backoff_factor = 0.5,
+            status_forcelist = [500, 502, 503, 504]))
+        _SESSION.mount('https://', adapter)
+    return _SESSION
+
+def set_limiter(limiter = 'free', max_wait = 60):
+    """
+    Throttle every function (off by default). limiter: a RateLimiter,
+    'free' for the free tier quota shared by every process through
+    alpha_vantage/rate_limit.sqlite, or None to turn it off. A request
+    that would wait more than max_wait seconds raises RuntimeError
+    instead.
+    """
+    global _LIMITER, _MAX_WAIT
+    _LIMITER = default_limiter() if limiter == 'free' else limiter
+    _MAX_WAIT = max_wait
+
+def _get(params, token = None):
+    session = get_session()
+    if _LIMITER != None and not _LIMITER.acquire(_MAX_WAIT):
+        raise RuntimeError(
+            'AlphaVantage quota used, next request in '
+            f'{_LIMITER.delay() / 60:.0f} minutes')
+    params = {**params, 'apikey': token or get_token()}
+    r = session.get(ENDPOINT, params = params, timeout = 10)
+    r.raise_for_status()
+    return r.json()
+
+def _call(name, token = None, **params):
+    """Endpoint of the Alpha.py registry, parsed and cached the same way"""
+    token = token or get_token()
+    def get(params):
+        return _CACHE.get({**params, 'apikey': token},
+        lambda: _get(params, token))
+    return call(get, name, **params)
+
+def _many(fetch, keys, max_workers = 4, schema = None):
+    # Threads overlap the round trips while the limiter, if set,
+    # keeps the requests inside the quota. Failed keys are left out
+    # and listed in df.attrs['failed']
+    def run(key):
+        try:
+            return key, fetch(key)
+        except (ValueError, RuntimeError, requests.RequestException) as e:
+            return key, e
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        results = list(executor.map(run, keys))
+    failed = {key: str(res) for key, res in results if isinstance(res, Exception)}
+    df_list = [res for key, res in results if not isinstance(res, Exception)]
+    df = apply_schema(pd.concat(df_list), schema) if df_list else pd.DataFrame()
+    df.attrs['failed'] = failed
+    return df
 
 # %% [markdown]
 # ## API Functions
@@ -37,21 +116,8 @@ ENDPOINT = 'https://www.alphavantage.co/query'
 # #### Search
 
 # %%
-def search_stock(keywords, token = TOKEN):
-    function = 'SYMBOL_SEARCH'
-    url = ENDPOINT
-    params = {
-        'function':function, 'keywords':keywords,
-        'apikey':token
-    }
-    
-    r = requests.get(url, params = params)
-    data = r.json()['bestMatches']
-    df = pd.DataFrame(data)
-    df.columns = ['symbol', 'name', 'type', 'region', 
-    'market_open', 'market_close', 'timezone', 
-    'currency', 'match_score']
-    return df
+def search_stock(keywords, token = None):
+    return _call('stock_search', token, keywords = keywords)
 
 #Example
 #data = search_stock("grupo financiero galicia") 
@@ -62,27 +128,11 @@ def search_stock(keywords, token = TOKEN):
 
 # %%
 def get_intra_stock(symbol, interval, 
-size = "compact", token = TOKEN):
-
-    function = 'TIME_SERIES_INTRADAY'
-    url = ENDPOINT
-
+size = "compact", token = None):
     #outputsize = By default, outputsize=compact. Strings compact 
     # (latest 100 data points in the intraday time series) and *full* are accepted
-    params = {
-        'function':function, 'symbol':symbol, 'interval':interval,
-        'outputsize':size, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series ('+ interval +')']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    #df.index = pd.to_datetime(df.index)
-    return df
+    return _call('stock_intra', token, symbol = symbol,
+    interval = interval, outputsize = size)
 
 #Example
 #data = get_intra_stock("AAPL", "15min", "compact")
@@ -92,52 +142,38 @@ size = "compact", token = TOKEN):
 # #### Get daily data
 
 # %%
-def get_daily_stock(symbol, size = 'compact', token = TOKEN):
-    function = 'TIME_SERIES_DAILY'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'outputsize':size, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series (Daily)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+def get_daily_stock(symbol, size = 'compact', token = None):
+    return _call('stock_daily', token, symbol = symbol, outputsize = size)
 
 #Example
 #data = get_daily_stock("AAPL", "compact")
 #data.round(2).head()
 
+# %% [markdown]
+# #### Get daily data of many symbols
+
+# %%
+def get_daily_stock_many(symbols, size = 'compact', token = None,
+max_workers = 4):
+    def fetch(symbol):
+        df = get_daily_stock(symbol, size, token)
+        df.insert(0, 'symbol', symbol)
+        return df
+    return _many(fetch, list(dict.fromkeys(symbols)), max_workers)
+
+#Example
+#set_limiter('free')   # free key: 5 per minute, 25 per day
+#data = get_daily_stock_many(["AAPL", "MSFT", "KO"])
+#data.attrs['failed']
+
 # %% [markdown]
 # #### Get daily adjusted data (PREMIUM key required)
 
 # %%
 def get_daily_adjusted_stock(symbol, size = "compact", 
-token = TOKEN):
-    
-    function = 'TIME_SERIES_DAILY_ADJUSTED'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'outputsize':size, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series (Daily)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 
-    'adj_close', 'volume', 'div', 'split']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+token = None):
+    return _call('stock_daily_adjusted', token, symbol = symbol,
+    outputsize = size)
 
 #Example
 #data = get_daily_adjusted_stock("AAPL", "compact")
@@ -147,23 +183,8 @@ token = TOKEN):
 # #### Get weekly data
 
 # %%
-def get_weekly_stock(symbol, token = TOKEN):
-    function = 'TIME_SERIES_WEEKLY'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Weekly Time Series']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+def get_weekly_stock(symbol, token = None):
+    return _call('stock_weekly', token, symbol = symbol)
 
 #Example
 #data = get_weekly_stock("AAPL")
@@ -173,24 +194,8 @@ def get_weekly_stock(symbol, token = TOKEN):
 # #### Get weekly adjusted data
 
 # %%
-def get_weekly_adjusted_stock(symbol, token = TOKEN):
-    function = 'TIME_SERIES_WEEKLY_ADJUSTED'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Weekly Adjusted Time Series']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 
-    'adj_close', 'volume', 'div']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+def get_weekly_adjusted_stock(symbol, token = None):
+    return _call('stock_weekly_adjusted', token, symbol = symbol)
 
 #Example
 #data = get_weekly_adjusted_stock("AAPL")
@@ -200,23 +205,8 @@ def get_weekly_adjusted_stock(symbol, token = TOKEN):
 # #### Get monthly data
 
 # %%
-def get_monthly_stock(symbol, token = TOKEN):
-    function = 'TIME_SERIES_MONTHLY'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Monthly Time Series']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+def get_monthly_stock(symbol, token = None):
+    return _call('stock_monthly', token, symbol = symbol)
 
 #Example
 #data = get_monthly_stock("AAPL")
@@ -226,24 +216,8 @@ def get_monthly_stock(symbol, token = TOKEN):
 # #### Get monthly adjusted data
 
 # %%
-def get_monthly_adjusted_stock(symbol, token = TOKEN):
-    function = 'TIME_SERIES_MONTHLY_ADJUSTED'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Monthly Adjusted Time Series']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 
-    'adj_close', 'volume', 'div']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+def get_monthly_adjusted_stock(symbol, token = None):
+    return _call('stock_monthly_adjusted', token, symbol = symbol)
 
 #Example
 #data = get_monthly_adjusted_stock("AAPL")
@@ -253,20 +227,8 @@ def get_monthly_adjusted_stock(symbol, token = TOKEN):
 # #### Get last price
 
 # %%
-def get_last_stock(symbol, token = TOKEN):
-    function = 'GLOBAL_QUOTE'
-    url = ENDPOINT
-    params = {
-        'function':function, 'symbol':symbol,
-        'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Global Quote']
-    df = pd.DataFrame.from_dict(data, orient = 'index').transpose()
-    df.columns = ['symbol', 'open', 'high', 'low', 'close', 'volume', 
-    'date', 'previous_close', 'change', 'percent_change']
-    return df
+def get_last_stock(symbol, token = None):
+    return _call('stock_quote', token, symbol = symbol)
 
 #Example
 #data = get_last_stock("AAPL")
@@ -280,25 +242,9 @@ def get_last_stock(symbol, token = TOKEN):
 
 # %%
 def get_intra_fx(from_fx, to_fx, interval, 
-size = 'compact', token = TOKEN):
-    
-    function = 'FX_INTRADAY'
-    url = ENDPOINT
-    params = {
-        'function':function,'from_symbol':from_fx,
-        'to_symbol':to_fx, 'interval':interval,
-        'outputsize':size, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series FX ('+ interval +')']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+size = 'compact', token = None):
+    return _call('fx_intra', token, from_symbol = from_fx,
+    to_symbol = to_fx, interval = interval, outputsize = size)
 
 #Example
 #data = get_intra_fx("USD", "EUR", "1min")
@@ -309,25 +255,9 @@ size = 'compact', token = TOKEN):
 
 # %%
 def get_daily_fx(from_fx, to_fx, 
-size = "compact", token = TOKEN):
-    
-    function = 'FX_DAILY'
-    url = ENDPOINT
-    params = {
-        'function':function,'from_symbol':from_fx,
-        'to_symbol':to_fx,'outputsize':size, 
-        'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series FX (Daily)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+size = "compact", token = None):
+    return _call('fx_daily', token, from_symbol = from_fx,
+    to_symbol = to_fx, outputsize = size)
 
 #Example
 #data = get_daily_fx("USD", "ARS")
@@ -338,24 +268,9 @@ size = "compact", token = TOKEN):
 
 # %%
 def get_weekly_fx(from_fx, to_fx, 
-token = TOKEN):
-    
-    function = 'FX_WEEKLY'
-    url = ENDPOINT
-    params = {
-        'function':function,'from_symbol':from_fx,
-        'to_symbol':to_fx, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series FX (Weekly)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+token = None):
+    return _call('fx_weekly', token, from_symbol = from_fx,
+    to_symbol = to_fx)
 
 #Example
 #data = get_weekly_fx("USD", "ARS")
@@ -366,24 +281,9 @@ token = TOKEN):
 
 # %%
 def get_monthly_fx(from_fx, to_fx, 
-token = TOKEN):
-    
-    function = 'FX_MONTHLY'
-    url = ENDPOINT
-    params = {
-        'function':function,'from_symbol':from_fx,
-        'to_symbol':to_fx, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series FX (Monthly)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+token = None):
+    return _call('fx_monthly', token, from_symbol = from_fx,
+    to_symbol = to_fx)
 
 #Example
 #data = get_monthly_fx("USD", "ARS")
@@ -393,26 +293,50 @@ token = TOKEN):
 # #### Get last price FX
 
 # %%
-def get_last_fx(from_fx, to_fx, token = TOKEN):
-    function = 'CURRENCY_EXCHANGE_RATE'
-    url = ENDPOINT
-    params = {
-        'function':function, 'from_currency':from_fx,
-        'to_currency':to_fx, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Realtime Currency Exchange Rate']
-    df = pd.DataFrame.from_dict(data, orient = 'index').transpose()
-    df.columns = ['from_code', 'from_name', 'to_code', 
-    'to_name', 'exchange_rate', 'last_refresh', 
-    'timezone', 'bid_price', 'ask_price']
-    return df
+def get_last_fx(from_fx, to_fx, token = None):
+    return _call('fx_quote', token, from_currency = from_fx,
+    to_currency = to_fx)
 
 #Example
 #data = get_last_fx('USD', 'ARS')
 #data
 
+# %% [markdown]
+# #### Get last price of many FX pairs
+
+# %%
+def get_last_fx_many(pairs, token = None, max_workers = 4):
+    """pairs: [('USD', 'ARS'), ...] or ['USD/ARS', ...]"""
+    pairs = [tuple(p.split('/')) if isinstance(p, str) else tuple(p) for p in pairs]
+    def fetch(pair):
+        df = get_last_fx(pair[0], pair[1], token)
+        for col in ['exchange_rate', 'bid_price', 'ask_price']:
+            df[col] = pd.to_numeric(df[col], errors = 'coerce')
+        df['last_refresh'] = pd.to_datetime(df['last_refresh'])
+        return df
+    df = _many(fetch, list(dict.fromkeys(pairs)), max_workers)
+    return df.reset_index(drop = True)
+
+#Example
+#data = get_last_fx_many(['USD/ARS', 'EUR/USD', 'USD/BRL'])
+#data
+
+# %% [markdown]
+# #### Get cross rates FX (N requests for N currencies)
+
+# %%
+def get_cross_fx(currencies, token = None, ttl = 60):
+    """{'rate', 'bid', 'ask'} matrices triangulated from the USD legs"""
+    token = token or get_token()
+    if token not in _CROSS:
+        client = SimpleNamespace(_get = lambda path, params: _get(params, token))
+        _CROSS[token] = CrossRates(client, ttl = ttl)
+    return _CROSS[token].matrix(currencies)
+
+#Example
+#data = get_cross_fx(['ARS', 'EUR', 'BRL', 'BTC'])
+#data['rate']
+
 # %% [markdown]
 # ### Crypto
 
@@ -420,15 +344,14 @@ def get_last_fx(from_fx, to_fx, token = TOKEN):
 # #### Ranking (no funciona)
 
 # %%
-def rank_cryto(symbol, token = TOKEN):
+def rank_cryto(symbol, token = None):
     function = 'CRYPTO_RATING'
-    url = ENDPOINT
     params = {
-        'function':function,'symbol':symbol,
-        'apikey':token
+        'function':function,'symbol':symbol
     }
 
-    r = requests.get(url, params = params)
+    r = get_session().get(ENDPOINT,
+    params = {**params, 'apikey': token or get_token()})
     data = r.json()#['Time Series FX ('+ interval +')']
     #df = pd.DataFrame.from_dict(data, orient = 'index')
     #df = df.astype('float')
@@ -447,25 +370,9 @@ def rank_cryto(symbol, token = TOKEN):
 
 # %%
 def get_intra_crypto(symbol, interval, market = 'USD',
-size = 'compact', token = TOKEN):
-    
-    function = 'CRYPTO_INTRADAY'
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'market':market, 'interval':interval,
-        'outputsize':size, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series Crypto ('+ interval +')']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df 
+size = 'compact', token = None):
+    return _call('crypto_intra', token, symbol = symbol,
+    market = market, interval = interval, outputsize = size)
 
 #Example
 #data = get_intra_crypto("BTC", "5min")
@@ -476,24 +383,8 @@ size = 'compact', token = TOKEN):
 
 # %%
 def get_daily_crypto(symbol, market = 'USD',
-token = TOKEN):
-    
-    function = 'DIGITAL_CURRENCY_DAILY'
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'market':market,'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series (Digital Currency Daily)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    #df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df 
+token = None):
+    return _call('crypto_daily', token, symbol = symbol, market = market)
 
 #Example
 #data = get_daily_crypto("BTC")
@@ -504,24 +395,8 @@ token = TOKEN):
 
 # %%
 def get_weekly_crypto(symbol, market = 'USD',
-token = TOKEN):
-    
-    function = 'DIGITAL_CURRENCY_WEEKLY'
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'market':market,'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series (Digital Currency Weekly)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    #df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df 
+token = None):
+    return _call('crypto_weekly', token, symbol = symbol, market = market)
 
 #Example
 #data = get_weekly_crypto("BTC")
@@ -532,24 +407,8 @@ token = TOKEN):
 
 # %%
 def get_monthly_crypto(symbol, market = 'USD',
-token = TOKEN):
-    
-    function = 'DIGITAL_CURRENCY_MONTHLY'
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'market':market,'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Time Series (Digital Currency Monthly)']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    #df.columns = ['open', 'high', 'low', 'close', 'volume']
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df 
+token = None):
+    return _call('crypto_monthly', token, symbol = symbol, market = market)
 
 #Example
 #data = get_monthly_crypto("BTC")
@@ -560,21 +419,9 @@ token = TOKEN):
 
 # %%
 def get_last_crypto(from_crypto, to_crypto, 
-token = TOKEN):
-    function = 'CURRENCY_EXCHANGE_RATE'
-    url = ENDPOINT
-    params = {
-        'function':function, 'from_currency':from_crypto,
-        'to_currency':to_crypto, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Realtime Currency Exchange Rate']
-    df = pd.DataFrame.from_dict(data, orient = 'index').transpose()
-    df.columns = ['from_code', 'from_name', 'to_code', 
-    'to_name', 'exchange_rate', 'last_refresh', 
-    'timezone', 'bid_price', 'ask_price']
-    return df
+token = None):
+    return _call('fx_quote', token, from_currency = from_crypto,
+    to_currency = to_crypto)
 
 #Example
 #data = get_last_crypto('BTC', 'USDT')
@@ -627,24 +474,10 @@ token = TOKEN):
 
 # %%
 def mov_avg(symbol, time_period, mov_type = "sma",
-interval = "5min", series_type= "close", token = TOKEN):
-
-    function = mov_type.upper()
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'interval':interval,'series_type':series_type,
-        'time_period':time_period, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Technical Analysis: '+ function]
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+interval = "5min", series_type= "close", token = None):
+    return _call('mov_avg', token, function = mov_type.upper(),
+    symbol = symbol, interval = interval, series_type = series_type,
+    time_period = time_period)
 
 #Example
 #data = mov_avg('AAPL', 50)
@@ -655,24 +488,9 @@ interval = "5min", series_type= "close", token = TOKEN):
 
 # %%
 def sma(symbol, time_period, interval = "5min", 
-series_type= "close", token = TOKEN):
-
-    function = 'SMA'
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'interval':interval,'series_type':series_type,
-        'time_period':time_period, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Technical Analysis: SMA']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+series_type= "close", token = None):
+    return _call('sma', token, symbol = symbol, interval = interval,
+    series_type = series_type, time_period = time_period)
 
 #Example
 #data = sma('AAPL', 50)
@@ -683,24 +501,9 @@ series_type= "close", token = TOKEN):
 
 # %%
 def ema(symbol, time_period, interval = "5min", 
-series_type= "close", token = TOKEN):
-
-    function = 'EMA'
-    url = ENDPOINT
-    params = {
-        'function':function,'symbol':symbol,
-        'interval':interval,'series_type':series_type,
-        'time_period':time_period, 'apikey':token
-    }
-
-    r = requests.get(url, params = params)
-    data = r.json()['Technical Analysis: EMA']
-    df = pd.DataFrame.from_dict(data, orient = 'index')
-    df = df.astype('float')
-    df.index.name = 'date'
-    df = df.sort_values('date', ascending = True)
-    df.index = pd.to_datetime(df.index)
-    return df
+series_type= "close", token = None):
+    return _call('ema', token, symbol = symbol, interval = interval,
+    series_type = series_type, time_period = time_period)
 
 #Example
 #data = ema('AAPL', 50)
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://finnhub.io/docs/api/websocket-trades
+Purpose: Get market data using Finnhub websocket API with asyncio.
+    Many symbols are multiplexed over one connection, which is
+    reopened with exponential backoff when it drops. The ticker set
+    is resubscribed after every reconnect.
+Require package:
+    -   pip install websockets
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import inspect
+import json
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+
+import pandas as pd
+import websockets
+from websockets.exceptions import ConnectionClosed, WebSocketException
+
+from ..utils.bar_builder import BarBuilder
+from ..utils.handling_files import HandlingFiles
+from ..utils.pydyverse import PrintTibble
+from ..utils.quote_board import SharedQuoteBoard
+from ..utils.stream_stats import (CRYPTO_SECONDS_PER_YEAR, STATS_COLUMNS,
+                                  US_SECONDS_PER_YEAR, StreamStats)
+from .websocket_market_data import BOARD_COLUMNS
+
+
+# --------------------------------------------------
+@dataclass
+class Trade():
+    """
+    Trade parsed from a Finnhub websocket message
+    """
+    symbol: str
+    price: float
+    datetime: dt.datetime
+    volume: float
+    conditions: list = None
+
+
+# --------------------------------------------------
+@dataclass
+class AsyncWebsocketMarketData(HandlingFiles):
+    """
+    Stream trades from Finnhub websocket API.
+    Trades are exposed as an async iterator:
+        async for trade in client:
+            ...
+    :param api_key: Finnhub token
+    :param tickers: symbols to subscribe to
+    :param min_backoff: first delay (seconds) before reconnecting
+    :param max_backoff: upper bound for the reconnect delay
+    :param idle_timeout: seconds without messages before the
+    connection is considered dead and reopened
+    :param queue_size: trades kept while the consumer is busy.
+    Oldest trades are dropped when it is full.
+    :param stats_halflife: keep per symbol streaming stats (EMA,
+    VWAP, realized volatility) with this halflife in seconds
+    :param seconds_per_year: trading seconds per year to annualize the
+    volatility. CRYPTO_SECONDS_PER_YEAR for 24/7 crypto tickers
+    :param bars_path: build 1s/1m/5m bars of the trades and append
+    them in batches to the symbol_bars table of this sqlite DB
+    Malformed messages and trades are skipped and counted in bad_messages.
+    """
+    api_key: str
+    tickers: list = None
+    print_console: bool = False
+    min_backoff: float = 1
+    max_backoff: float = 60
+    idle_timeout: float = 60
+    queue_size: int = 10000
+    publish: str = None
+    board_capacity: int = 1000
+    stats_halflife: float = None
+    seconds_per_year: float = US_SECONDS_PER_YEAR
+    bars_path: str = None
+    board: SharedQuoteBoard = field(init=False, repr=False, default=None)
+    stats: StreamStats = field(init=False, repr=False, default=None)
+    bars: BarBuilder = field(init=False, repr=False, default=None)
+    df: pd.DataFrame = field(init=False, repr=False)
+    last_trades: dict = field(init=False, repr=False, default_factory=dict)
+    bad_messages: int = field(init=False, repr=False, default=0)
+    API_URL: str = field(
+        default="wss://ws.finnhub.io",
+        init=False, repr=False)
+
+    def __post_init__(self):
+        self._subscribed = set(self.tickers or [])
+        self._ws = None
+        self._queue = None
+        self._closed = None
+        self.df = pd.DataFrame(
+            columns=["last_price", "datetime", "volume"],
+            index=pd.Index(sorted(self._subscribed), name="symbol")
+        )
+        if self.publish != None:
+            self.board = SharedQuoteBoard.create(
+                BOARD_COLUMNS, max(self.board_capacity, len(self._subscribed)),
+                name=self.publish)
+            self.board.add_symbols(sorted(self._subscribed))
+        if self.stats_halflife != None:
+            stats_board = None
+            if self.publish != None:
+                stats_board = SharedQuoteBoard.create(
+                    STATS_COLUMNS, self.board.capacity, name=self.publish + '_stats')
+            self.stats = StreamStats(
+                sorted(self._subscribed), halflife=self.stats_halflife,
+                seconds_per_year=self.seconds_per_year, board=stats_board)
+        if self.bars_path != None:
+            self.bars = BarBuilder(market='finnhub', sql_path=self.bars_path)
+
+    # --------------------------------------------------
+    def _init_loop_objects(self):
+        # asyncio primitives must be created inside the running loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._closed = asyncio.Event()
+
+    # --------------------------------------------------
+    async def subscribe(self, tickers:list):
+        """Add tickers to the set. They are resubscribed on reconnect"""
+        for ticker in tickers:
+            if ticker not in self._subscribed:
+                self._subscribed.add(ticker)
+                if self.board is not None:
+                    self.board.add_symbols([ticker])
+                await self._send('subscribe', ticker)
+
+    # --------------------------------------------------
+    async def unsubscribe(self, tickers:list):
+        for ticker in tickers:
+            if ticker in self._subscribed:
+                self._subscribed.discard(ticker)
+                self.last_trades.pop(ticker, None)
+                if self.board is not None:
+                    self.board.remove_symbols([ticker])
+                await self._send('unsubscribe', ticker)
+
+    # --------------------------------------------------
+    async def _send(self, msg_type:str, ticker:str):
+        if self._ws is None:
+            return
+        try:
+            await self._ws.send(
+                json.dumps({"type": msg_type, "symbol": ticker})
+            )
+        except ConnectionClosed:
+            # run() will resubscribe the whole set after reconnecting
+            pass
+
+    # --------------------------------------------------
+    async def run(self):
+        """
+        Connection loop. Reconnects with exponential backoff and jitter.
+        The consumers always get the end of the stream, whatever stops it.
+        """
+        self._init_loop_objects()
+        try:
+            await self._run()
+        finally:
+            self._put(None)
+
+    async def _run(self):
+        backoff = self.min_backoff
+        uri = f"{self.API_URL}?token={self.api_key}"
+        while not self._closed.is_set():
+            try:
+                async with websockets.connect(
+                    uri, ping_interval=20, ping_timeout=20
+                ) as ws:
+                    self._ws = ws
+                    for ticker in sorted(self._subscribed):
+                        await self._send('subscribe', ticker)
+                    backoff = self.min_backoff
+                    while not self._closed.is_set():
+                        message = await asyncio.wait_for(
+                            ws.recv(), timeout=self.idle_timeout
+                        )
+                        try:
+                            self.on_message(message)
+                        except Exception as e:
+                            # One bad payload must not end the stream
+                            self.bad_messages += 1
+                            if self.print_console:
+                                print(f"Message skipped ({e!r}): {message!r:.200}")
+            except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+                if self._closed.is_set():
+                    break
+                if self.print_console:
+                    print(f"Connection lost ({e!r}). Reconnecting in {backoff:.1f}s")
+            finally:
+                self._ws = None
+            if self._closed.is_set():
+                break
+            try:
+                await asyncio.wait_for(
+                    self._closed.wait(),
+                    timeout=backoff * (1 + random.random() / 2)
+                )
+            except asyncio.TimeoutError:
+                pass
+            backoff = min(backoff * 2, self.max_backoff)
+
+    # --------------------------------------------------
+    async def close(self):
+        self._init_loop_objects()
+        self._closed.set()
+        if self._ws is not None:
+            await self._ws.close()
+        if self.board is not None:
+            self.board.close()
+            self.board = None
+        if self.stats is not None and self.stats.board is not None:
+            self.stats.board.close()
+            self.stats.board = None
+        if self.bars is not None:
+            self.bars.close()
+
+    # --------------------------------------------------
+    def on_message(self, message):
+        message_dict = json.loads(message)
+        msg_type = message_dict.get('type')
+        if msg_type == 'trade':
+            self.marketDataHandler(message_dict.get('data') or [])
+        elif msg_type == 'error' and self.print_console:
+            print(f"Error message received: {message_dict.get('msg')}")
+        # 'ping' messages are heartbeats and need no answer
+
+    # --------------------------------------------------
+    def marketDataHandler(self, message:list):
+        for data_dict in message:
+            symbol = data_dict.get('s')
+            if symbol not in self._subscribed:
+                continue
+            try:
+                timestamp = data_dict['t'] / 1000.0
+                price = float(data_dict['p'])
+            except (KeyError, TypeError, ValueError):
+                # Trade without time or price: skip it, keep the rest
+                self.bad_messages += 1
+                continue
+            trade = Trade(
+                symbol = symbol,
+                price = price,
+                datetime = dt.datetime.utcfromtimestamp(timestamp),
+                volume = data_dict.get('v'),
+                conditions = data_dict.get('c'),
+            )
+            self.last_trades[symbol] = trade
+            if self.board is not None:
+                row = self.board.row_of(symbol)
+                if row >= 0:
+                    self.board.update(row, [
+                        trade.price, timestamp, trade.volume
+                    ])
+            if self.stats is not None:
+                self.stats.update(
+                    symbol, timestamp,
+                    price=trade.price, volume=trade.volume)
+            if self.bars is not None:
+                self.bars.update(
+                    symbol, timestamp,
+                    trade.price, volume=trade.volume)
+            self._put(trade)
+
+    # --------------------------------------------------
+    def _put(self, trade):
+        if self._queue.full():
+            # Slow consumer: drop the oldest trade, keep the newest
+            self._queue.get_nowait()
+        self._queue.put_nowait(trade)
+
+    # --------------------------------------------------
+    def __aiter__(self):
+        self._init_loop_objects()
+        return self
+
+    async def __anext__(self) -> Trade:
+        trade = await self._queue.get()
+        if trade is None:
+            raise StopAsyncIteration
+        return trade
+
+    # --------------------------------------------------
+    def to_dataframe(self) -> pd.DataFrame:
+        """Last trade of each subscribed symbol"""
+        df = pd.DataFrame(
+            [(t.price, t.datetime, t.volume) for t in self.last_trades.values()],
+            columns=["last_price", "datetime", "volume"],
+            index=pd.Index(list(self.last_trades.keys()), name="symbol")
+        )
+        self.df = df.reindex(sorted(self._subscribed))
+        return self.df
+
+    # --------------------------------------------------
+    async def getData(self, seconds_to_update:int = 15):
+        """Run the connection and print the board every few seconds"""
+        task = asyncio.ensure_future(self.run())
+        try:
+            while not task.done():
+                await asyncio.sleep(seconds_to_update)
+                if self.print_console:
+                    self.printTibble()
+                    if self.stats is not None:
+                        self.printTibble(self.stats.to_dataframe())
+        finally:
+            await self.close()
+            await task
+
+    def printTibble(self, data = None):
+        if data is None:
+            data = self.to_dataframe()
+        print(PrintTibble(data))
+
+# --------------------------------------------------
+def getArgs():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Stream Finnhub trades with asyncio',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type=str,
+        help = "Finnhub API key")
+
+    parser.add_argument('--print', action='store_true')
+    parser.add_argument('--no-print', dest='print', action='store_false')
+    parser.set_defaults(print=False)
+
+    parser.add_argument(
+        '--publish',
+        metavar = 'publish',
+        default = None,
+        type=str,
+        help = "Shared memory name to publish the quote board")
+
+    parser.add_argument(
+        '-s', '--stats',
+        metavar = 'halflife',
+        default = None,
+        type=float,
+        help = "Keep streaming stats with this halflife in seconds")
+
+    parser.add_argument(
+        '-b', '--bars',
+        metavar = 'sql_path',
+        default = None,
+        type=str,
+        help = "Build 1s/1m/5m bars and append them to this sqlite DB")
+
+    parser.add_argument(
+        '-c', '--crypto',
+        action='store_true',
+        help = "Annualize the stats volatility over 24/7 trading")
+
+    parser.add_argument(
+        '-t', '--tickers',
+        nargs='*',
+        metavar = 'tickers',
+        default = '',
+        type=str,
+        help = "Get tickers's data")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = getArgs()
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    json_path = dir_path + '/finnhub.json'
+
+    if args.password != '':
+        api_key = args.password
+    else:
+        if os.path.isfile(json_path):
+            with open(json_path) as json_file:
+                data_json = json.load(json_file)
+                api_key = data_json['password']
+            json_file.close()
+        else:
+            msg = (
+                f'If {json_path} password ' +
+                'as key does not exist in the directory, ' +
+                'it must be given.'
+            )
+            sys.exit(msg)
+
+    finnhub = AsyncWebsocketMarketData(
+        api_key = api_key,
+        tickers = args.tickers,
+        print_console = args.print,
+        publish = args.publish,
+        stats_halflife = args.stats,
+        seconds_per_year = (
+            CRYPTO_SECONDS_PER_YEAR if args.crypto else US_SECONDS_PER_YEAR),
+        bars_path = args.bars
+    )
+    try:
+        asyncio.run(finnhub.getData())
+    except KeyboardInterrupt:
+        pass
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.finnhub.async_websocket_market_data --print -t AAPL AMZN 'BINANCE:BTCUSDT'
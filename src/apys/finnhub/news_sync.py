@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://finnhub.io/docs/api/market-news
+Purpose: Keep Finnhub market and company news in a local SQLite file,
+    asking only for what is newer than the last sync. Market news use
+    the high-water id (minId), company news the high-water date.
+    News are stored once by id (a company's news are often related to
+    others) and linked to every feed they came from.
+"""
+
+import argparse
+import datetime as dt
+import inspect
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import pandas as pd
+import requests
+
+from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
+
+NEWS_COLUMNS = [
+    'id', 'datetime', 'category', 'related', 'source',
+    'headline', 'summary', 'url', 'image',
+]
+_TEXT_COLUMNS = ['headline', 'summary', 'url', 'image']
+# Company news: days asked for on the first sync of a symbol
+FIRST_SYNC_DAYS = 30
+
+
+# --------------------------------------------------
+class NewsSync():
+    """
+    SQLite file with three tables:
+        news(id, datetime epoch, category, related, source, headline, ...)
+        news_feed(feed, id): 'market:crypto', 'company:AAPL', ...
+        sync_state(feed, high_id, high_date, updated)
+    """
+    API_URL = 'https://finnhub.io/api/v1'
+    DEFAULT_TIMEOUT = 10
+
+    def __init__(self, api_key:str, sql_path:str, max_workers:int = 4):
+        self.sql_path = sql_path
+        self.max_workers = max_workers
+        self._session = requests.session()
+        self._session.params['token'] = api_key
+        with closing(self.connect()) as con, con:
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS news ('
+                'id INTEGER PRIMARY KEY, datetime INTEGER, category TEXT, '
+                'related TEXT, source TEXT, headline TEXT, summary TEXT, '
+                'url TEXT, image TEXT)'
+            )
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS news_feed ('
+                'feed TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (feed, id))'
+            )
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS sync_state ('
+                'feed TEXT PRIMARY KEY, high_id INTEGER, high_date INTEGER, '
+                'updated INTEGER)'
+            )
+
+    # --------------------------------------------------
+    def connect(self) -> sqlite3.Connection:
+        """New connection: the caller closes it (use contextlib.closing)"""
+        return sqlite3.connect(self.sql_path)
+
+    def close(self):
+        self._session.close()
+
+    def _get(self, path:str, params:dict) -> list:
+        response = self._session.get(
+            self.API_URL + path, params=params, timeout=self.DEFAULT_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    # --------------------------------------------------
+    def state(self, feed:str) -> tuple:
+        """(high_id, high_date epoch) of feed, zeros if never synced"""
+        with closing(self.connect()) as con, con:
+            row = con.execute(
+                'SELECT high_id, high_date FROM sync_state WHERE feed = ?', (feed,)
+            ).fetchone()
+        return row or (0, 0)
+
+    def _store(self, feed:str, items:list) -> int:
+        """Insert unseen ids, link all to feed and move its high-water mark"""
+        high_id, high_date = self.state(feed)
+        rows = [tuple(item.get(col) for col in NEWS_COLUMNS) for item in items]
+        with closing(self.connect()) as con, con:
+            before = con.total_changes
+            con.executemany(
+                f'INSERT OR IGNORE INTO news VALUES ({",".join("?" * len(NEWS_COLUMNS))})',
+                rows)
+            added = con.total_changes - before
+            con.executemany(
+                'INSERT OR IGNORE INTO news_feed VALUES (?, ?)',
+                [(feed, row[0]) for row in rows])
+            if rows:
+                high_id = max(high_id, max(row[0] for row in rows))
+                high_date = max(high_date, max(row[1] or 0 for row in rows))
+            con.execute(
+                'INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?, ?)',
+                (feed, high_id, high_date, int(dt.datetime.now().timestamp())))
+        return added
+
+    # --------------------------------------------------
+    def sync_market(self, category:str = 'general') -> int:
+        """News of category newer than the last id. Returns new news"""
+        feed = f'market:{category}'
+        high_id, _ = self.state(feed)
+        items = self._get('/news', {'category': category, 'minId': high_id})
+        return self._store(feed, [i for i in items if i.get('id', 0) > high_id])
+
+    def _fetch_company(self, symbol:str) -> list:
+        _, high_date = self.state(f'company:{symbol}')
+        today = dt.date.today()
+        if high_date:
+            # Dates are whole days: ask again from the last one
+            from_date = dt.datetime.fromtimestamp(high_date).date()
+        else:
+            from_date = today - dt.timedelta(days=FIRST_SYNC_DAYS)
+        return self._get('/company-news', {
+            'symbol': symbol, 'from': from_date.isoformat(), 'to': today.isoformat()})
+
+    def sync_companies(self, symbols:list) -> dict:
+        """
+        News of every symbol since its last sync, downloaded concurrently
+        and written from this thread. Returns new news per symbol.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self._fetch_company, symbols))
+        return {
+            symbol: self._store(f'company:{symbol}', items)
+            for symbol, items in zip(symbols, results)
+        }
+
+    # --------------------------------------------------
+    def to_dataframe(self, feed:str = None, start:dt.date = None) -> pd.DataFrame:
+        """Stored news, newest first, of a feed ('company:AAPL') or all"""
+        query = 'SELECT n.* FROM news n'
+        params = []
+        if feed != None:
+            query += ' JOIN news_feed f ON f.id = n.id WHERE f.feed = ?'
+            params.append(feed)
+        if start != None:
+            query += ' AND' if feed != None else ' WHERE'
+            query += ' n.datetime >= ?'
+            params.append(int(dt.datetime.combine(start, dt.time()).timestamp()))
+        query += ' ORDER BY n.datetime DESC, n.id DESC'
+        with closing(self.connect()) as con, con:
+            df = pd.read_sql_query(query, con, params=params)
+        df['datetime'] = pd.to_datetime(df['datetime'], unit='s')
+        return apply_schema(df, {col: 'string[pyarrow]' for col in _TEXT_COLUMNS})
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Sync Finnhub news into a local SQLite file',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'symbol',
+        metavar = 'Symbol',
+        nargs='*',
+        default = [],
+        type=str,
+        help = "Symbols whose company news to sync")
+
+    parser.add_argument(
+        '-c', '--category',
+        metavar = 'category',
+        default = 'general',
+        choices = ['general', 'forex', 'crypto', 'merger'],
+        type=str,
+        help = "Market news category")
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type=str,
+        help = "Password to log in Finnhub")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    json_path = dir_path + '/finnhub.json'
+    api_key = args.password
+    if api_key == '':
+        if os.path.isfile(json_path):
+            with open(json_path) as json_file:
+                api_key = json.load(json_file)['password']
+        else:
+            msg = (
+                f'If {json_path} password ' +
+                'as key does not exist in the directory, ' +
+                'it must be given.'
+            )
+            sys.exit(msg)
+
+    news = NewsSync(api_key, dir_path + '/news.sqlite')
+    print(f'{news.sync_market(args.category)} new {args.category} news')
+    if args.symbol:
+        print(news.sync_companies(args.symbol))
+    print(PrintTibble(news.to_dataframe()[['datetime', 'source', 'headline']]))
+    news.close()
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.finnhub.news_sync
+    # python -m apys.finnhub.news_sync AAPL MSFT -c crypto
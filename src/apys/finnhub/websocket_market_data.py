@@ -7,6 +7,7 @@ Require package:
 """
 
 import argparse
+import atexit
 import datetime as dt
 import inspect
 import json
@@ -18,10 +19,15 @@ import time
 
 import pandas as pd
 
+from ..utils.bar_builder import BarBuilder
 from ..utils.handling_files import HandlingFiles
 from ..utils.pydyverse import PrintTibble
+from ..utils.quote_board import SharedQuoteBoard
+from ..utils.stream_stats import (CRYPTO_SECONDS_PER_YEAR, STATS_COLUMNS,
+                                  US_SECONDS_PER_YEAR, StreamStats)
 import websocket
 
+BOARD_COLUMNS = ["last_price", "timestamp", "volume"]
 
 # --------------------------------------------------
 @dataclass
@@ -33,6 +39,15 @@ class WebsocketMarketData(HandlingFiles):
     api_key: str
     tickers: list = None
     print_console: bool = False
+    trace: bool = False
+    publish: str = None
+    board_capacity: int = 1000
+    stats_halflife: float = None
+    seconds_per_year: float = US_SECONDS_PER_YEAR
+    bars_path: str = None
+    board: SharedQuoteBoard = field(init=False, repr=False, default=None)
+    stats: StreamStats = field(init=False, repr=False, default=None)
+    bars: BarBuilder = field(init=False, repr=False, default=None)
     ws: websocket = field(init=False, repr=False)
     df: pd.DataFrame = field(init=False, repr=False)
 
@@ -49,7 +64,7 @@ class WebsocketMarketData(HandlingFiles):
     #     sys.exit(0)
 
     def initialize(self):
-        websocket.enableTrace(True)
+        websocket.enableTrace(self.trace)
         self.ws = websocket.WebSocketApp(
             "wss://ws.finnhub.io?token=" + self.api_key,
             on_message = self.on_message,
@@ -66,6 +81,49 @@ class WebsocketMarketData(HandlingFiles):
         )
         self.df = self.df.fillna(0)
         self.df.index.name = "symbol"
+        if self.publish != None:
+            self.publish_board(self.publish)
+        if self.stats_halflife != None:
+            self.init_stats(self.stats_halflife)
+        if self.bars_path != None:
+            self.init_bars(self.bars_path)
+
+    def init_stats(self, halflife:float) -> StreamStats:
+        """
+        Per symbol EMA, VWAP and realized volatility of the trades.
+        Published as <publish>_stats when publish is set.
+        """
+        board = None
+        if self.publish != None:
+            board = SharedQuoteBoard.create(
+                STATS_COLUMNS, max(self.board_capacity, len(self.tickers)),
+                name=self.publish + '_stats')
+            atexit.register(board.close)
+        self.stats = StreamStats(
+            self.tickers, halflife=halflife,
+            seconds_per_year=self.seconds_per_year, board=board)
+        return self.stats
+
+    def init_bars(self, sql_path:str, intervals:list = ('1s', '1m', '5m')) -> BarBuilder:
+        """
+        1s/1m/5m OHLCV bars of the trades, appended in batches to the
+        symbol_bars table of sql_path
+        """
+        self.bars = BarBuilder(intervals, market='finnhub', sql_path=sql_path)
+        atexit.register(self.bars.close)
+        return self.bars
+
+    def publish_board(self, name:str) -> SharedQuoteBoard:
+        """
+        Publish last trades into a shared memory board so other local
+        processes can read them without a new connection:
+            python -m apys.utils.quote_board <name>
+        """
+        self.board = SharedQuoteBoard.create(
+            BOARD_COLUMNS, max(self.board_capacity, len(self.tickers)), name=name)
+        atexit.register(self.board.close)
+        self._board_rows = self.board.add_symbols(self.tickers)
+        return self.board
 
     def startWebSocket(self):
         # Create a thread and target it to the run_forever function, then start it.
@@ -97,6 +155,22 @@ class WebsocketMarketData(HandlingFiles):
             self.df.loc[data_dict.get('s'), 'last_price']  = data_dict.get('p')
             self.df.loc[data_dict.get('s'), 'datetime']  = dt.datetime.utcfromtimestamp(data_dict.get('t') / 1000.0)
             self.df.loc[data_dict.get('s'), 'volume']  = data_dict.get('v')
+            if self.board is not None:
+                row = self._board_rows.get(data_dict.get('s'))
+                if row is not None:
+                    self.board.update(row, [
+                        data_dict.get('p'), data_dict.get('t') / 1000.0, data_dict.get('v')
+                    ])
+            if self.stats is not None:
+                self.stats.update(
+                    data_dict.get('s'), data_dict.get('t') / 1000.0,
+                    price=data_dict.get('p'), volume=data_dict.get('v')
+                )
+            if self.bars is not None:
+                self.bars.update(
+                    data_dict.get('s'), data_dict.get('t') / 1000.0,
+                    data_dict.get('p'), volume=data_dict.get('v')
+                )
         # if self.print_console:
         #     self.printTibble()
 
@@ -108,6 +182,8 @@ class WebsocketMarketData(HandlingFiles):
             time.sleep(seconds_to_update)
             if self.print_console:
                 self.printTibble()
+                if self.stats is not None:
+                    self.printTibble(self.stats.to_dataframe())
     
     def printTibble(self, data = None):
         if data is None:
@@ -132,6 +208,32 @@ def getArgs():
     parser.add_argument('--no-print', dest='print', action='store_false')
     parser.set_defaults(print=False)
 
+    parser.add_argument(
+        '--publish', 
+        metavar = 'publish',
+        default = None,
+        type=str,
+        help = "Shared memory name to publish the quote board")
+
+    parser.add_argument(
+        '-s', '--stats', 
+        metavar = 'halflife',
+        default = None,
+        type=float,
+        help = "Keep streaming stats with this halflife in seconds")
+
+    parser.add_argument(
+        '-b', '--bars', 
+        metavar = 'sql_path',
+        default = None,
+        type=str,
+        help = "Build 1s/1m/5m bars and append them to this sqlite DB")
+
+    parser.add_argument(
+        '-c', '--crypto',
+        action='store_true',
+        help = "Annualize the stats volatility over 24/7 trading")
+
     parser.add_argument(
         '-t', '--tickers',
         nargs='*', 
@@ -153,7 +255,12 @@ def main():
         finnhub = WebsocketMarketData(
             api_key = args.password,
             tickers=args.tickers,
-            print_console=args.print
+            print_console=args.print,
+            publish=args.publish,
+            stats_halflife=args.stats,
+            seconds_per_year=(
+                CRYPTO_SECONDS_PER_YEAR if args.crypto else US_SECONDS_PER_YEAR),
+            bars_path=args.bars
         )
     else:
         if os.path.isfile(json_path):
@@ -162,7 +269,12 @@ def main():
                 finnhub = WebsocketMarketData(
                     api_key = data_json['password'],
                     tickers=args.tickers,
-                    print_console=args.print
+                    print_console=args.print,
+                    publish=args.publish,
+                    stats_halflife=args.stats,
+                    seconds_per_year=(
+                        CRYPTO_SECONDS_PER_YEAR if args.crypto else US_SECONDS_PER_YEAR),
+                    bars_path=args.bars
                 )
             json_file.close()
         else:
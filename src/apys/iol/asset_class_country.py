@@ -16,6 +16,8 @@ import requests
 from datar import dplyr, f
 
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
+from ..utils.snapshot_store import SnapshotStore
 from ..utils.sql_utils import SQLUtils
 from .connect import IOL
 from ..models.iol_model import IOLModel
@@ -26,10 +28,16 @@ class AssetClassCountry(SQLUtils):
     """
     Get available instruments by country from IOL
     :param IOL must be initialized first
+    :param snapshot_path: sqlite snapshot store. The catalog is only
+    requested to IOL when the latest snapshot is not from today.
+    Defaults to snapshots.sqlite next to this module.
     """
     iol: IOL
     country: str #argentina o estados_Unidos
-    response: requests.Response = field(init=False, repr=False)
+    snapshot_path: str = None
+    refresh: bool = False
+    response: requests.Response = field(init=False, repr=False, default=None)
+    data: list = field(init=False, repr=False)
     df: pd.DataFrame = field(init=False, repr=False)
     _TABLE_NAME:str = field(init=False, repr=False, default='asset_class_country')
     _INDEX_COL:str = field(init=False, repr=False, default='')
@@ -37,10 +45,21 @@ class AssetClassCountry(SQLUtils):
     _SQL_MODEL:IOLModel = field(init=False, repr=False, default=IOLModel)
 
     def __post_init__(self):
+        if self.snapshot_path == None:
+            dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+            self.snapshot_path = dir_path + '/snapshots.sqlite'
         self.get_data()
-        self.to_dataframe()
 
     def get_data(self):
+        """Get today's snapshot or the response from IOL"""
+        store = SnapshotStore(self.snapshot_path)
+        self.data = store.get(
+            f'asset_class_country_{self.country}', self.download,
+            key=['instrumento', 'pais'], refresh=self.refresh, print_diff=True
+        )
+        self.to_dataframe()
+
+    def download(self) -> list:
         """Get response from IOL"""
         self.iol.update_token()
         h = {
@@ -51,11 +70,11 @@ class AssetClassCountry(SQLUtils):
         )
 
         self.response = self.iol.get(URL, headers = h)
-        self.to_dataframe()
+        return self.response.json()
 
     def to_dataframe(self):
         """Transform to Pandas DataFrame"""
-        df = pd.DataFrame(self.response.json())
+        df = pd.DataFrame(self.data, columns=['instrumento', 'pais'])
         # Index(['instrumento', 'pais'], dtype='object')
 
         df = df >> \
@@ -64,7 +83,7 @@ class AssetClassCountry(SQLUtils):
                 country = f.pais
             )
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
@@ -17,6 +17,7 @@ from datar import dplyr, f
 
 from ..models.iol_model import IOLModel
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.sql_utils import SQLUtils
 from .connect import IOL
 
@@ -94,7 +95,7 @@ class FCIInfo(SQLUtils):
                 bloomberg = f.codigoBloomberg
             )
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
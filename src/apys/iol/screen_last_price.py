@@ -17,6 +17,7 @@ from datar import dplyr, f, tidyr
 
 from ..models.iol_model import IOLModel
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.sql_utils import SQLUtils
 from .connect import IOL
 
@@ -113,7 +114,7 @@ class ScreenLastPrice(SQLUtils):
         # Drop duplicated rows by symbol if any
         df = df.drop_duplicates(subset=['symbol'])
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
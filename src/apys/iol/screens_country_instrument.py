@@ -18,6 +18,7 @@ from datar import dplyr, f
 
 from ..models.iol_model import IOLModel
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.sql_utils import SQLUtils
 from .connect import IOL
 
@@ -73,7 +74,7 @@ class ScreensForCountryInstruments(SQLUtils):
                     screen = f.panel
                 )
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
@@ -17,6 +17,7 @@ import requests
 from datar import base, dplyr, f, tidyr
 
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.validation import valid_date
 from ..utils.sql_utils import SQLUtils
 from ..models.iol_model import IOLModel
@@ -126,7 +127,7 @@ class SymbolDaily(SQLUtils):
             df['date'], format='%Y-%m-%d'
         )
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
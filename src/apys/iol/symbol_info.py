@@ -16,6 +16,7 @@ import requests
 from datar import dplyr, f
 
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.sql_utils import SQLUtils
 from ..models.iol_model import IOLModel
 from .connect import IOL
@@ -74,7 +75,7 @@ class SymbolInfo(SQLUtils):
                 currency = f.moneda
             )
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
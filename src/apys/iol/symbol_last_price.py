@@ -16,6 +16,7 @@ import pandas as pd
 import requests
 
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.sql_utils import SQLUtils
 from ..models.iol_model import IOLModel
 from .connect import IOL
@@ -114,7 +115,7 @@ class SymbolLastPrice(SQLUtils):
             df['date_time'], format='%Y-%m-%dT%H:%M:%S'
         )
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
@@ -17,6 +17,7 @@ import pandas as pd
 import requests
 
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from ..utils.sql_utils import SQLUtils
 from ..models.iol_model import IOLModel
 from .connect import IOL
@@ -166,7 +167,7 @@ class SymbolOptions(SQLUtils):
 
         #df = df.set_index('symbol')
 
-        self.df = (df) 
+        self.df = apply_schema(df)
         return self.df
 
     def print_tibble(self):
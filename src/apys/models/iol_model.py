@@ -86,6 +86,22 @@ class IOLModel:
             Column('vol', Numeric(12,2)),
         )
 
+        self.symbol_bars = Table(
+            'symbol_bars', self.metadata,
+            Column('id', Integer(), primary_key=True, autoincrement = True),
+            Column('symbol', String(50), nullable=False),
+            Column('market', String(20), nullable=False),
+            Column('interval', String(5), nullable=False),
+            Column('date', DateTime()),
+            Column('open', Numeric(12,2)),
+            Column('high', Numeric(12,2)),
+            Column('low', Numeric(12,2)),
+            Column('close', Numeric(12,2)),
+            Column('vol', Numeric(12,2)),
+            Column('amount', Numeric(16,2)),
+            Column('ticks', Integer()),
+        )
+
         self.symbol_info = Table(
             'symbol_info', self.metadata,
             Column('symbol', String(20), primary_key=True, unique=True, nullable=False),
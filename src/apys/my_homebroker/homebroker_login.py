@@ -18,6 +18,10 @@ from dataclasses import dataclass, field
 import pandas as pd
 from pyhomebroker import HomeBroker
 
+from .options_surface import OptionsSurface
+from .quote_block import QuoteBlock
+from .repo_curve import RepoCurve
+
 # --------------------------------------------------
 @dataclass
 class HomeBrokerLogin():
@@ -29,6 +33,10 @@ class HomeBrokerLogin():
     user: str = field(init=True, repr=False)
     password: str = field(init=True, repr=False)
     hb: HomeBroker = field(init=False, repr=True)
+    securities_block: QuoteBlock = field(init=False, repr=False, default=None)
+    options_block: QuoteBlock = field(init=False, repr=False, default=None)
+    repo_curve: RepoCurve = field(init=False, repr=False, default=None)
+    options_surface: OptionsSurface = field(init=False, repr=False, default=None)
 
     # --------------------------------------------------
     def __post_init__(self):
@@ -52,13 +60,10 @@ class HomeBrokerLogin():
         Event triggered when a new quote is received 
         from the options board
         """
-        thisData = quotes
-        thisData = thisData.drop(['expiration', 'strike', 'kind'], axis=1)
-        thisData['change'] = thisData["change"] / 100
-        thisData['datetime'] = pd.to_datetime(thisData['datetime'])
-        #thisData = thisData.rename(columns={"bid_size": "bidsize", "ask_size": "asksize"})
-        self.options.update(thisData)
-        #self.securities.update(thisData)
+        if self.options_block is not None:
+            self.options_block.apply(quotes)
+        if self.options_surface is not None:
+            self.options_surface.apply(quotes)
 
     # --------------------------------------------------
     def on_securities(self, online, quotes):
@@ -66,15 +71,10 @@ class HomeBrokerLogin():
         Event triggered when a new quote is received from 
         any of the supported security boards (NOT options)
         """
-        #print(quotes)
-        thisData = quotes
-        thisData = thisData.reset_index()
-        thisData['symbol'] = thisData['symbol'] + ' - ' +  thisData['settlement']
-        thisData = thisData.drop(["settlement"], axis=1)
-        thisData = thisData.set_index("symbol")
-        thisData['change'] = thisData["change"] / 100
-        thisData['datetime'] = pd.to_datetime(thisData['datetime'])
-        self.securities.update(thisData)
+        if self.securities_block is not None:
+            self.securities_block.apply(quotes)
+        if self.options_surface is not None:
+            self.options_surface.apply_securities(quotes)
 
     # --------------------------------------------------
     def on_repos(self, online, quotes):
@@ -82,21 +82,8 @@ class HomeBrokerLogin():
         Event triggered when a new quote is received 
         from the repos board (a.k.a 'cauciones')
         """
-        pass
-        # global cauciones
-        # thisData = quotes
-        # thisData = thisData.reset_index()
-        # thisData = thisData.set_index("symbol")
-        # thisData = thisData[['PESOS' in s for s in quotes.index]]
-        # thisData = thisData.reset_index()
-        # thisData['settlement'] = pd.to_datetime(thisData['settlement'])
-        # thisData = thisData.set_index("settlement")
-        # thisData['last'] = thisData["last"] / 100
-        # thisData['bid_rate'] = thisData["bid_rate"] / 100
-        # thisData['ask_rate'] = thisData["ask_rate"] / 100
-        # thisData = thisData.drop(['open', 'high', 'low', 'volume', 'operations', 'datetime'], axis=1)
-        # thisData = thisData[['last', 'turnover', 'bid_amount', 'bid_rate', 'ask_rate', 'ask_amount']]
-        # cauciones.update(thisData)
+        if self.repo_curve is not None:
+            self.repo_curve.apply(quotes)
 
     # --------------------------------------------------
     def on_error(self, online, error):
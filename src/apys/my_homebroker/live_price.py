@@ -11,6 +11,7 @@ Require package:
 """
 
 import argparse
+import atexit
 import inspect
 import json
 import os
@@ -20,90 +21,185 @@ from dataclasses import dataclass, field
 
 import pandas as pd
 from .homebroker_login import HomeBrokerLogin
+from .options_surface import OptionsSurface
+from .quote_block import QUOTE_COLUMNS, QuoteBlock
+from .repo_curve import RepoCurve
 
 from ..utils.pydyverse import PrintTibble
+from ..utils.quote_board import SharedQuoteBoard
 
 # --------------------------------------------------
 @dataclass
 class LivePrice(HomeBrokerLogin):
     """
     Get constant datafrom HomeBroker
+    :param surface: keep a live implied volatility surface of the
+    whole options board. Spots come from symbols_security, so the
+    underlyings must be subscribed there.
+    :param rate: risk free rate used by the surface
+    :param repos: subscribe the repo board and keep the repo curve
+    :param board_capacity: rows of the published board, so securities
+    and options can be subscribed again with more symbols
     """
     symbols_security: list = None
     symbols_option: list = None
-    securities: pd.DataFrame = field(init=False, repr=False)
-    options: pd.DataFrame = field(init=False, repr=False)
+    settlements: list = field(default_factory=lambda: ['48hs', '24hs', 'spot'])
+    boards: dict = None
+    repos: bool = True
+    surface: bool = False
+    rate: float = 0.0
+    publish: str = None
+    board_capacity: int = 1000
+    board: SharedQuoteBoard = field(init=False, repr=False, default=None)
+    _snapshot: dict = field(init=False, repr=False, default=None)
+    ALL_BOARDS = [
+        'bluechips', 'general_board', 'cedears', 'government_bonds',
+        'short_term_government_bonds', 'corporate_bonds'
+    ]
 
     # --------------------------------------------------
     def __post_init__(self):
+        self.settlements = [s.lower() for s in self.settlements]
         self.login()
         if self.symbols_security != None:
             self.init_securities(self.symbols_security)
         if self.symbols_option != None:
             self.init_options(self.symbols_option)
-        if self.symbols_security != None or self.symbols_option != None:
+        if self.repos:
+            self.repo_curve = RepoCurve()
+        if self.surface:
+            self.options_surface = OptionsSurface(
+                rate=self.rate, settlement=self.settlements[0])
+        if self.publish != None:
+            self.publish_board(self.publish)
+        # Repos alone don't start the loop, call get_data() for them
+        if (self.symbols_security != None or self.symbols_option != None
+                or self.surface):
             self.get_data()
 
     # --------------------------------------------------
     def init_securities(self, symbols:list) -> pd.DataFrame:
-        settlement = [' - 48hs', ' - 24hs', ' - spot']
-        symbols_settlement = [x + y for x in symbols for y in settlement]
-        df = pd.DataFrame(
-            {'symbol' : symbols_settlement},
-            columns=[
-                "symbol", "bid_size", "bid", "ask", "ask_size", "last",
-                "change", "open", "high", "low", "previous_close", 
-                "turnover", "volume", 'operations', 'datetime'
-            ])
-        df = df.set_index('symbol')
-        self.securities = df
+        keys = [(x, y) for x in symbols for y in self.settlements]
+        old = self.securities_block
+        self.securities_block = QuoteBlock(
+            labels = [x + ' - ' + y for x, y in keys], keys = keys
+        )
+        self._republish(old, self.securities_block)
+        return self.securities
 
     # --------------------------------------------------
     def init_options(self, symbols:list) -> pd.DataFrame:
-        df = pd.DataFrame(
-            {'symbol' : symbols},
-            columns=[
-                "symbol", "bid_size", "bid", "ask", "ask_size", "last",
-                "change", "open", "high", "low", "previous_close", 
-                "turnover", "volume", 'operations', 'datetime'
-            ])
-        df = df.set_index('symbol')
-        self.options = df
-        # if self.symbols_security != None:
-        #     self.securities = pd.concat([self.securities, self.options])
-        # else:
-        #     self.securities = self.options
-        
+        old = self.options_block
+        self.options_block = QuoteBlock(labels = symbols, keys = symbols)
+        self._republish(old, self.options_block)
+        return self.options
+
+    def _republish(self, old:QuoteBlock, new:QuoteBlock):
+        """Swap a replaced block's rows in the published board"""
+        if self.board is None:
+            return
+        if old is not None:
+            labels = set(new.labels)
+            self.board.remove_symbols(
+                [label for label in old.labels if label not in labels])
+        new.publish(self.board)
+
+    # --------------------------------------------------
+    def publish_board(self, name:str) -> SharedQuoteBoard:
+        """
+        Publish securities and options into a shared memory board so
+        other local processes can read them without a new connection:
+            python -m apys.utils.quote_board <name>
+        """
+        blocks = [b for b in [self.securities_block, self.options_block] if b is not None]
+        self.board = SharedQuoteBoard.create(
+            QUOTE_COLUMNS + ['datetime'],
+            max(self.board_capacity, sum(len(b.labels) for b in blocks)), name=name)
+        atexit.register(self.board.close)
+        for block in blocks:
+            block.publish(self.board)
+        return self.board
+
+    # --------------------------------------------------
+    @property
+    def securities(self) -> pd.DataFrame:
+        if self.securities_block is None:
+            return None
+        return self.securities_block.to_frame()
+
+    # --------------------------------------------------
+    @property
+    def options(self) -> pd.DataFrame:
+        if self.options_block is None:
+            return None
+        return self.options_block.to_frame()
+
+    # --------------------------------------------------
+    @property
+    def repos_curve(self) -> pd.DataFrame:
+        """Pesos repo term structure keyed by settlement date"""
+        if self.repo_curve is None:
+            return None
+        return self.repo_curve.to_frame('PESOS')
+
+    # --------------------------------------------------
+    def resolve_boards(self, symbols:list) -> dict:
+        """
+        Board of each symbol. Symbols missing in self.boards are looked
+        up in the board snapshots, one request per board, stopping as
+        soon as every symbol is found.
+        """
+        if self.boards is None:
+            self.boards = {}
+        missing = set(symbols) - set(self.boards)
+        for board in self.ALL_BOARDS:
+            if not missing:
+                break
+            found = missing & self.board_symbols(board, self.settlements[0])
+            for symbol in found:
+                self.boards[symbol] = board
+            missing -= found
+        if missing:
+            print(f"Symbols not found in any board: {sorted(missing)}")
+        return {s: self.boards[s] for s in symbols if s in self.boards}
+
+    # --------------------------------------------------
+    def board_symbols(self, board:str, settlement:str) -> set:
+        """
+        Symbols listed in board. pyhomebroker has no public call for a
+        single board, so its private scrapper is tried first. If that
+        changes, the public get_market_snapshot (every board at once)
+        is used instead.
+        """
+        online = self.hb.online
+        try:
+            df = online._scrapping.get_securities(
+                online.get_board_for_request(board),
+                online.get_settlement_for_request(settlement))
+        except (AttributeError, TypeError):
+            if self._snapshot is None:
+                self._snapshot = online.get_market_snapshot()
+            df = self._snapshot[board]
+        return set(df.index.get_level_values('symbol'))
+
+    # --------------------------------------------------
+    def plan_subscriptions(self) -> list:
+        """(board, settlement) pairs needed by the requested symbols"""
+        if self.symbols_security == None:
+            return []
+        boards = set(self.resolve_boards(self.symbols_security).values())
+        return sorted(
+            (board, settlement)
+            for board in boards for settlement in self.settlements
+        )
 
     # --------------------------------------------------
     def get_data(self):
 
         self.hb.online.connect()
         
-        if self.symbols_option != None:
+        if self.symbols_option != None or self.surface:
             self.hb.online.subscribe_options()
-        
-        if self.symbols_security != None:
-            self.hb.online.subscribe_securities('bluechips', '48hs')
-            self.hb.online.subscribe_securities('bluechips', '24hs')
-            self.hb.online.subscribe_securities('bluechips', 'SPOT')
-            self.hb.online.subscribe_securities('government_bonds', '48hs')
-            # self.hb.online.subscribe_securities('government_bonds', '24hs')
-            self.hb.online.subscribe_securities('government_bonds', 'SPOT')
-            self.hb.online.subscribe_securities('cedears', '48hs')
-            # self.hb.online.subscribe_securities('cedears', '24hs')
-            # self.hb.online.subscribe_securities('cedears', 'SPOT')
-            self.hb.online.subscribe_securities('general_board', '48hs')
-            # self.hb.online.subscribe_securities('general_board', '24hs')
-            # self.hb.online.subscribe_securities('general_board', 'SPOT')
-            self.hb.online.subscribe_securities('short_term_government_bonds', '48hs')
-            # self.hb.online.subscribe_securities('short_term_government_bonds', '24hs')
-            # self.hb.online.subscribe_securities('short_term_government_bonds', 'SPOT')
-            self.hb.online.subscribe_securities('corporate_bonds', '48hs')
-            # self.hb.online.subscribe_securities('corporate_bonds', '24hs')
-            # self.hb.online.subscribe_securities('corporate_bonds', 'SPOT')
-        
-        self.hb.online.subscribe_repos()
 
         # Referencias:
 
@@ -112,6 +208,11 @@ class LivePrice(HomeBrokerLogin):
         # general_board = Acciones del Panel General
         # short_term_government_bonds = Letras
         # corporate_bonds = Obligaciones Negociables
+        for board, settlement in self.plan_subscriptions():
+            self.hb.online.subscribe_securities(board, settlement)
+
+        if self.repos:
+            self.hb.online.subscribe_repos()
 
         while True:
             try:
@@ -121,20 +222,19 @@ class LivePrice(HomeBrokerLogin):
                 print('Hubo un ERROR')
 
     # --------------------------------------------------
-    def print_tibble(self):
-        print(PrintTibble(self.options))
-
-    # # Cauciones
-    # i = 1
-    # fechas = []
-    # while i < 31:
-    #     fecha = date.today() + timedelta(days=i)
-    #     fechas.extend([fecha])
-    #     i += 1
+    # --------------------------------------------------
+    @property
+    def iv_surface(self) -> pd.DataFrame:
+        """Implied volatility by expiration and moneyness"""
+        if self.options_surface is None:
+            return None
+        return self.options_surface.surface()
 
-    # cauciones = pd.DataFrame({'settlement':fechas}, columns=['settlement','last', 'turnover', 'bid_amount', 'bid_rate', 'ask_rate', 'ask_amount'])
-    # cauciones['settlement'] = pd.to_datetime(cauciones['settlement'])
-    # cauciones = cauciones.set_index('settlement')
+    # --------------------------------------------------
+    def print_tibble(self):
+        for df in [self.securities, self.options, self.repos_curve, self.iv_surface]:
+            if df is not None:
+                print(PrintTibble(df))
 
 # --------------------------------------------------
 def get_args():
@@ -159,6 +259,36 @@ def get_args():
         type=str,
         help = "List of options to get live price")
 
+    parser.add_argument(
+        '-t', '--settlements', 
+        metavar = 'settlements',
+        nargs='*',
+        default = ['48hs', '24hs', 'spot'],
+        type=str,
+        help = "Settlements to subscribe for securities")
+
+    parser.add_argument(
+        '--publish', 
+        metavar = 'publish',
+        default = None,
+        type=str,
+        help = "Shared memory name to publish the quote board")
+
+    parser.add_argument('--surface', action='store_true')
+    parser.add_argument('--no-surface', dest='surface', action='store_false')
+    parser.set_defaults(surface=False)
+
+    parser.add_argument(
+        '-r', '--rate', 
+        metavar = 'rate',
+        default = 0.0,
+        type=float,
+        help = "Risk free rate for implied volatility")
+
+    parser.add_argument('--repos', action='store_true')
+    parser.add_argument('--no-repos', dest='repos', action='store_false')
+    parser.set_defaults(repos=True)
+
     parser.add_argument(
         '-i', '--id_broker', 
         metavar = 'id_broker',
@@ -222,7 +352,12 @@ def main():
         id_broker = id_broker, dni = dni, 
         user = user, password = password,
         symbols_security = args.securities,
-        symbols_option = args.options
+        symbols_option = args.options,
+        settlements = args.settlements,
+        repos = args.repos,
+        surface = args.surface,
+        rate = args.rate,
+        publish = args.publish
     )
 
     # live_price.get_data()
@@ -237,4 +372,7 @@ def main():
 if __name__ == '__main__':
     main()
     # From apys.src
-    # python -m apys.my_homebroker.live_price -s GGAL COME -o GFGC440.AB
\ No newline at end of file
+    # python -m apys.my_homebroker.live_price -s GGAL COME -o GFGC440.AB
+    # python -m apys.my_homebroker.live_price -s GGAL -t 48hs --repos
+    # python -m apys.my_homebroker.live_price -s GGAL COME --publish live_price
+    # python -m apys.my_homebroker.live_price -s GGAL YPFD -t 24hs --surface
\ No newline at end of file
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://github.com/crapher/pyhomebroker
+Purpose: Live implied volatility surface fed by the HomeBroker
+    options board. Options keep their expiration, strike and kind in a
+    columnar chain; every callback only reprices the options whose
+    price changed, and the expiry x moneyness grid is updated by
+    removing and adding back the contribution of those options.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ..utils.options_chain import OptionsChain, option_prices
+
+MONEYNESS_BINS = np.round(np.arange(0.7, 1.3001, 0.05), 2)
+
+
+# --------------------------------------------------
+class OptionsSurface():
+    """
+    Implied volatility grid: one row per (underlying, expiration),
+    one column per moneyness (strike / spot) bin. Cells hold the mean
+    IV of the options closest to that bin.
+    :param underlyings: maps the options board underlying_asset to
+    the security symbol whose price is the spot (identity by default)
+    :param settlement: settlement of the security used as spot
+    """
+
+    def __init__(self, underlyings:dict = None, rate:float = 0.0,
+                 moneyness_bins:np.ndarray = MONEYNESS_BINS,
+                 settlement:str = '24hs'):
+        self.underlyings = underlyings or {}
+        self.settlement = settlement
+        self.chain = OptionsChain(rate=rate)
+        self.positions = {}
+        self.spots = {}
+        self.bins = np.asarray(moneyness_bins, dtype=float)
+        self._edges = (self.bins[1:] + self.bins[:-1]) / 2
+        self.rows = {}
+        self._cell = np.empty(0, dtype=np.int64)
+        self._iv = np.empty(0)
+        self._sum = np.empty(0)
+        self._count = np.empty(0, dtype=np.int64)
+
+    # --------------------------------------------------
+    def add_options(self, quotes:pd.DataFrame) -> np.ndarray:
+        """Append the options not seen before"""
+        chain = pd.DataFrame({
+            'underlying': [self.underlyings.get(u, u) for u in quotes['underlying_asset']],
+            'kind': quotes['kind'].to_numpy(),
+            # BYMA options expire at the close of the expiration day
+            'expiration': pd.to_datetime(quotes['expiration']) + pd.Timedelta(hours=17),
+            'strike': quotes['strike'].to_numpy(dtype=float),
+            'price': np.nan,
+        }, index=quotes.index)
+        positions = self.chain.append(chain)
+        for symbol, position in zip(quotes.index, positions):
+            self.positions[symbol] = position
+        self.chain.spot[positions] = [
+            self.spots.get(u, np.nan) for u in self.chain.underlying[positions]]
+        self._cell = np.concatenate([self._cell, np.full(len(positions), -1)])
+        self._iv = np.concatenate([self._iv, np.full(len(positions), np.nan)])
+        for key in zip(self.chain.underlying[positions], self.chain.expiration[positions]):
+            if key not in self.rows:
+                self.rows[key] = len(self.rows)
+        n_cells = len(self.rows) * len(self.bins)
+        self._sum = np.concatenate([self._sum, np.zeros(n_cells - len(self._sum))])
+        self._count = np.concatenate([self._count, np.zeros(n_cells - len(self._count), dtype=np.int64)])
+        return positions
+
+    # --------------------------------------------------
+    def apply(self, quotes:pd.DataFrame) -> np.ndarray:
+        """Options board callback. Returns the positions repriced"""
+        quotes = quotes[~quotes.index.duplicated(keep='last')]
+        new = [s for s in quotes.index if s not in self.positions]
+        if new:
+            self.add_options(quotes.loc[new])
+        positions = np.fromiter(
+            (self.positions[s] for s in quotes.index), dtype=np.int64, count=len(quotes))
+        prices = option_prices(quotes)
+        old = self.chain.price[positions]
+        changed = ~((prices == old) | (np.isnan(prices) & np.isnan(old)))
+        positions = positions[changed]
+        self.chain.price[positions] = prices[changed]
+        return self.recompute(positions)
+
+    # --------------------------------------------------
+    def set_spot(self, underlying:str, price:float) -> np.ndarray:
+        """New spot reprices every option of that underlying"""
+        if not price > 0 or self.spots.get(underlying) == price:
+            return np.empty(0, dtype=np.int64)
+        self.spots[underlying] = price
+        positions = np.flatnonzero(self.chain.underlying == underlying)
+        self.chain.spot[positions] = price
+        return self.recompute(positions)
+
+    # --------------------------------------------------
+    def apply_securities(self, quotes:pd.DataFrame):
+        """Securities board callback. Takes the last price of the underlyings"""
+        if quotes.empty:
+            return
+        settlements = quotes.index.get_level_values('settlement')
+        underlyings = set(self.chain.underlying)
+        for (symbol, _), last in quotes.loc[settlements == self.settlement, 'last'].items():
+            if symbol in underlyings:
+                self.set_spot(symbol, last)
+
+    # --------------------------------------------------
+    def recompute(self, positions:np.ndarray, now:pd.Timestamp = None) -> np.ndarray:
+        """Reprice positions and move their contribution in the grid"""
+        if len(positions) == 0:
+            return positions
+        self._remove(positions)
+        self.chain.update(now=now, positions=positions)
+        self._add(positions)
+        return positions
+
+    # --------------------------------------------------
+    def _remove(self, positions:np.ndarray):
+        cells = self._cell[positions]
+        mask = cells >= 0
+        np.subtract.at(self._sum, cells[mask], self._iv[positions][mask])
+        np.subtract.at(self._count, cells[mask], 1)
+
+    def _add(self, positions:np.ndarray):
+        iv = self.chain.iv[positions]
+        moneyness = self.chain.strike[positions] / self.chain.spot[positions]
+        in_range = (
+            np.isfinite(iv) & np.isfinite(moneyness)
+            & (moneyness >= 1.5 * self.bins[0] - 0.5 * self.bins[1])
+            & (moneyness <= 1.5 * self.bins[-1] - 0.5 * self.bins[-2])
+        )
+        rows = np.fromiter(
+            (self.rows[key] for key in zip(
+                self.chain.underlying[positions], self.chain.expiration[positions])),
+            dtype=np.int64, count=len(positions))
+        cells = np.where(
+            in_range,
+            rows * len(self.bins) + np.searchsorted(self._edges, moneyness), -1)
+        self._cell[positions] = cells
+        self._iv[positions] = iv
+        np.add.at(self._sum, cells[in_range], iv[in_range])
+        np.add.at(self._count, cells[in_range], 1)
+
+    # --------------------------------------------------
+    def surface(self, underlying:str = None) -> pd.DataFrame:
+        """Mean IV per (underlying, expiration) and moneyness bin"""
+        if not self.rows:
+            return pd.DataFrame(columns=pd.Index(self.bins, name='moneyness'))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            grid = (self._sum / self._count).reshape(len(self.rows), len(self.bins))
+        df = pd.DataFrame(
+            grid,
+            index=pd.MultiIndex.from_tuples(
+                list(self.rows), names=['underlying', 'expiration']),
+            columns=pd.Index(self.bins, name='moneyness'),
+        ).sort_index()
+        if underlying is not None:
+            df = df.xs(underlying, level='underlying')
+        return df
+
+    # --------------------------------------------------
+    def to_frame(self) -> pd.DataFrame:
+        """Chain with implied volatility and greeks"""
+        return self.chain.to_frame()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://github.com/crapher/pyhomebroker
+Purpose: NumPy backed quote board for HomeBroker callbacks.
+    Rows are located through a precomputed key → position index and
+    quotes are written in place, so a callback never reindexes the
+    board nor reparses timestamps it has already seen.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ..utils.quote_board import SharedQuoteBoard
+
+QUOTE_COLUMNS = [
+    "bid_size", "bid", "ask", "ask_size", "last",
+    "change", "open", "high", "low", "previous_close",
+    "turnover", "volume", 'operations'
+]
+
+
+# --------------------------------------------------
+class QuoteBlock():
+    """
+    Board of float64 quotes plus a datetime64 column.
+    :param labels: row labels shown in the DataFrame
+    :param keys: index values pyhomebroker uses for the same rows
+    (tuples (symbol, settlement) for securities, symbols for options)
+    """
+
+    MAX_CACHED_DATETIMES = 100000
+
+    def __init__(self, labels:list, keys:list, columns:list = QUOTE_COLUMNS,
+                 index_name:str = 'symbol'):
+        self.labels = pd.Index(labels, name=index_name)
+        if keys and isinstance(keys[0], tuple):
+            self.keys = pd.MultiIndex.from_tuples(keys)
+        else:
+            self.keys = pd.Index(keys)
+        self.columns = list(columns)
+        self.values = np.full((len(labels), len(columns)), np.nan)
+        self.datetime = np.full(len(labels), np.datetime64('NaT'), dtype='datetime64[ns]')
+        self._change_col = self.columns.index('change') if 'change' in self.columns else None
+        self._datetime_cache = {}
+        self.board = None
+        self._board_rows = None
+
+    # --------------------------------------------------
+    def publish(self, board:SharedQuoteBoard):
+        """
+        Mirror every update into a shared memory board whose columns
+        are self.columns plus 'datetime' (epoch seconds)
+        """
+        rows = board.add_symbols(list(self.labels))
+        self._board_rows = np.array([rows[label] for label in self.labels])
+        self.board = board
+
+    # --------------------------------------------------
+    def positions(self, index:pd.Index) -> np.ndarray:
+        """Board position of every quote (-1 for unknown keys)"""
+        return self.keys.get_indexer(index)
+
+    # --------------------------------------------------
+    def apply(self, quotes:pd.DataFrame) -> np.ndarray:
+        """Write quotes in place. Returns the positions updated"""
+        pos = self.positions(quotes.index)
+        mask = pos >= 0
+        if not mask.any():
+            return pos[mask]
+        pos = pos[mask]
+        values = quotes[self.columns].to_numpy(dtype=np.float64)[mask]
+        if self._change_col is not None:
+            values[:, self._change_col] /= 100
+        self.values[pos] = values
+        if 'datetime' in quotes:
+            self.datetime[pos] = self.to_datetime64(
+                quotes['datetime'].to_numpy()[mask])
+        if self.board is not None:
+            pos = np.unique(pos)
+            epoch = self.datetime[pos].astype(np.int64) / 1e9
+            epoch[np.isnat(self.datetime[pos])] = np.nan
+            self.board.update_rows(
+                self._board_rows[pos],
+                np.column_stack([self.values[pos], epoch]))
+        return pos
+
+    # --------------------------------------------------
+    def to_datetime64(self, raw:np.ndarray) -> np.ndarray:
+        """Convert timestamps, parsing each distinct string only once"""
+        if raw.dtype.kind == 'M':
+            return raw.astype('datetime64[ns]', copy=False)
+        cache = self._datetime_cache
+        if len(cache) > self.MAX_CACHED_DATETIMES:
+            cache.clear()
+        out = np.empty(len(raw), dtype='datetime64[ns]')
+        for i, value in enumerate(raw):
+            parsed = cache.get(value)
+            if parsed is None:
+                parsed = pd.Timestamp(value).to_datetime64() if not pd.isna(value) else np.datetime64('NaT')
+                cache[value] = parsed
+            out[i] = parsed
+        return out
+
+    # --------------------------------------------------
+    def to_frame(self) -> pd.DataFrame:
+        """Snapshot of the board as a DataFrame"""
+        df = pd.DataFrame(
+            self.values.copy(), index=self.labels, columns=self.columns)
+        df['datetime'] = self.datetime.copy()
+        return df
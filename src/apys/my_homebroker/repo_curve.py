@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://github.com/crapher/pyhomebroker
+Purpose: Repo (caución) term structure maintained from the
+    HomeBroker repos board. One row per currency and settlement date.
+"""
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+REPO_COLUMNS = [
+    'days', 'last', 'bid_amount', 'bid_rate',
+    'ask_rate', 'ask_amount', 'turnover', 'volume'
+]
+RATE_COLUMNS = ['last', 'bid_rate', 'ask_rate']
+
+
+# --------------------------------------------------
+class RepoCurve():
+    """
+    Term structure of repo rates keyed by (currency, settlement).
+    Rates are stored as fractions (HomeBroker sends percentages).
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    # --------------------------------------------------
+    def apply(self, quotes:pd.DataFrame):
+        """Update the curve with a repos board callback"""
+        if quotes.empty:
+            return
+        currencies = quotes.index.get_level_values('symbol')
+        settlements = pd.to_datetime(
+            quotes.index.get_level_values('settlement'),
+            format='%Y%m%d', errors='coerce')
+        values = quotes.reindex(columns=REPO_COLUMNS).to_numpy(dtype=np.float64)
+        rate_cols = [REPO_COLUMNS.index(c) for c in RATE_COLUMNS]
+        values[:, rate_cols] /= 100
+        timestamps = quotes['datetime'] if 'datetime' in quotes else [pd.NaT] * len(quotes)
+        for currency, settlement, row, timestamp in zip(
+            currencies, settlements, values, timestamps):
+            if pd.isna(settlement):
+                continue
+            self.rows[(currency, settlement)] = (row, timestamp)
+        self.drop_expired()
+
+    # --------------------------------------------------
+    def drop_expired(self, today:dt.date = None):
+        today = pd.Timestamp(today or dt.date.today())
+        for key in [k for k in self.rows if k[1] < today]:
+            del self.rows[key]
+
+    # --------------------------------------------------
+    def to_frame(self, currency:str = 'PESOS') -> pd.DataFrame:
+        """Curve of one currency indexed by settlement date"""
+        keys = sorted(k for k in self.rows if k[0] == currency)
+        df = pd.DataFrame(
+            [self.rows[k][0] for k in keys] if keys else np.empty((0, len(REPO_COLUMNS))),
+            columns=REPO_COLUMNS,
+            index=pd.DatetimeIndex([k[1] for k in keys], name='settlement'),
+        )
+        df['datetime'] = [self.rows[k][1] for k in keys]
+        return df
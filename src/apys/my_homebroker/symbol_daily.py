@@ -18,6 +18,7 @@ from dataclasses import dataclass, field
 
 import pandas as pd
 from ..utils.pydyverse import PrintTibble
+from ..utils.schema import apply_schema
 from .homebroker_login import HomeBrokerLogin
 
 # --------------------------------------------------
@@ -42,7 +43,7 @@ class SymbolDaily(HomeBrokerLogin):
 
         df = self.hb.history.get_daily_history(
             self.symbol, self.from_date, self.to_date)
-        self.df = pd.DataFrame(df)
+        self.df = apply_schema(pd.DataFrame(df))
 
     def print_tibble(self):
         print(PrintTibble(self.df))
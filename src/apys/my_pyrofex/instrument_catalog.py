@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://github.com/matbarofex/pyRofex
+Purpose: Catalog of pyRofex detailed instruments indexed by cficode,
+    underlying, maturity and ticker. It is built in one pass and
+    kept as a daily snapshot, so lookups never rescan the full list.
+Require package:
+    -   pip install pyRofex
+"""
+
+import datetime as dt
+import inspect
+import os
+
+from ..utils.snapshot_store import SnapshotStore
+
+
+# --------------------------------------------------
+def default_catalog_path() -> str:
+    """Snapshot store (sqlite) next to this module"""
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    return dir_path + '/snapshots.sqlite'
+
+
+def snapshot_name(live:bool = False) -> str:
+    return 'instruments_live' if live else 'instruments_remarkets'
+
+
+# --------------------------------------------------
+class InstrumentCatalog():
+    """
+    Detailed instruments indexed by:
+        -   cficode -> set of tickers
+        -   underlying -> positions in self.instruments
+        -   maturityDate -> positions in self.instruments
+        -   ticker -> positions in self.instruments
+    The ticker is the third field of securityDescription
+    ('MERV - XMEV - GGAL - 48hs' -> 'GGAL').
+    """
+
+    def __init__(self, instruments:list, date:str = None):
+        self.instruments = instruments
+        self.date = date or dt.date.today().strftime('%Y%m%d')
+        self.by_cficode = {}
+        self.by_underlying = {}
+        self.by_maturity = {}
+        self.by_ticker = {}
+        self.symbols = set()
+        self._sorted = {}
+        self._market_symbols = {}
+        for i, instrument in enumerate(instruments):
+            description = instrument.get('securityDescription') or ''
+            parts = description.split(' - ')
+            ticker = parts[2] if len(parts) > 2 else description
+            self.by_cficode.setdefault(instrument.get('cficode'), set()).add(ticker)
+            self.by_underlying.setdefault(instrument.get('underlying'), []).append(i)
+            self.by_maturity.setdefault(instrument.get('maturityDate'), []).append(i)
+            self.by_ticker.setdefault(ticker, []).append(i)
+            symbol = (instrument.get('instrumentId') or {}).get('symbol')
+            if symbol:
+                self.symbols.add(symbol)
+
+    # --------------------------------------------------
+    @classmethod
+    def from_pyrofex(cls, pyrofex, path:str = None, refresh:bool = False,
+                     print_diff:bool = False):
+        """
+        Load today's catalog from the snapshot store at path,
+        downloading it only when the latest snapshot is from another
+        day or refresh is True
+        """
+        fetch = lambda: pyrofex.aux.get_detailed_instruments()['instruments']
+        if path is None:
+            return cls(fetch())
+        store = SnapshotStore(path)
+        name = snapshot_name(pyrofex.live)
+        instruments = store.get(
+            name, fetch, key='instrumentId.symbol',
+            refresh=refresh, print_diff=print_diff
+        )
+        return cls(instruments, date=store.dates(name)[-1])
+
+    # --------------------------------------------------
+    def is_fresh(self, today:dt.date = None) -> bool:
+        """Instruments are listed daily, so the catalog lasts one day"""
+        today = today or dt.date.today()
+        return self.date == today.strftime('%Y%m%d')
+
+    # --------------------------------------------------
+    def tickers(self, cficode:str) -> list:
+        """Sorted unique tickers of a cficode"""
+        if cficode not in self._sorted:
+            self._sorted[cficode] = sorted(self.by_cficode.get(cficode, ()))
+        return list(self._sorted[cficode])
+
+    # --------------------------------------------------
+    def select(self, positions:list) -> list:
+        return [self.instruments[i] for i in positions]
+
+    def underlying(self, underlying:str) -> list:
+        return self.select(self.by_underlying.get(underlying, []))
+
+    def maturity(self, maturity_date:str) -> list:
+        return self.select(self.by_maturity.get(maturity_date, []))
+
+    def ticker(self, ticker:str) -> list:
+        return self.select(self.by_ticker.get(ticker, []))
+
+    # --------------------------------------------------
+    def market_symbols(self, market:str = 'MERV') -> set:
+        """Symbols listed in a market ('MERV - XMEV - GGAL - 48hs')"""
+        if market not in self._market_symbols:
+            prefix = market + ' - '
+            self._market_symbols[market] = {
+                s for s in self.symbols if s.startswith(prefix)}
+        return self._market_symbols[market]
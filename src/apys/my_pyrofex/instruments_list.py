@@ -20,6 +20,8 @@ import pandas as pd
 
 from ..utils.pydyverse import PrintTibble
 from ..utils.handling_files import HandlingFiles
+from ..utils.schema import apply_schema
+from .instrument_catalog import InstrumentCatalog, default_catalog_path
 from .pyrofex_login import PyRofexLogin
 
 
@@ -28,10 +30,17 @@ from .pyrofex_login import PyRofexLogin
 class InstrumentsList(HandlingFiles):
     """
     The code show how to work with instruments data using pyRofex
+    :param catalog_path: sqlite snapshot store of the detailed
+    instruments. Defaults to snapshots.sqlite next to this module.
+    :param refresh: download the detailed instruments even if the
+    latest snapshot is from today
     """
     pyrofex: PyRofexLogin
     details: bool = field(init=True, repr=False, default=False)
     ticker: str = field(init=True, repr=False, default='')
+    catalog_path: str = field(init=True, repr=False, default=None)
+    refresh: bool = field(init=True, repr=False, default=False)
+    catalog: InstrumentCatalog = field(init=False, repr=False, default=None)
     instruments: list = field(init=False, repr=False, default_factory=list)
     letters: list = field(init=False, repr=False)
     bonds: list = field(init=False, repr=False)
@@ -53,6 +62,8 @@ class InstrumentsList(HandlingFiles):
         self.caucion_cficode = 'RPXXXX'
         self.call_cficode  = 'OCASPS'
         self.put_cficode  = 'OPASPS'
+        if self.catalog_path == None:
+            self.catalog_path = default_catalog_path()
         # self.copy_dependencies()
         # self.initialize()
         self.get_data()
@@ -66,7 +77,7 @@ class InstrumentsList(HandlingFiles):
         else:
             df = self.pyrofex.aux.get_all_instruments()
         df = df['instruments']
-        self.df = pd.DataFrame(df)
+        self.df = apply_schema(pd.DataFrame(df))
 
     def setToday(self):
         today = dt.date.today()
@@ -74,93 +85,72 @@ class InstrumentsList(HandlingFiles):
         return today_yearmonthday
     
     def getInstruments(self):
-        self.instruments = self.pyrofex.aux.get_detailed_instruments()['instruments']
+        self.catalog = InstrumentCatalog.from_pyrofex(
+            self.pyrofex, path=self.catalog_path, refresh=self.refresh,
+            print_diff=True
+        )
+        self.instruments = self.catalog.instruments
         return self.instruments
 
-    def getLettersFromInstruments(self):
-        if len(self.instruments) == 0:
+    def getCatalog(self) -> InstrumentCatalog:
+        if self.catalog is None:
             self.getInstruments()
-        letters = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.letter_cficode)
-        self.letters = sorted(list(set(letters)))
+        return self.catalog
+
+    def getLettersFromInstruments(self):
+        self.letters = self.getCatalog().tickers(self.letter_cficode)
         return self.letters
     
     def getBondsFromInstruments(self):
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        bonds = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.bond_cficode)
-        self.bonds = sorted(list(set(bonds)))
+        self.bonds = self.getCatalog().tickers(self.bond_cficode)
         return self.bonds
     
     def getONFromInstruments(self):
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        on = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.on_cficode)
-        self.on = sorted(list(set(on)))
+        self.on = self.getCatalog().tickers(self.on_cficode)
         return self.on
     
     def getCedearsFromInstruments(self):
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        cedears = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.cedear_cficode)
-        self.cedears = sorted(list(set(cedears)))
+        self.cedears = self.getCatalog().tickers(self.cedear_cficode)
         return self.cedears
     
     def getStocksFromInstruments(self):
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        stocks = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.stock_cficode)
-        self.stocks = sorted(list(set(stocks)))
+        self.stocks = self.getCatalog().tickers(self.stock_cficode)
         return self.stocks
 
     def getIndexesFromInstruments(self):
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        indexes = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.index_cficode)
-        self.indexes = sorted(list(set(indexes)))
+        self.indexes = self.getCatalog().tickers(self.index_cficode)
         return self.indexes
 
     def getCaucionesFromInstruments(self):
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        cauciones = (instrument['securityDescription'].split(' - ')[2] 
-                   for instrument in self.instruments 
-                   if instrument['cficode'] == self.caucion_cficode)
-        self.cauciones = sorted(list(set(cauciones)))
+        self.cauciones = self.getCatalog().tickers(self.caucion_cficode)
         return self.cauciones
         
     def getOptionsFromInstruments(self, 
                                      underlying_keywords:list = ["Galicia", "Comercial", "YPF Merval"]) -> list:
-        if len(self.instruments) == 0:
-            self.getInstruments()
-        vencimientos = []
-        opciones = []
+        catalog = self.getCatalog()
+        option_cficodes = [self.call_cficode, self.put_cficode]
+
+        # Only the underlyings matching a keyword are visited
+        options = [
+            instrument
+            for underlying in catalog.by_underlying
+            if underlying and any(keyword in underlying for keyword in underlying_keywords)
+            for instrument in catalog.underlying(underlying)
+            if instrument['cficode'] in option_cficodes
+        ]
 
-        vencimientos = ([instrument['maturityDate'] 
-                         for instrument in self.instruments 
-                            if instrument['cficode'] == self.call_cficode 
-                            or instrument['cficode'] == self.put_cficode 
-                            and "Galicia" in instrument['underlying']])
-        vencimientos = list(set(vencimientos))
-        vencimientos.sort()
-        vencimientos = [x for x in vencimientos if x >= self.setToday()]
+        vencimientos = {
+            instrument['maturityDate']
+            for underlying in catalog.by_underlying
+            if underlying and "Galicia" in underlying
+            for instrument in catalog.underlying(underlying)
+            if instrument['cficode'] in option_cficodes
+        }
+        vencimientos = sorted(x for x in vencimientos if x >= self.setToday())
 
         opciones = [instrument['securityDescription'].split(' - ')[2] 
-                    for instrument in self.instruments 
-                    if instrument['cficode'] in [self.call_cficode, self.put_cficode] 
-                    and any(keyword in instrument['underlying'] for keyword in underlying_keywords) 
-                    and instrument['maturityDate'] in vencimientos[:2]]
+                    for instrument in options
+                    if instrument['maturityDate'] in vencimientos[:2]]
 
         self.options = sorted(list(set(opciones)))
         
@@ -212,6 +202,10 @@ def get_args():
         type=str,
         help = "Get ticker's detailed info")
     
+    parser.add_argument('--refresh', action='store_true')
+    parser.add_argument('--no-refresh', dest='refresh', action='store_false')
+    parser.set_defaults(refresh=False)
+
     parser.add_argument('--to_excel', action='store_true')
     parser.add_argument('--no-to_excel', dest='to_excel', action='store_false')
     parser.set_defaults(to_excel=False)
@@ -254,7 +248,8 @@ def main():
     test = InstrumentsList(
         pyrofex=pyrofex,
         details=args.details,
-        ticker=args.ticker
+        ticker=args.ticker,
+        refresh=args.refresh
     )
     print(test.getLettersFromInstruments())
     if args.to_excel:
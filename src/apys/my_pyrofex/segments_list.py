@@ -18,25 +18,43 @@ from dataclasses import dataclass, field
 import pandas as pd
 from ..utils.pydyverse import PrintTibble
 from ..utils.handling_files import HandlingFiles
+from ..utils.schema import apply_schema
+from ..utils.snapshot_store import SnapshotStore
+from .instrument_catalog import default_catalog_path
 from .pyrofex_login import PyRofexLogin
 
 # --------------------------------------------------
 @dataclass
 class SegmentsList(PyRofexLogin, HandlingFiles):
     """
-    The code show how to work with segments data using pyRofex
+    The code show how to work with segments data using pyRofex.
+    Segments are read from today's snapshot when there is one, so
+    pyRofex is only initialized when they must be downloaded.
+    :param snapshot_path: sqlite snapshot store. Defaults to
+    snapshots.sqlite next to this module.
     """
+    snapshot_path: str = field(init=True, repr=False, default=None)
+    refresh: bool = field(init=True, repr=False, default=False)
     df: pd.DataFrame = field(init=False, repr=False)
 
     def __post_init__(self):
+        if self.snapshot_path == None:
+            self.snapshot_path = default_catalog_path()
+        self.get_data()
+
+    def download(self) -> list:
         self.copy_dependencies()
         self.initialize()
-        self.get_data()
+        return self.aux.get_segments()['segments']
 
     def get_data(self):
-
-        df = segments = self.aux.get_segments()
-        self.df = pd.DataFrame(df)
+        store = SnapshotStore(self.snapshot_path)
+        segments = store.get(
+            'segments_live' if self.live else 'segments_remarkets',
+            self.download, key=['marketId', 'marketSegmentId'],
+            refresh=self.refresh, print_diff=True
+        )
+        self.df = apply_schema(pd.DataFrame(segments))
 
     def print_tibble(self):
         print(PrintTibble(self.df))
@@ -73,6 +91,10 @@ def get_args():
     parser.add_argument('--no-live', dest='live', action='store_false')
     parser.set_defaults(live=False)
 
+    parser.add_argument('--refresh', action='store_true')
+    parser.add_argument('--no-refresh', dest='refresh', action='store_false')
+    parser.set_defaults(refresh=False)
+
     parser.add_argument('--to_excel', action='store_true')
     parser.add_argument('--no-to_excel', dest='to_excel', action='store_false')
     parser.set_defaults(to_excel=False)
@@ -92,7 +114,8 @@ def main():
     if args.user != '' and args.password != '' and args.dni != '' and args.account != '':
         test = SegmentsList(
             user = args.user, password = args.password,
-            account = args.account, live=args.live
+            account = args.account, live=args.live,
+            refresh = args.refresh
         )
     else:
         if os.path.isfile(json_path):
@@ -100,7 +123,8 @@ def main():
                 data_json = json.load(json_file)
                 test = SegmentsList(
                     user = data_json['user'], password = data_json['password'],
-                    account = data_json['account'], live=args.live
+                    account = data_json['account'], live=args.live,
+                    refresh = args.refresh
                 )
             json_file.close()
         else:
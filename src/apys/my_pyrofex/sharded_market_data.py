@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Source: https://github.com/matbarofex/pyRofex
+Purpose: Get market data for large universes using several
+    pyRofex websocket connections. pyRofex keeps one websocket per
+    process, so every shard runs in its own process with its own
+    login and handler. All shards write into one shared memory
+    quote board.
+Require package:
+    -   pip install pyRofex
+"""
+
+import argparse
+import datetime as dt
+import inspect
+import json
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from dataclasses import dataclass, field
+from pprint import pprint
+
+import pandas as pd
+import pyRofex
+
+from ..utils.handling_files import HandlingFiles
+from ..utils.pydyverse import PrintTibble
+from ..utils.quote_board import SharedQuoteBoard
+from .instruments_list import InstrumentsList
+from .pyrofex_login import PyRofexLogin
+
+QUOTE_COLUMNS = [
+    "bid_size", "bid", "ask", "ask_size", "last",
+    "last_size", 'nominal_volume', 'effective_volume', 'timestamp'
+]
+
+
+# --------------------------------------------------
+def market_data_to_row(message:dict) -> list:
+    """Flatten a pyRofex market data message into QUOTE_COLUMNS order"""
+    md = message['marketData']
+    la = md.get('LA') or {}
+    of = md.get('OF') or [{}]
+    bi = md.get('BI') or [{}]
+    return [
+        bi[0].get('size', 0), bi[0].get('price', 0),
+        of[0].get('price', 0), of[0].get('size', 0),
+        la.get('price', 0), la.get('size', 0),
+        md.get('NV') or 0, md.get('EV') or 0,
+        message.get('timestamp', 0),
+    ]
+
+
+# --------------------------------------------------
+class ShardHandler():
+    """Market data handler running inside a shard process"""
+
+    def __init__(self, board:SharedQuoteBoard):
+        self.board = board
+        self.rows = {}
+
+    def marketDataHandler(self, message):
+        symbol = message['instrumentId']['symbol']
+        row = self.rows.get(symbol)
+        # The row may have been released and reused by the manager
+        if row is None or self.board.symbol_at(row) != symbol:
+            return
+        self.board.update(row, market_data_to_row(message))
+
+    def errorHandler(self, message):
+        print(f"\n>>>>>>Error message received at {dt.datetime.now()}:")
+        pprint(message)
+
+    def exceptionHandler(self, e):
+        print(f"\n>>>>>>Exception occurred at {dt.datetime.now()}:")
+        pprint(e)
+
+
+# --------------------------------------------------
+def shard_worker(credentials:dict, board_name:str, commands:mp.Queue,
+                 entries:list, chunk_size:int = 1000):
+    """Process target: log in, open one websocket and serve commands"""
+    pyrofex = PyRofexLogin(**credentials)
+    board = SharedQuoteBoard.attach(board_name)
+    handler = ShardHandler(board)
+    pyrofex.initWebsocketConnection(
+        market_data_handler=handler.marketDataHandler,
+        error_handler=handler.errorHandler,
+        exception_handler=handler.exceptionHandler
+    )
+    try:
+        while True:
+            command, payload = commands.get()
+            if command == 'subscribe':
+                handler.rows.update(payload)
+                tickers = list(payload.keys())
+                for i in range(0, len(tickers), chunk_size):
+                    pyrofex.market_data_subscription(
+                        tickers=tickers[i:i + chunk_size],
+                        entries=entries
+                    )
+            elif command == 'unsubscribe':
+                # pyRofex has no market data unsubscription, so the
+                # shard just stops writing those symbols
+                for ticker in payload:
+                    handler.rows.pop(ticker, None)
+            elif command == 'stop':
+                break
+    finally:
+        pyrofex.closeWebsocketConnection()
+        board.close()
+
+
+# --------------------------------------------------
+@dataclass
+class ShardedMarketData(HandlingFiles):
+    """
+    Subscription manager that shards tickers across n_shards
+    websocket connections (one process each).
+    :param capacity: maximum number of tickers on the board.
+    Defaults to twice the initial universe so tickers can be
+    added at runtime.
+    """
+    user: str = field(init=True, repr=False)
+    password: str = field(init=True, repr=False)
+    account: str = field(init=True, repr=False)
+    live: bool = field(init=True, repr=False, default=False)
+    tickers: list = None
+    n_shards: int = 2
+    capacity: int = None
+    chunk_size: int = 1000
+    board_name: str = None
+    board: SharedQuoteBoard = field(init=False, repr=False, default=None)
+    shards: list = field(init=False, repr=False, default_factory=list)
+    assignment: dict = field(init=False, repr=False, default_factory=dict)
+    df: pd.DataFrame = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.tickers = list(self.tickers or [])
+        if self.capacity is None:
+            self.capacity = max(2 * len(self.tickers), 1000)
+        self.entries = [
+            pyRofex.MarketDataEntry.BIDS,
+            pyRofex.MarketDataEntry.OFFERS,
+            pyRofex.MarketDataEntry.LAST,
+            pyRofex.MarketDataEntry.NOMINAL_VOLUME,
+            pyRofex.MarketDataEntry.TRADE_EFFECTIVE_VOLUME,
+        ]
+
+    # --------------------------------------------------
+    def start(self):
+        """Create the board, spawn the shard processes and subscribe"""
+        self.board = SharedQuoteBoard.create(
+            QUOTE_COLUMNS, self.capacity, name=self.board_name)
+        credentials = {
+            'user': self.user, 'password': self.password,
+            'account': self.account, 'live': self.live,
+        }
+        for _ in range(self.n_shards):
+            commands = mp.Queue()
+            process = mp.Process(
+                target=shard_worker,
+                args=(credentials, self.board.name, commands,
+                      self.entries, self.chunk_size),
+                daemon=True
+            )
+            process.start()
+            self.shards.append((process, commands))
+        tickers, self.tickers = self.tickers, []
+        self.add_tickers(tickers)
+
+    # --------------------------------------------------
+    def shard_loads(self) -> list:
+        loads = [0] * len(self.shards)
+        for shard in self.assignment.values():
+            loads[shard] += 1
+        return loads
+
+    # --------------------------------------------------
+    def add_tickers(self, tickers:list):
+        """Allocate board rows and subscribe on the least loaded shards"""
+        tickers = [t for t in tickers if t not in self.assignment]
+        rows = self.board.add_symbols(tickers)
+        loads = self.shard_loads()
+        batches = [{} for _ in self.shards]
+        for ticker in tickers:
+            shard = loads.index(min(loads))
+            loads[shard] += 1
+            self.assignment[ticker] = shard
+            batches[shard][ticker] = rows[ticker]
+        for (_, commands), batch in zip(self.shards, batches):
+            if batch:
+                commands.put(('subscribe', batch))
+        self.tickers.extend(tickers)
+
+    # --------------------------------------------------
+    def remove_tickers(self, tickers:list):
+        batches = [[] for _ in self.shards]
+        for ticker in tickers:
+            shard = self.assignment.pop(ticker, None)
+            if shard is not None:
+                batches[shard].append(ticker)
+        for (_, commands), batch in zip(self.shards, batches):
+            if batch:
+                commands.put(('unsubscribe', batch))
+        self.board.remove_symbols(tickers)
+        self.tickers = [t for t in self.tickers if t in self.assignment]
+
+    # --------------------------------------------------
+    def stop(self, timeout:float = 5):
+        for _, commands in self.shards:
+            try:
+                commands.put_nowait(('stop', None))
+            except queue.Full:
+                pass
+        for process, _ in self.shards:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.shards = []
+        if self.board is not None:
+            self.board.close()
+            self.board = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --------------------------------------------------
+    def getData(self, seconds_to_update:int = 1):
+        while True:
+            self.df = self.board.to_dataframe()
+            self.printTibble()
+            time.sleep(seconds_to_update)
+
+    def printTibble(self):
+        print(PrintTibble(self.df))
+
+# --------------------------------------------------
+def getArgs():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Sharded market data with pyRofex',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        '-u', '--user',
+        metavar = 'User',
+        default = '',
+        type=str,
+        help = "User to log in pyRofex")
+
+    parser.add_argument(
+        '-p', '--password',
+        metavar = 'Password',
+        default = '',
+        type=str,
+        help = "Password to log in pyRofex")
+
+    parser.add_argument(
+        '-a', '--account',
+        metavar = 'account',
+        default = '',
+        type=str,
+        help = "Account to log in pyRofex")
+
+    parser.add_argument('--live', action='store_true')
+    parser.add_argument('--no-live', dest='live', action='store_false')
+    parser.set_defaults(live=False)
+
+    parser.add_argument(
+        '-n', '--n_shards',
+        metavar = 'n_shards',
+        default = 2,
+        type=int,
+        help = "Number of websocket connections")
+
+    parser.add_argument(
+        '-t', '--tickers',
+        nargs='*',
+        metavar = 'tickers',
+        default = '',
+        type=str,
+        help = "Get tickers's data")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = getArgs()
+    dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+    if args.live:
+        json_path = dir_path + '/live.json'
+    else:
+        json_path = dir_path + '/remarkets.json'
+
+    if args.user != '' and args.password != '' and args.account != '':
+        credentials = {
+            'user': args.user, 'password': args.password,
+            'account': args.account,
+        }
+    else:
+        if os.path.isfile(json_path):
+            with open(json_path) as json_file:
+                data_json = json.load(json_file)
+                credentials = {
+                    'user': data_json['user'], 'password': data_json['password'],
+                    'account': data_json['account'],
+                }
+            json_file.close()
+        else:
+            msg = (
+                f'If {json_path} with username and password ' +
+                'as keys does not exist in the directory, ' +
+                'both arguments must be given.'
+            )
+            sys.exit(msg)
+
+    if args.tickers == '':
+        instruments = InstrumentsList(
+            pyrofex=PyRofexLogin(live=args.live, **credentials),
+        )
+        tickers_list = [
+            f'MERV - XMEV - {ticker} - {term}'
+            for ticker in instruments.getCedearsFromInstruments()
+            for term in ['CI', '24hs', '48hs']
+        ]
+    else:
+        tickers_list = args.tickers
+
+    with ShardedMarketData(
+        live=args.live, tickers=tickers_list,
+        n_shards=args.n_shards, **credentials
+    ) as test:
+        try:
+            test.getData()
+        except KeyboardInterrupt:
+            pass
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.my_pyrofex.sharded_market_data --live -n 4
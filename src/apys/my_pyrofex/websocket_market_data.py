@@ -8,6 +8,7 @@ Require package:
 """
 
 import argparse
+import atexit
 import datetime as dt
 import inspect
 import json
@@ -19,10 +20,15 @@ from pprint import pprint
 
 import pandas as pd
 
+from ..utils.bar_builder import BarBuilder
 from ..utils.handling_files import HandlingFiles
 from ..utils.pydyverse import PrintTibble
+from ..utils.quote_board import SharedQuoteBoard
+from ..utils.stream_stats import SECONDS_PER_YEAR, STATS_COLUMNS, StreamStats
+from .instrument_catalog import InstrumentCatalog, default_catalog_path
 from .instruments_list import InstrumentsList
 from .pyrofex_login import PyRofexLogin
+from .sharded_market_data import QUOTE_COLUMNS, market_data_to_row
 import pyRofex
 
 
@@ -32,9 +38,19 @@ class WebsocketMarketData(HandlingFiles):
     """
     The code show how to get different market data for an instrument and
     how to get historical trade data using pyRofex.
+    :param board_capacity: rows of the published boards, so a later
+    getInstrumentsFormatted can subscribe more instruments
     """
     pyrofex: PyRofexLogin
     tickers: list = None
+    publish: str = None
+    board_capacity: int = 1000
+    stats_halflife: float = None
+    bars_path: str = None
+    catalog: InstrumentCatalog = None
+    stats: StreamStats = field(init=False, repr=False, default=None)
+    bars: BarBuilder = field(init=False, repr=False, default=None)
+    board: SharedQuoteBoard = field(init=False, repr=False, default=None)
     instruments_formatted: list = field(init=False, repr=False)
     prices: pd.DataFrame = field(init=False, repr=False)
     df: pd.DataFrame = field(init=False, repr=False)
@@ -43,6 +59,14 @@ class WebsocketMarketData(HandlingFiles):
         # self.copy_dependencies()
         # self.initialize()
         self.getInstrumentsFormatted()
+        # Created once: calling getInstrumentsFormatted again only
+        # updates their symbols
+        if self.publish != None:
+            self.publish_board(self.publish)
+        if self.stats_halflife != None:
+            self.init_stats(self.stats_halflife)
+        if self.bars_path != None:
+            self.init_bars(self.bars_path)
         self.initWebsocketConnection()
         self.getData()
     
@@ -58,12 +82,11 @@ class WebsocketMarketData(HandlingFiles):
                 f'MERV - XMEV - {ticker} - 24hs' for ticker in self.tickers
             ])
 
-        instruments_raw = self.pyrofex.aux.get_all_instruments()['instruments']
-        all_instruments = {
-            instrument_dict['instrumentId']['symbol'] 
-            for instrument_dict in instruments_raw 
-            if instrument_dict['instrumentId']['symbol'].split(' - ')[0] == 'MERV'
-        }
+        if self.catalog == None:
+            self.catalog = InstrumentCatalog.from_pyrofex(
+                self.pyrofex, path=default_catalog_path()
+            )
+        all_instruments = self.catalog.market_symbols('MERV')
 
         instruments_to_be_removed = [
             instrument 
@@ -89,8 +112,62 @@ class WebsocketMarketData(HandlingFiles):
         self.prices = self.prices.fillna(0)
         self.prices.index.name = "instrument"
         self.instruments_formatted = instruments_formatted
+        if self.board is not None:
+            self.board.remove_symbols(
+                [s for s in self.board.symbols if s not in instruments_formatted])
+            self._board_rows = self.board.add_symbols(instruments_formatted)
+        if self.stats is not None:
+            self.stats.add_symbols(instruments_formatted)
         return instruments_formatted
 
+    # --------------------------------------------------
+    def init_stats(self, halflife:float) -> StreamStats:
+        """
+        Per instrument EMA, VWAP, realized volatility and spread stats.
+        Published as <publish>_stats when publish is set.
+        """
+        if self.stats is not None:
+            return self.stats
+        board = None
+        if self.publish != None:
+            board = SharedQuoteBoard.create(
+                STATS_COLUMNS,
+                max(self.board_capacity, len(self.instruments_formatted)),
+                name=self.publish + '_stats')
+            atexit.register(board.close)
+        self.stats = StreamStats(
+            self.instruments_formatted, halflife=halflife,
+            seconds_per_year=SECONDS_PER_YEAR, board=board)
+        return self.stats
+
+    # --------------------------------------------------
+    def init_bars(self, sql_path:str, intervals:list = ('1s', '1m', '5m')) -> BarBuilder:
+        """
+        1s/1m/5m OHLCV bars with volume from NV/EV deltas, appended
+        in batches to the symbol_bars table of sql_path
+        """
+        if self.bars is not None:
+            return self.bars
+        self.bars = BarBuilder(intervals, market='MERV', sql_path=sql_path)
+        atexit.register(self.bars.close)
+        return self.bars
+
+    # --------------------------------------------------
+    def publish_board(self, name:str) -> SharedQuoteBoard:
+        """
+        Publish quotes into a shared memory board so other local
+        processes can read them without a new connection:
+            python -m apys.utils.quote_board <name>
+        """
+        if self.board is not None:
+            return self.board
+        self.board = SharedQuoteBoard.create(
+            QUOTE_COLUMNS,
+            max(self.board_capacity, len(self.instruments_formatted)), name=name)
+        atexit.register(self.board.close)
+        self._board_rows = self.board.add_symbols(self.instruments_formatted)
+        return self.board
+
     # 2-Defines the handlers that will process the messages and exceptions.
     # --------------------------------------------------
     def marketDataHandler(self, message):
@@ -135,6 +212,35 @@ class WebsocketMarketData(HandlingFiles):
         else:
             self.prices.loc[message['instrumentId']['symbol'], 'effective_volume'] = 0
 
+        if self.board is not None:
+            row = self._board_rows.get(message['instrumentId']['symbol'])
+            if row is not None:
+                self.board.update(row, market_data_to_row(message))
+
+        if self.stats is not None:
+            md = message['marketData']
+            self.stats.update(
+                message['instrumentId']['symbol'], message['timestamp'] / 1000,
+                price = (md.get('LA') or {}).get('price'),
+                cum_volume = md.get('NV'),
+                bid = (md.get('BI') or [{}])[0].get('price'),
+                ask = (md.get('OF') or [{}])[0].get('price'),
+            )
+
+        if self.bars is not None:
+            md = message['marketData']
+            if md.get('LA'):
+                # Bars go by trade time; quote updates repeat LA and NV
+                # and are skipped by the builder
+                self.bars.update(
+                    message['instrumentId']['symbol'],
+                    md['LA'].get('date', message['timestamp']) / 1000,
+                    md['LA']['price'],
+                    cum_volume = md.get('NV'),
+                    cum_amount = md.get('EV'),
+                )
+            self.bars.advance(message['timestamp'] / 1000)
+
     # --------------------------------------------------
     def orderReportHandler(self, message):
         print("Order Report Message Received: {0}".format(message))
@@ -206,6 +312,8 @@ class WebsocketMarketData(HandlingFiles):
                 # Panel.update('B2', [prices.columns.tolist()] + prices.values.tolist())
                 self.df = self.prices
                 self.printTibble()
+                if self.stats is not None:
+                    print(PrintTibble(self.stats.to_dataframe()))
             except:
                 pass
             time.sleep(1)
@@ -266,6 +374,27 @@ def getArgs():
         type=str,
         help = "Get tickers's data")
     
+    parser.add_argument(
+        '--publish', 
+        metavar = 'publish',
+        default = None,
+        type=str,
+        help = "Shared memory name to publish the quote board")
+
+    parser.add_argument(
+        '-s', '--stats', 
+        metavar = 'halflife',
+        default = None,
+        type=float,
+        help = "Keep streaming stats with this halflife in seconds")
+
+    parser.add_argument(
+        '-b', '--bars', 
+        metavar = 'sql_path',
+        default = None,
+        type=str,
+        help = "Build 1s/1m/5m bars and append them to this sqlite DB")
+
     parser.add_argument('--to_excel', action='store_true')
     parser.add_argument('--no-to_excel', dest='to_excel', action='store_false')
     parser.set_defaults(to_excel=False)
@@ -304,18 +433,25 @@ def main():
             )
             sys.exit(msg)
 
+    catalog = None
     if args.tickers == '':
         # with open(os.path.join(dir_path, "Tickers.txt"), "r") as file:
         #     tickers_list = file.read().splitlines()
-        tickers_list = InstrumentsList(
+        instruments = InstrumentsList(
             pyrofex=pyrofex,
-        ).getCedearsFromInstruments()
+        )
+        tickers_list = instruments.getCedearsFromInstruments()
+        catalog = instruments.catalog
     else:
         tickers_list = args.tickers
 
     test = WebsocketMarketData(
         pyrofex=pyrofex,
-        tickers=tickers_list
+        tickers=tickers_list,
+        publish=args.publish,
+        stats_halflife=args.stats,
+        bars_path=args.bars,
+        catalog=catalog
     )
 
     # test.forTestOnly()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Build OHLCV bars (1s, 1m, 5m, ...) from websocket ticks.
+    Bars stay open until the watermark (latest event time seen) passes
+    their end plus a lateness window, so ticks arriving out of order
+    still land in the right bar. Closed bars are written in batches to
+    the symbol_bars table, next to symbol_daily.
+"""
+
+import argparse
+import heapq
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..models.iol_model import IOLModel
+
+BAR_COLUMNS = [
+    'symbol', 'market', 'interval', 'date',
+    'open', 'high', 'low', 'close', 'vol', 'amount', 'ticks'
+]
+# Bar state: open, high, low, close, vol, amount, ticks, open_ts, close_ts
+_OPEN, _HIGH, _LOW, _CLOSE, _VOL, _AMOUNT, _TICKS, _OPEN_TS, _CLOSE_TS = range(9)
+
+
+# --------------------------------------------------
+class BarBuilder():
+    """
+    :param intervals: bar sizes understood by pd.Timedelta
+    :param lateness: seconds a bar stays open after its end. Ticks older
+    than watermark - lateness still amend bars not yet flushed; ticks for
+    bars already written are counted in dropped (once per interval).
+    :param sql_path: sqlite DB where closed bars are appended (IOLModel)
+    :param batch_size: closed bars kept before writing them
+    """
+
+    def __init__(self, intervals:list = ('1s', '1m', '5m'), market:str = '',
+                 lateness:float = 2.0, sql_path:str = None,
+                 batch_size:int = 500):
+        self.intervals = {
+            i: pd.Timedelta(i).total_seconds() for i in intervals}
+        self.market = market
+        self.lateness = lateness
+        self.sql_path = sql_path
+        self.batch_size = batch_size
+        self.watermark = -np.inf
+        self.dropped = 0
+        self.written = 0
+        self._open = {}
+        self._pending = {}
+        self._heap = []
+        self._cum = {}
+        self._last_ts = {}
+        # One engine (and one create_all) for every batch
+        self._engine = None
+        if sql_path != None:
+            self._engine = IOLModel(sql_path).engine
+
+    # --------------------------------------------------
+    def update(self, symbol:str, timestamp:float, price:float,
+               volume:float = None, cum_volume:float = None,
+               cum_amount:float = None) -> bool:
+        """
+        One trade. timestamp in epoch seconds. Volume is either given
+        per trade (Finnhub v) or derived from cumulative counters such as
+        pyRofex NV and EV. Returns False if the tick carried no new trade.
+        """
+        amount = None
+        if cum_volume is not None:
+            # Same counter and no newer trade: a repeated last price
+            if (cum_volume == self._cum.get((symbol, 'vol'))
+                    and timestamp <= self._last_ts.get(symbol, -np.inf)):
+                self.advance(timestamp)
+                return False
+            volume = self._delta(symbol, 'vol', cum_volume, timestamp)
+        if cum_amount is not None:
+            amount = self._delta(symbol, 'amount', cum_amount, timestamp)
+        if volume is None:
+            volume = 0.0
+        if amount is None:
+            amount = price * volume
+        self._last_ts[symbol] = max(timestamp, self._last_ts.get(symbol, -np.inf))
+
+        if timestamp < self.watermark - self.lateness:
+            self._amend_late(symbol, timestamp, price, volume, amount)
+        else:
+            for interval, seconds in self.intervals.items():
+                start = timestamp // seconds * seconds
+                key = (symbol, interval, start)
+                bar = self._open.get(key)
+                if bar is None:
+                    self._open[key] = self._new_bar(timestamp, price, volume, amount)
+                    heapq.heappush(self._heap, (start + seconds + self.lateness, key))
+                else:
+                    self._add_tick(bar, timestamp, price, volume, amount)
+        self.advance(timestamp)
+        return True
+
+    # --------------------------------------------------
+    def _delta(self, symbol:str, kind:str, cum:float, timestamp:float) -> float:
+        previous = self._cum.get((symbol, kind))
+        if previous is None:
+            # First value carries the volume before we connected
+            self._cum[(symbol, kind)] = cum
+            return 0.0
+        if cum >= previous:
+            self._cum[(symbol, kind)] = cum
+            return cum - previous
+        if timestamp >= self._last_ts.get(symbol, -np.inf):
+            # Counter reset (new session)
+            self._cum[(symbol, kind)] = cum
+        # An older counter arriving late was already counted
+        return 0.0
+
+    # --------------------------------------------------
+    @staticmethod
+    def _new_bar(timestamp, price, volume, amount) -> list:
+        return [price, price, price, price, volume, amount, 1, timestamp, timestamp]
+
+    @staticmethod
+    def _add_tick(bar:list, timestamp, price, volume, amount):
+        if timestamp < bar[_OPEN_TS]:
+            bar[_OPEN], bar[_OPEN_TS] = price, timestamp
+        if timestamp >= bar[_CLOSE_TS]:
+            bar[_CLOSE], bar[_CLOSE_TS] = price, timestamp
+        bar[_HIGH] = max(bar[_HIGH], price)
+        bar[_LOW] = min(bar[_LOW], price)
+        bar[_VOL] += volume
+        bar[_AMOUNT] += amount
+        bar[_TICKS] += 1
+
+    def _amend_late(self, symbol, timestamp, price, volume, amount):
+        for interval, seconds in self.intervals.items():
+            key = (symbol, interval, timestamp // seconds * seconds)
+            bar = self._open.get(key)
+            if bar is None:
+                bar = self._pending.get(key)
+            if bar is None:
+                # Written already or never opened: the bar would be wrong
+                # without the ones around it, don't create it that late
+                self.dropped += 1
+            else:
+                self._add_tick(bar, timestamp, price, volume, amount)
+
+    # --------------------------------------------------
+    def advance(self, timestamp:float):
+        """Move the watermark (e.g. with the message time) and close bars"""
+        if timestamp <= self.watermark:
+            return
+        self.watermark = timestamp
+        while self._heap and self._heap[0][0] <= timestamp:
+            _, key = heapq.heappop(self._heap)
+            self._pending[key] = self._open.pop(key)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    # --------------------------------------------------
+    def _frame(self, bars:dict) -> pd.DataFrame:
+        if not bars:
+            return pd.DataFrame(columns=BAR_COLUMNS)
+        keys = list(bars)
+        values = np.array(list(bars.values()), dtype=float)
+        df = pd.DataFrame({
+            'symbol': [k[0] for k in keys],
+            'market': self.market,
+            'interval': [k[1] for k in keys],
+            'date': pd.to_datetime([k[2] for k in keys], unit='s'),
+            'open': values[:, _OPEN],
+            'high': values[:, _HIGH],
+            'low': values[:, _LOW],
+            'close': values[:, _CLOSE],
+            'vol': values[:, _VOL],
+            'amount': values[:, _AMOUNT],
+            'ticks': values[:, _TICKS].astype(np.int64),
+        })
+        return df.sort_values(['symbol', 'interval', 'date'], ignore_index=True)
+
+    # --------------------------------------------------
+    def flush(self, force:bool = False) -> pd.DataFrame:
+        """
+        Write closed bars (and open ones too when force) in one batch.
+        Returns the bars written.
+        """
+        if force:
+            self._pending.update(self._open)
+            self._open = {}
+            self._heap = []
+        df = self._frame(self._pending)
+        self._pending = {}
+        if not df.empty and self._engine != None:
+            df.to_sql(
+                name = 'symbol_bars',
+                con = self._engine,
+                if_exists = 'append',
+                index=False
+            )
+        self.written += len(df)
+        return df
+
+    def close(self) -> pd.DataFrame:
+        df = self.flush(force=True)
+        if self._engine != None:
+            self._engine.dispose()
+            self._engine = None
+        return df
+
+    # --------------------------------------------------
+    def to_dataframe(self, interval:str = None) -> pd.DataFrame:
+        """Bars not written yet, open ones included"""
+        df = self._frame({**self._pending, **self._open})
+        if interval != None:
+            df = df[df['interval'] == interval]
+        return df
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Benchmark the bar builder with random ticks',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        '-n', '--ticks',
+        metavar = 'ticks',
+        default = 1000000,
+        type=int,
+        help = "Number of ticks")
+
+    parser.add_argument(
+        '-s', '--symbols',
+        metavar = 'symbols',
+        default = 100,
+        type=int,
+        help = "Number of symbols")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    rng = np.random.default_rng(0)
+    symbols = [f'SYM{i}' for i in range(args.symbols)]
+    # One hour of ticks, a few of them delayed up to 3 seconds
+    timestamps = np.sort(rng.uniform(0, 3600, args.ticks)) + 1.7e9
+    timestamps -= np.where(rng.random(args.ticks) < 0.01, rng.uniform(0, 3, args.ticks), 0)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 1e-4, args.ticks)))
+    volumes = rng.integers(1, 100, args.ticks).astype(float)
+    which = rng.integers(0, args.symbols, args.ticks)
+
+    builder = BarBuilder()
+    start = time.perf_counter()
+    for i in range(args.ticks):
+        builder.update(symbols[which[i]], timestamps[i], prices[i], volumes[i])
+    builder.close()
+    elapsed = time.perf_counter() - start
+    print(f'{args.ticks} ticks in {elapsed:.2f} s '
+          f'({args.ticks / elapsed:,.0f} ticks/s), '
+          f'{builder.written} bars, {builder.dropped} dropped late ticks')
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.utils.bar_builder
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Trading calendars of BYMA and NYSE: weekends, fixed, movable
+    and Easter based holidays, plus the ones given as extra_holidays
+    (Argentina adds bridge holidays by decree every year). Knows when
+    the last session settled, i.e. its bars won't change anymore.
+"""
+
+import datetime as dt
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+
+# --------------------------------------------------
+def easter(year:int) -> dt.date:
+    """Easter Sunday, anonymous Gregorian algorithm"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return dt.date(year, month, day + 1)
+
+def nth_weekday(year:int, month:int, weekday:int, n:int) -> dt.date:
+    """n-th weekday (0 = monday) of the month, n = -1 for the last one"""
+    if n > 0:
+        first = dt.date(year, month, 1)
+        return first + dt.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+    return last - dt.timedelta(days=(last.weekday() - weekday) % 7)
+
+def observed(day:dt.date) -> dt.date:
+    """NYSE rule: saturday holidays move to friday, sunday ones to monday"""
+    if day.weekday() == 5:
+        return day - dt.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + dt.timedelta(days=1)
+    return day
+
+def moved(day:dt.date) -> dt.date:
+    """
+    Argentine movable holidays (law 27.399): tuesday and wednesday
+    ones move to the monday before, thursday and friday ones to the
+    monday after
+    """
+    if day.weekday() in (1, 2):
+        return day - dt.timedelta(days=day.weekday())
+    if day.weekday() in (3, 4):
+        return day + dt.timedelta(days=7 - day.weekday())
+    return day
+
+# --------------------------------------------------
+def nyse_holidays(year:int) -> set:
+    days = {
+        nth_weekday(year, 1, 0, 3),     # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),     # Washington's Birthday
+        easter(year) - dt.timedelta(days=2),
+        nth_weekday(year, 5, 0, -1),    # Memorial Day
+        observed(dt.date(year, 7, 4)),
+        nth_weekday(year, 9, 0, 1),     # Labor Day
+        nth_weekday(year, 11, 3, 4),    # Thanksgiving
+        observed(dt.date(year, 12, 25)),
+    }
+    # No friday off when new year's day is a saturday
+    if dt.date(year, 1, 1).weekday() != 5:
+        days.add(observed(dt.date(year, 1, 1)))
+    if year >= 2022:
+        days.add(observed(dt.date(year, 6, 19)))
+    return days
+
+def byma_holidays(year:int) -> set:
+    sunday = easter(year)
+    days = {
+        dt.date(year, month, day) for month, day in [
+            (1, 1), (3, 24), (4, 2), (5, 1), (5, 25),
+            (6, 20), (7, 9), (12, 8), (12, 25),
+        ]
+    }
+    days |= {
+        moved(dt.date(year, month, day)) for month, day in [
+            (6, 17), (8, 17), (10, 12), (11, 20),
+        ]
+    }
+    days |= {
+        sunday - dt.timedelta(days=48),     # Carnival
+        sunday - dt.timedelta(days=47),
+        sunday - dt.timedelta(days=3),      # Holy Thursday
+        sunday - dt.timedelta(days=2),      # Good Friday
+    }
+    return days
+
+# --------------------------------------------------
+class MarketCalendar():
+    """
+    :param open: local opening time of the session
+    :param close: local closing time of the session
+    :param settle_delay: minutes after close until the daily bars are final
+    :param extra_holidays: dates closed on top of the rules
+    """
+
+    def __init__(self, name:str, timezone:str, open:dt.time, close:dt.time,
+                 holidays, extra_holidays:list = None, settle_delay:int = 30):
+        self.name = name
+        self.tz = ZoneInfo(timezone)
+        self.open = open
+        self.close = close
+        self.settle_delay = dt.timedelta(minutes=settle_delay)
+        self._holidays = holidays
+        self.extra_holidays = set(extra_holidays or [])
+        self._year_holidays = lru_cache(maxsize=None)(self._holidays)
+
+    def __repr__(self):
+        return f'MarketCalendar({self.name})'
+
+    # --------------------------------------------------
+    def is_session(self, day:dt.date) -> bool:
+        return (
+            day.weekday() < 5 and day not in self._year_holidays(day.year)
+            and day not in self.extra_holidays
+        )
+
+    def previous_session(self, day:dt.date) -> dt.date:
+        day -= dt.timedelta(days=1)
+        while not self.is_session(day):
+            day -= dt.timedelta(days=1)
+        return day
+
+    def next_session(self, day:dt.date) -> dt.date:
+        day += dt.timedelta(days=1)
+        while not self.is_session(day):
+            day += dt.timedelta(days=1)
+        return day
+
+    def sessions(self, start:dt.date, end:dt.date) -> list:
+        days = (start + dt.timedelta(days=i) for i in range((end - start).days + 1))
+        return [day for day in days if self.is_session(day)]
+
+    # --------------------------------------------------
+    def now(self) -> dt.datetime:
+        return dt.datetime.now(self.tz)
+
+    def today(self, now:dt.datetime = None) -> dt.date:
+        return (now or self.now()).astimezone(self.tz).date()
+
+    def last_settled(self, now:dt.datetime = None) -> dt.date:
+        """Last session whose bars are final"""
+        now = (now or self.now()).astimezone(self.tz)
+        today = now.date()
+        settle = dt.datetime.combine(today, self.close, tzinfo=self.tz) + self.settle_delay
+        if self.is_session(today) and now >= settle:
+            return today
+        return self.previous_session(today)
+
+    def is_open_session(self, now:dt.datetime = None) -> bool:
+        """Today's session has opened and its bars may still change"""
+        now = (now or self.now()).astimezone(self.tz)
+        today = now.date()
+        return (
+            self.is_session(today) and now.time() >= self.open
+            and today > self.last_settled(now)
+        )
+
+# --------------------------------------------------
+NYSE = MarketCalendar(
+    'NYSE', 'America/New_York', dt.time(9, 30), dt.time(16, 0), nyse_holidays)
+BYMA = MarketCalendar(
+    'BYMA', 'America/Argentina/Buenos_Aires', dt.time(11, 0), dt.time(17, 0),
+    byma_holidays)
+CALENDARS = {'NYSE': NYSE, 'BYMA': BYMA}
+
+def get_calendar(name:str, extra_holidays:list = None) -> MarketCalendar:
+    """NYSE or BYMA, with extra_holidays if given"""
+    calendar = CALENDARS[name.upper()]
+    if not extra_holidays:
+        return calendar
+    return MarketCalendar(
+        calendar.name, calendar.tz.key, calendar.open, calendar.close,
+        calendar._holidays,
+        extra_holidays=calendar.extra_holidays | set(extra_holidays),
+        settle_delay=int(calendar.settle_delay.total_seconds() // 60))
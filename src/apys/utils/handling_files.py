@@ -8,6 +8,8 @@ Source: https://realpython.com/working-with-files-in-python/#:~:text=To%20get%20
 import os
 import pandas as pd
 
+from .schema import to_storage_dtypes
+
 class HandlingFiles():
 
     # --------------------------------------------------
@@ -32,7 +34,7 @@ class HandlingFiles():
     
     # --------------------------------------------------
     def to_excel(self, PATH:str):
-        self.df.to_excel(PATH, index=False)
+        to_storage_dtypes(self.df).to_excel(PATH, index=False)
     
     # --------------------------------------------------
     def get_list_of_files(self, path:str) -> list:
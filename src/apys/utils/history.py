@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: One daily OHLCV history API over IOL, HomeBroker,
+    AlphaVantage and Finnhub, backed by a local parquet store.
+    Every (provider, symbol) is one parquet file whose metadata keeps
+    the date ranges already downloaded, so only missing ranges are
+    requested and repeated queries are served from disk.
+Require package:
+    -   pip install pyarrow
+"""
+
+import argparse
+import datetime as dt
+import inspect
+import json
+import os
+import re
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..alpha_vantage.alpha_vantage_login import AlphaVantage
+from ..alpha_vantage.symbol_daily import SymbolDaily as AlphaSymbolDaily
+from ..iol.connect import IOL
+from ..iol.symbol_daily import SymbolDaily as IOLSymbolDaily
+from .pydyverse import PrintTibble
+
+HISTORY_COLUMNS = ['date', 'symbol', 'open', 'high', 'low', 'close', 'volume']
+HISTORY_DTYPES = {
+    'open': 'float64', 'high': 'float64', 'low': 'float64',
+    'close': 'float64', 'volume': 'int64',
+}
+_COVERAGE_KEY = b'apys.coverage'
+# AlphaVantage compact output covers the last 100 sessions
+_ALPHA_COMPACT_DAYS = 140
+
+
+# --------------------------------------------------
+def to_history_schema(df:pd.DataFrame, symbol:str) -> pd.DataFrame:
+    """date, categorical symbol, float64 prices and int64 volume"""
+    out = pd.DataFrame({
+        'date': pd.to_datetime(df['date']).dt.normalize().to_numpy(),
+        'symbol': pd.Categorical([symbol] * len(df)),
+    })
+    for col, dtype in HISTORY_DTYPES.items():
+        values = pd.to_numeric(pd.Series(df[col]).reset_index(drop=True), errors='coerce')
+        if dtype == 'int64':
+            values = values.fillna(0).round()
+        out[col] = values.astype(dtype)
+    return out.sort_values('date', ignore_index=True)
+
+# --------------------------------------------------
+def fetch_iol(client:IOL, symbol:str, start:dt.date, end:dt.date) -> pd.DataFrame:
+    df = IOLSymbolDaily(iol=client, symbol=symbol, from_date=start, to_date=end).df
+    return to_history_schema(df.rename(columns={'vol': 'volume'}), symbol)
+
+def fetch_homebroker(client, symbol:str, start:dt.date, end:dt.date) -> pd.DataFrame:
+    """client: a logged HomeBrokerLogin"""
+    df = client.hb.history.get_daily_history(symbol, start, end)
+    return to_history_schema(df, symbol)
+
+def fetch_alpha_vantage(client:AlphaVantage, symbol:str, start:dt.date, end:dt.date) -> pd.DataFrame:
+    size = 'compact'
+    if start < dt.date.today() - dt.timedelta(days=_ALPHA_COMPACT_DAYS):
+        size = 'full'
+    df = AlphaSymbolDaily(alpha=client, symbol=symbol, size=size).df
+    return to_history_schema(df.reset_index(), symbol)
+
+def fetch_finnhub(client, symbol:str, start:dt.date, end:dt.date) -> pd.DataFrame:
+    """client: a Finnhub REST client (Finnhub.stock_candles)"""
+    df = client.stock_candles(
+        symbol, start.strftime('%Y-%m-%d'),
+        (end + dt.timedelta(days=1)).strftime('%Y-%m-%d'))
+    return to_history_schema(df.reset_index(), symbol)
+
+PROVIDERS = {
+    'iol': fetch_iol,
+    'homebroker': fetch_homebroker,
+    'alpha_vantage': fetch_alpha_vantage,
+    'finnhub': fetch_finnhub,
+}
+# Providers without a date range parameter: one request per gap list
+_WHOLE_RANGE = {'alpha_vantage'}
+
+
+# --------------------------------------------------
+def merge_ranges(ranges:list) -> list:
+    """Merge overlapping or adjacent [start, end] date ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + dt.timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def missing_ranges(coverage:list, start:dt.date, end:dt.date) -> list:
+    """Parts of [start, end] not inside the coverage ranges"""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in merge_ranges(coverage):
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start - dt.timedelta(days=1)))
+        cursor = max(cursor, cov_end + dt.timedelta(days=1))
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+# --------------------------------------------------
+class HistoryStore():
+    """
+    :param root: directory of the parquet files. Defaults to history/
+    next to this module.
+    """
+
+    def __init__(self, root:str = None):
+        if root == None:
+            dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+            root = os.path.join(dir_path, 'history')
+        self.root = root
+
+    # --------------------------------------------------
+    def path(self, provider:str, symbol:str) -> str:
+        filename = re.sub(r'[^\w.-]', '_', symbol) + '.parquet'
+        return os.path.join(self.root, provider, filename)
+
+    # --------------------------------------------------
+    def read(self, provider:str, symbol:str) -> tuple:
+        """Stored history and the ranges it covers"""
+        path = self.path(provider, symbol)
+        if not os.path.isfile(path):
+            return to_history_schema(
+                pd.DataFrame(columns=HISTORY_COLUMNS), symbol), []
+        table = pq.read_table(path)
+        coverage = json.loads((table.schema.metadata or {}).get(_COVERAGE_KEY, b'[]'))
+        coverage = [[dt.date.fromisoformat(s), dt.date.fromisoformat(e)] for s, e in coverage]
+        return table.to_pandas(), coverage
+
+    # --------------------------------------------------
+    def write(self, provider:str, symbol:str, df:pd.DataFrame, coverage:list):
+        path = self.path(provider, symbol)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        coverage = [[s.isoformat(), e.isoformat()] for s, e in merge_ranges(coverage)]
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            _COVERAGE_KEY: json.dumps(coverage).encode(),
+        })
+        # Replace the file at once so readers never see half of it
+        pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    # --------------------------------------------------
+    def get(self, symbol:str, start:dt.date, end:dt.date = None,
+            provider:str = 'iol', client = None, refresh:bool = False) -> pd.DataFrame:
+        """History between start and end, downloading only what's missing"""
+        if end == None:
+            end = dt.date.today()
+        df, coverage = self.read(provider, symbol)
+        if refresh:
+            coverage = []
+        gaps = missing_ranges(coverage, start, end)
+        if gaps:
+            if client == None:
+                raise ValueError(
+                    f'{symbol} from {provider} is missing {gaps} and no client was given')
+            if provider in _WHOLE_RANGE:
+                gaps = [(gaps[0][0], gaps[-1][1])]
+            fetch = PROVIDERS[provider]
+            new = [fetch(client, symbol, gap_start, gap_end) for gap_start, gap_end in gaps]
+            df = pd.concat([df] + new, ignore_index=True)
+            df = df.drop_duplicates('date', keep='last').sort_values('date', ignore_index=True)
+            df = to_history_schema(df, symbol)
+            # Covered only up to the last date the provider returned (an
+            # empty answer covers nothing) and never today's moving bar
+            last_closed = dt.date.today() - dt.timedelta(days=1)
+            for (gap_start, gap_end), gap_df in zip(gaps, new):
+                if gap_df.empty:
+                    continue
+                cov_end = min(gap_end, last_closed, gap_df['date'].max().date())
+                if gap_start <= cov_end:
+                    coverage.append([gap_start, cov_end])
+            self.write(provider, symbol, df, coverage)
+        dates = df['date']
+        mask = (dates >= pd.Timestamp(start)) & (dates <= pd.Timestamp(end))
+        return df[mask].reset_index(drop=True)
+
+# --------------------------------------------------
+def get_history(symbol:str, start:dt.date, end:dt.date = None,
+                provider:str = 'iol', client = None, root:str = None,
+                refresh:bool = False) -> pd.DataFrame:
+    """
+    Daily OHLCV of symbol with one schema whatever the provider:
+    date, symbol (category), open/high/low/close (float64), volume (int64)
+    :param client: logged session of the provider (IOL, HomeBrokerLogin,
+    AlphaVantage or Finnhub). Only used when something is missing.
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f'provider must be one of {list(PROVIDERS)}')
+    return HistoryStore(root).get(
+        symbol, start, end, provider=provider, client=client, refresh=refresh)
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Get daily history from the local store or the provider',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'symbol',
+        metavar = 'Symbol',
+        type=str,
+        help = "Symbol to look up")
+
+    parser.add_argument(
+        'from_date',
+        metavar = 'from_date',
+        help = "The Start Date - format DD-MM-YYYY")
+
+    parser.add_argument(
+        '-to', '--to_date',
+        metavar = 'to_date',
+        default = dt.datetime.strftime(dt.date.today(), "%d-%m-%Y"),
+        help = "The End Date - format DD-MM-YYYY")
+
+    parser.add_argument(
+        '--provider',
+        metavar = 'provider',
+        default = 'iol',
+        choices = list(PROVIDERS),
+        type=str,
+        help = "Provider to download missing ranges from")
+
+    parser.add_argument('--refresh', action='store_true')
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    dir_path = os.path.dirname(os.path.dirname(os.path.abspath(
+        inspect.getfile(inspect.currentframe()))))
+    from_date = dt.datetime.strptime(args.from_date, '%d-%m-%Y').date()
+    to_date = dt.datetime.strptime(args.to_date, '%d-%m-%Y').date()
+
+    json_path = {
+        'iol': dir_path + '/iol/iol.json',
+        'homebroker': dir_path + '/my_homebroker/cocos.json',
+        'alpha_vantage': dir_path + '/alpha_vantage/credentials.json',
+        'finnhub': dir_path + '/finnhub/finnhub.json',
+    }[args.provider]
+    if not os.path.isfile(json_path):
+        sys.exit(f'{json_path} with the credentials must exist')
+    with open(json_path) as json_file:
+        data_json = json.load(json_file)
+    if args.provider == 'iol':
+        client = IOL(
+            data_json['username'],
+            data_json['password'],
+            access_token= data_json['access_token'],
+            datetime_expires= data_json['expires']
+        )
+    elif args.provider == 'homebroker':
+        from ..my_homebroker.homebroker_login import HomeBrokerLogin
+        client = HomeBrokerLogin(
+            id_broker = data_json['broker'], dni = data_json['dni'],
+            user = data_json['user'], password = data_json['password']
+        )
+    elif args.provider == 'finnhub':
+        # Finnhub.py is a standalone module next to Exceptions.py
+        sys.path.insert(0, dir_path)
+        from Finnhub import Finnhub
+        client = Finnhub(api_key = data_json['password'])
+    else:
+        client = AlphaVantage(api_key = data_json['password'])
+
+    df = get_history(
+        args.symbol, from_date, to_date, provider=args.provider,
+        client=client, refresh=args.refresh)
+    print(PrintTibble(df))
+    print(f'{df.memory_usage(deep=True).sum() / 1024:.1f} KiB')
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.utils.history GGAL 01-01-2023
+    # python -m apys.utils.history AAPL 01-01-2023 --provider alpha_vantage
+    # python -m apys.utils.history AAPL 01-01-2023 --provider finnhub
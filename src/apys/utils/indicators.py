@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Technical indicators computed locally with NumPy (SMA, EMA,
+    RSI, MACD, Bollinger bands, ATR and VWAP) so they don't spend API
+    calls. Works on the OHLCV frames returned by Alpha, Finnhub, IOL
+    and HomeBroker (open, high, low, close, volume columns).
+    Every indicator also has an incremental version that updates in
+    O(1) per new bar.
+"""
+
+import argparse
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .pydyverse import PrintTibble
+
+
+# --------------------------------------------------
+def _as_float(x) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+# --------------------------------------------------
+def rolling_mean_var(x, n:int, block:int = 1024) -> tuple:
+    """
+    Rolling mean and population variance from cumulative sums.
+    Sums restart every block and are centered on the block's first
+    value, so long series don't lose precision.
+    """
+    x = _as_float(x)
+    mean = np.full(x.shape, np.nan)
+    var = np.full(x.shape, np.nan)
+    for start in range(0, len(x) - n + 1, block):
+        chunk = x[start:start + block + n - 1]
+        centered = chunk - chunk[0]
+        c1 = np.concatenate([[0.0], np.cumsum(centered)])
+        c2 = np.concatenate([[0.0], np.cumsum(centered * centered)])
+        m = (c1[n:] - c1[:-n]) / n
+        mean[start + n - 1:start + len(chunk)] = m + chunk[0]
+        var[start + n - 1:start + len(chunk)] = np.maximum((c2[n:] - c2[:-n]) / n - m * m, 0)
+    return mean, var
+
+
+# --------------------------------------------------
+def sma(x, n:int) -> np.ndarray:
+    """Simple moving average. NaN for the first n - 1 values"""
+    return rolling_mean_var(x, n)[0]
+
+
+# --------------------------------------------------
+def ewm(x, alpha:float, seed:float = None) -> np.ndarray:
+    """
+    y[t] = alpha * x[t] + (1 - alpha) * y[t - 1], y[-1] = seed
+    (x[0] when seed is None). The recursion is solved in closed form
+    over blocks short enough for the decay factors not to overflow.
+    """
+    x = _as_float(x)
+    out = np.empty(x.shape)
+    if len(x) == 0:
+        return out
+    w = 1.0 - alpha
+    prev = x[0] if seed is None else seed
+    if w <= 0:
+        return x.copy()
+    block = int(min(4096, max(1, 300 / -np.log10(w))))
+    powers = w ** np.arange(1, block + 1)
+    inverse = 1.0 / powers
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        m = len(chunk)
+        # y[t] = w^(t+1) * (prev + alpha * sum_j<=t x[j] / w^(j+1))
+        acc = np.cumsum(chunk * inverse[:m])
+        out[start:start + m] = powers[:m] * (prev + alpha * acc)
+        prev = out[start + m - 1]
+    return out
+
+
+# --------------------------------------------------
+def ema(x, n:int, alpha:float = None) -> np.ndarray:
+    """Exponential moving average seeded with the SMA of the first n values"""
+    x = _as_float(x)
+    out = np.full(x.shape, np.nan)
+    if len(x) < n:
+        return out
+    alpha = 2.0 / (n + 1) if alpha is None else alpha
+    seed = x[:n].mean()
+    out[n - 1] = seed
+    out[n:] = ewm(x[n:], alpha, seed)
+    return out
+
+
+# --------------------------------------------------
+def rsi(close, n:int = 14) -> np.ndarray:
+    """Relative strength index with Wilder smoothing"""
+    close = _as_float(close)
+    out = np.full(close.shape, np.nan)
+    if len(close) <= n:
+        return out
+    delta = np.diff(close)
+    gain = ema(np.maximum(delta, 0), n, alpha=1.0 / n)
+    loss = ema(np.maximum(-delta, 0), n, alpha=1.0 / n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[1:] = np.where(loss == 0, 100.0, 100.0 - 100.0 / (1.0 + gain / loss))
+    return out
+
+
+# --------------------------------------------------
+def macd(close, fast:int = 12, slow:int = 26, signal:int = 9) -> tuple:
+    """(macd, signal, histogram)"""
+    close = _as_float(close)
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = np.full(close.shape, np.nan)
+    valid = np.flatnonzero(~np.isnan(line))
+    if len(valid):
+        signal_line[valid[0]:] = ema(line[valid[0]:], signal)
+    return line, signal_line, line - signal_line
+
+
+# --------------------------------------------------
+def bollinger(close, n:int = 20, k:float = 2.0) -> tuple:
+    """(middle, upper, lower) with population standard deviation"""
+    middle, var = rolling_mean_var(close, n)
+    std = np.sqrt(var)
+    return middle, middle + k * std, middle - k * std
+
+
+# --------------------------------------------------
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    prev = np.concatenate([[np.nan], close[:-1]])
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    return tr
+
+
+def atr(high, low, close, n:int = 14) -> np.ndarray:
+    """Average true range with Wilder smoothing"""
+    tr = true_range(high, low, close)
+    out = np.full(tr.shape, np.nan)
+    if len(tr) > n:
+        out[1:] = ema(tr[1:], n, alpha=1.0 / n)
+    return out
+
+
+# --------------------------------------------------
+def vwap(high, low, close, volume, sessions = None) -> np.ndarray:
+    """
+    Volume weighted average of the typical price (h + l + c) / 3.
+    :param sessions: labels (e.g. dates) where the VWAP restarts
+    """
+    typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3
+    volume = _as_float(volume)
+    pv = np.cumsum(typical * volume)
+    v = np.cumsum(volume)
+    if sessions is not None:
+        sessions = np.asarray(sessions)
+        starts = np.flatnonzero(np.r_[True, sessions[1:] != sessions[:-1]])
+        lengths = np.diff(np.r_[starts, len(sessions)])
+        offset_pv = np.repeat(np.r_[0.0, pv[starts[1:] - 1]], lengths)
+        offset_v = np.repeat(np.r_[0.0, v[starts[1:] - 1]], lengths)
+        pv, v = pv - offset_pv, v - offset_v
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return pv / v
+
+
+# --------------------------------------------------
+def add_indicators(df:pd.DataFrame, session_freq:str = None) -> pd.DataFrame:
+    """
+    Add every indicator to an OHLCV frame.
+    :param session_freq: restart the VWAP on every period of this
+    frequency of the index (e.g. 'D' for intraday bars)
+    """
+    df = df.copy()
+    close = df['close'].to_numpy(dtype=float)
+    df['sma_20'] = sma(close, 20)
+    df['ema_20'] = ema(close, 20)
+    df['rsi_14'] = rsi(close, 14)
+    df['macd'], df['macd_signal'], df['macd_hist'] = macd(close)
+    df['bb_middle'], df['bb_upper'], df['bb_lower'] = bollinger(close)
+    if {'high', 'low'} <= set(df.columns):
+        df['atr_14'] = atr(df['high'], df['low'], close)
+        if 'volume' in df:
+            sessions = None
+            if session_freq is not None:
+                sessions = pd.DatetimeIndex(df.index).to_period(session_freq).asi8
+            df['vwap'] = vwap(df['high'], df['low'], close, df['volume'], sessions)
+    return df
+
+
+# --------------------------------------------------
+class SMAState():
+    """O(1) simple moving average"""
+
+    def __init__(self, n:int):
+        self.n = n
+        self.window = deque(maxlen=n)
+        self.total = 0.0
+
+    def update(self, x:float) -> float:
+        if len(self.window) == self.n:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        return self.total / self.n if len(self.window) == self.n else np.nan
+
+
+class EMAState():
+    """O(1) exponential moving average, seeded like ema()"""
+
+    def __init__(self, n:int, alpha:float = None):
+        self.n = n
+        self.alpha = 2.0 / (n + 1) if alpha is None else alpha
+        self.seed = SMAState(n)
+        self.value = np.nan
+
+    def update(self, x:float) -> float:
+        if np.isnan(self.value):
+            self.value = self.seed.update(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RSIState():
+    def __init__(self, n:int = 14):
+        self.gain = EMAState(n, alpha=1.0 / n)
+        self.loss = EMAState(n, alpha=1.0 / n)
+        self.prev = None
+
+    def update(self, close:float) -> float:
+        if self.prev is None:
+            self.prev = close
+            return np.nan
+        delta, self.prev = close - self.prev, close
+        gain = self.gain.update(max(delta, 0.0))
+        loss = self.loss.update(max(-delta, 0.0))
+        if np.isnan(gain):
+            return np.nan
+        return 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class MACDState():
+    def __init__(self, fast:int = 12, slow:int = 26, signal:int = 9):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    def update(self, close:float) -> tuple:
+        line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line) if not np.isnan(line) else np.nan
+        return line, signal, line - signal
+
+
+class BollingerState():
+    def __init__(self, n:int = 20, k:float = 2.0):
+        self.n, self.k = n, k
+        self.window = deque(maxlen=n)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, close:float) -> tuple:
+        if len(self.window) == self.n:
+            old = self.window[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.window.append(close)
+        self.total += close
+        self.total_sq += close * close
+        if len(self.window) < self.n:
+            return np.nan, np.nan, np.nan
+        mean = self.total / self.n
+        std = np.sqrt(max(self.total_sq / self.n - mean * mean, 0.0))
+        return mean, mean + self.k * std, mean - self.k * std
+
+
+class ATRState():
+    def __init__(self, n:int = 14):
+        self.average = EMAState(n, alpha=1.0 / n)
+        self.prev = None
+
+    def update(self, high:float, low:float, close:float) -> float:
+        prev, self.prev = self.prev, close
+        if prev is None:
+            return np.nan
+        tr = max(high - low, abs(high - prev), abs(low - prev))
+        return self.average.update(tr)
+
+
+class VWAPState():
+    def __init__(self):
+        self.session = None
+        self.pv = 0.0
+        self.volume = 0.0
+
+    def update(self, high:float, low:float, close:float, volume:float,
+               session = None) -> float:
+        if session != self.session:
+            self.session, self.pv, self.volume = session, 0.0, 0.0
+        self.pv += (high + low + close) / 3 * volume
+        self.volume += volume
+        return self.pv / self.volume if self.volume else np.nan
+
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Benchmark local indicators on a random walk',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        '-n', '--n_bars',
+        metavar = 'n_bars',
+        default = 10_000_000,
+        type=int,
+        help = "Number of bars")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    rng = np.random.default_rng(0)
+    n = args.n_bars
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    spread = np.abs(rng.normal(0, 0.002, n)) * close
+    high, low = close + spread, close - spread
+    volume = rng.integers(1, 1000, n).astype(float)
+
+    timings = {}
+    for name, fct in {
+        'sma_20': lambda: sma(close, 20),
+        'ema_20': lambda: ema(close, 20),
+        'rsi_14': lambda: rsi(close, 14),
+        'macd': lambda: macd(close),
+        'bollinger': lambda: bollinger(close),
+        'atr_14': lambda: atr(high, low, close),
+        'vwap': lambda: vwap(high, low, close, volume),
+    }.items():
+        start = time.perf_counter()
+        fct()
+        timings[name] = time.perf_counter() - start
+
+    state = EMAState(20)
+    m = min(n, 1_000_000)
+    start = time.perf_counter()
+    for x in close[:m].tolist():
+        state.update(x)
+    per_bar = (time.perf_counter() - start) / m
+
+    df = pd.DataFrame({'indicator': list(timings), 'seconds': list(timings.values())})
+    print(f"{n:,} bars")
+    print(PrintTibble(df))
+    print(f"Incremental EMA: {per_bar * 1e9:.0f} ns per bar")
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.utils.indicators -n 10000000
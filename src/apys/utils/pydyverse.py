@@ -60,9 +60,13 @@ class TidyDataFrameFormatter(DataFrameFormatter):
         frame = self.tr_frame
         formatter = self._get_formatter(i)
         dtype = frame.iloc[:, i].dtype.name
+        values = frame.iloc[:, i]._values
+        if dtype == 'float32':
+            # Shortest repr, 152.3 instead of 152.300003
+            values = values.astype(str).astype('float64')
 
         return [f'<{dtype}>'] + format_array(
-            frame.iloc[:, i]._values,
+            values,
             formatter,
             float_format=self.float_format,
             na_rep=self.na_rep,
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Quote board stored in a multiprocessing.shared_memory segment
+    so several processes can write (or read) the same table of quotes.
+    The streaming classes publish into a board and any number of local
+    processes attach by name and read it, without opening more broker
+    connections.
+Source: https://docs.python.org/3/library/multiprocessing.shared_memory.html
+
+Segment layout:
+    header      int64[8]            magic, capacity, n_columns, version,
+                                    directory_version, reserved...
+    columns     S32[n_columns]      column names
+    symbols     S64[capacity]       symbol of each row ('' = free row)
+    seqs        int64[capacity]     per row seqlock counter
+    data        float64[capacity, n_columns]
+
+Every row is guarded by a seqlock: writers make the counter odd,
+write and make it even again. Readers retry a row whose counter was
+odd or changed while it was being copied.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .pydyverse import PrintTibble
+
+_MAGIC = 0x51424f415244  # 'QBOARD'
+_HEADER = 8
+_VERSION = 3
+_DIRECTORY_VERSION = 4
+_COLUMN_WIDTH = 32
+_SYMBOL_WIDTH = 64
+# Segments created (and tracked) by this process
+_CREATED = set()
+
+
+# --------------------------------------------------
+class SharedQuoteBoard():
+    """
+    Fixed capacity table of float64 quotes, one row per symbol.
+    The creator owns the symbol directory (add/remove symbols);
+    any process may attach by name and write or read rows.
+    """
+
+    def __init__(self, shm:shared_memory.SharedMemory, owner:bool):
+        self.shm = shm
+        self.owner = owner
+        header = np.ndarray((_HEADER,), dtype=np.int64, buffer=shm.buf)
+        if header[0] != _MAGIC:
+            raise ValueError(f"{shm.name} is not a quote board")
+        self._header = header
+        self.capacity = int(header[1])
+        n_columns = int(header[2])
+        offset = _HEADER * 8
+        self._columns = np.ndarray(
+            (n_columns,), dtype=f'S{_COLUMN_WIDTH}',
+            buffer=shm.buf, offset=offset)
+        offset += n_columns * _COLUMN_WIDTH
+        self._symbols = np.ndarray(
+            (self.capacity,), dtype=f'S{_SYMBOL_WIDTH}',
+            buffer=shm.buf, offset=offset)
+        offset += self.capacity * _SYMBOL_WIDTH
+        self._seqs = np.ndarray(
+            (self.capacity,), dtype=np.int64,
+            buffer=shm.buf, offset=offset)
+        offset += self.capacity * 8
+        self.values = np.ndarray(
+            (self.capacity, n_columns), dtype=np.float64,
+            buffer=shm.buf, offset=offset)
+        self.columns = [c.decode() for c in self._columns]
+        self._rows = {}
+        self._refresh_rows()
+
+    # --------------------------------------------------
+    @classmethod
+    def create(cls, columns:list, capacity:int, name:str = None):
+        """Create a new board segment"""
+        size = (
+            _HEADER * 8 + len(columns) * _COLUMN_WIDTH
+            + capacity * (_SYMBOL_WIDTH + 8) + capacity * len(columns) * 8
+        )
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _CREATED.add(shm._name)
+        header = np.ndarray((_HEADER,), dtype=np.int64, buffer=shm.buf)
+        header[:] = [_MAGIC, capacity, len(columns)] + [0] * (_HEADER - 3)
+        names = np.ndarray(
+            (len(columns),), dtype=f'S{_COLUMN_WIDTH}',
+            buffer=shm.buf, offset=_HEADER * 8)
+        names[:] = [c.encode() for c in columns]
+        board = cls(shm, owner=True)
+        board._symbols[:] = b''
+        board._seqs[:] = 0
+        board.values[:] = np.nan
+        return board
+
+    # --------------------------------------------------
+    @classmethod
+    def attach(cls, name:str):
+        """Attach to a board created by another process"""
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+            if multiprocessing.parent_process() is None and shm._name not in _CREATED:
+                # An unrelated process has its own resource tracker,
+                # which would unlink the segment when this process exits.
+                # The owner's process keeps it: its close() unregisters it
+                resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, owner=False)
+
+    # --------------------------------------------------
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # --------------------------------------------------
+    @property
+    def version(self) -> int:
+        """Incremented on every write. Readers may poll it for changes"""
+        return int(self._header[_VERSION])
+
+    # --------------------------------------------------
+    def _refresh_rows(self):
+        self._rows = {
+            s.decode(): i for i, s in enumerate(self._symbols) if s
+        }
+
+    # --------------------------------------------------
+    def row_of(self, symbol:str) -> int:
+        """Row of symbol or -1. Readers refresh the directory on a miss"""
+        row = self._rows.get(symbol)
+        if row is None or self._symbols[row].decode() != symbol:
+            self._refresh_rows()
+            row = self._rows.get(symbol, -1)
+        return row
+
+    # --------------------------------------------------
+    def symbol_at(self, row:int) -> str:
+        return self._symbols[row].decode()
+
+    # --------------------------------------------------
+    @property
+    def symbols(self) -> list:
+        return [s.decode() for s in self._symbols if s]
+
+    # --------------------------------------------------
+    def add_symbols(self, symbols:list) -> dict:
+        """Allocate rows for new symbols. Returns {symbol: row}"""
+        self._refresh_rows()
+        free = iter(np.flatnonzero(self._symbols == b''))
+        added = {}
+        for symbol in symbols:
+            if symbol in self._rows:
+                added[symbol] = self._rows[symbol]
+                continue
+            row = next(free, None)
+            if row is None:
+                raise MemoryError(
+                    f"Quote board is full ({self.capacity} symbols)")
+            self.update(row, np.nan)
+            self._symbols[row] = symbol.encode()
+            self._rows[symbol] = int(row)
+            added[symbol] = int(row)
+        self._header[_DIRECTORY_VERSION] += 1
+        return added
+
+    # --------------------------------------------------
+    def remove_symbols(self, symbols:list):
+        for symbol in symbols:
+            row = self.row_of(symbol)
+            if row >= 0:
+                self._symbols[row] = b''
+                self.update(row, np.nan)
+                self._rows.pop(symbol, None)
+        self._header[_DIRECTORY_VERSION] += 1
+
+    # --------------------------------------------------
+    def update(self, row:int, values):
+        """Seqlock write of one row"""
+        self._seqs[row] += 1
+        self.values[row] = values
+        self._seqs[row] += 1
+        self._header[_VERSION] += 1
+
+    # --------------------------------------------------
+    def update_rows(self, rows:np.ndarray, values:np.ndarray):
+        """Seqlock write of several rows (rows must be unique)"""
+        self._seqs[rows] += 1
+        self.values[rows] = values
+        self._seqs[rows] += 1
+        self._header[_VERSION] += 1
+
+    # --------------------------------------------------
+    def read_row(self, row:int, retries:int = 1000) -> np.ndarray:
+        """Consistent copy of one row"""
+        for _ in range(retries):
+            seq = self._seqs[row]
+            if seq & 1:
+                continue
+            values = self.values[row].copy()
+            if self._seqs[row] == seq:
+                return values
+        raise TimeoutError(f"Row {row} kept changing while being read")
+
+    # --------------------------------------------------
+    def read(self, symbol:str) -> pd.Series:
+        row = self.row_of(symbol)
+        if row < 0:
+            raise KeyError(symbol)
+        return pd.Series(self.read_row(row), index=self.columns, name=symbol)
+
+    # --------------------------------------------------
+    def snapshot(self, rows:np.ndarray = None) -> np.ndarray:
+        """
+        Consistent copy of the given rows (all by default). The block is
+        copied at once and only rows caught mid-write are read again.
+        """
+        if rows is None:
+            rows = np.arange(self.capacity)
+        before = self._seqs[rows].copy()
+        values = self.values[rows]
+        after = self._seqs[rows]
+        for i in np.flatnonzero((before & 1) | (before != after)):
+            values[i] = self.read_row(rows[i])
+        return values
+
+    # --------------------------------------------------
+    def to_dataframe(self) -> pd.DataFrame:
+        """Consistent copy of the occupied rows"""
+        occupied = np.flatnonzero(self._symbols != b'')
+        df = pd.DataFrame(
+            self.snapshot(occupied), columns=self.columns,
+            index=pd.Index(
+                [s.decode() for s in self._symbols[occupied]],
+                name='instrument')
+        )
+        return df
+
+    # --------------------------------------------------
+    def close(self):
+        if self.shm is None:
+            return
+        # Views over the buffer must be released before closing it
+        self.values = self._symbols = self._columns = None
+        self._seqs = self._header = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+            _CREATED.discard(self.shm._name)
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Read a quote board published in shared memory',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'name',
+        metavar = 'name',
+        type=str,
+        help = "Shared memory name used by the publisher")
+
+    parser.add_argument(
+        '-s', '--seconds',
+        metavar = 'seconds',
+        default = 1,
+        type=float,
+        help = "Seconds between prints")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    board = SharedQuoteBoard.attach(args.name)
+    version = -1
+    try:
+        while True:
+            if board.version != version:
+                version = board.version
+                print(PrintTibble(board.to_dataframe()))
+            time.sleep(args.seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        board.close()
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.utils.quote_board live_price
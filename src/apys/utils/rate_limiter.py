@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Sliding window rate limiter for APIs with several quotas at
+    once (e.g. AlphaVantage free tier: 5 requests per minute and 25
+    per day). Request times can be persisted to a sqlite file so the
+    daily count survives restarts and is shared by every script: a
+    slot is checked and taken inside one locked transaction, so two
+    processes never take the same one.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import closing
+
+ALPHA_VANTAGE_FREE = [(5, 60), (25, 24 * 3600)]
+
+
+# --------------------------------------------------
+class RateLimiter():
+    """
+    :param limits: list of (requests, seconds) windows to honor
+    :param state_path: sqlite file with the times of the last requests
+    """
+
+    def __init__(self, limits:list = ALPHA_VANTAGE_FREE, state_path:str = None):
+        self.limits = sorted(limits, key=lambda x: x[1])
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._times = deque()
+        if state_path != None:
+            with closing(self._connect()) as con:
+                con.execute('CREATE TABLE IF NOT EXISTS requests (t REAL NOT NULL)')
+
+    # --------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: transactions are opened by hand with BEGIN IMMEDIATE
+        return sqlite3.connect(self.state_path, timeout=60, isolation_level=None)
+
+    def _load(self, con:sqlite3.Connection, now:float):
+        rows = con.execute(
+            'SELECT t FROM requests WHERE t > ? ORDER BY t',
+            (now - self.limits[-1][1],))
+        self._times = deque(t for (t,) in rows)
+
+    def _refresh(self, now:float):
+        """Times recorded by every process, or pruned local ones"""
+        if self.state_path != None:
+            with closing(self._connect()) as con:
+                self._load(con, now)
+        else:
+            self._prune(now)
+
+    def _prune(self, now:float):
+        horizon = now - self.limits[-1][1]
+        while self._times and self._times[0] <= horizon:
+            self._times.popleft()
+
+    def _wait(self, now:float) -> float:
+        wait = 0.0
+        times = self._times
+        for count, seconds in self.limits:
+            if len(times) >= count:
+                # The oldest request inside the window must leave it
+                oldest = times[len(times) - count]
+                wait = max(wait, oldest + seconds - now)
+        return max(wait, 0.0)
+
+    # --------------------------------------------------
+    def delay(self, now:float = None) -> float:
+        """Seconds to wait before the next request is allowed"""
+        if now == None:
+            now = time.time()
+        self._refresh(now)
+        return self._wait(now)
+
+    # --------------------------------------------------
+    def remaining(self, now:float = None) -> list:
+        """Requests left in every window"""
+        if now == None:
+            now = time.time()
+        self._refresh(now)
+        return [
+            (count - sum(1 for t in self._times if t > now - seconds), seconds)
+            for count, seconds in self.limits
+        ]
+
+    # --------------------------------------------------
+    def _take(self) -> float:
+        """Record a request if allowed now, else return the seconds to wait"""
+        now = time.time()
+        if self.state_path == None:
+            self._prune(now)
+            wait = self._wait(now)
+            if wait == 0:
+                self._times.append(now)
+            return wait
+        with closing(self._connect()) as con:
+            # Write lock: other processes wait here until COMMIT
+            con.execute('BEGIN IMMEDIATE')
+            try:
+                self._load(con, now)
+                wait = self._wait(now)
+                if wait == 0:
+                    con.execute(
+                        'DELETE FROM requests WHERE t <= ?',
+                        (now - self.limits[-1][1],))
+                    con.execute('INSERT INTO requests VALUES (?)', (now,))
+                    self._times.append(now)
+                con.execute('COMMIT')
+            except BaseException:
+                con.execute('ROLLBACK')
+                raise
+        return wait
+
+    def acquire(self, max_wait:float = None) -> bool:
+        """
+        Block until a request is allowed and record it. Returns False
+        (recording nothing) when that would take more than max_wait.
+        """
+        with self._lock:
+            deadline = None if max_wait == None else time.time() + max_wait
+            while True:
+                wait = self._take()
+                if wait == 0:
+                    return True
+                if deadline != None and time.time() + wait > deadline:
+                    return False
+                # Sleep without the file lock: another process may take
+                # the slot first, then the loop waits for the next one
+                time.sleep(wait)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Compact dtypes for the DataFrames built from the APIs.
+    Repeated labels (symbol, market, country, ...) become categoricals,
+    free text becomes string[pyarrow] and int64 counts that fit become
+    int32. Prices stay float64 unless the caller asks for float32
+    (exact to about 7 digits only: ARS prices and index levels get
+    rounded). to_storage_dtypes() goes back to plain dtypes before
+    writing to SQL.
+"""
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_COLUMNS = [
+    'symbol', 'market', 'country', 'type', 'currency', 'asset_class',
+    'screen', 'term', 'settlement', 'underlying', 'kind', 'interval',
+    'adm_type', 'horizon', 'profile', 'rescue', 'cficode', 'segment',
+]
+STRING_COLUMNS = ['desc', 'investment', 'report', 'regulation', 'bloomberg']
+# Sums of money, volumes and cumulative counters go past the 2**24
+# integers float32 holds exactly: float64 even with float_dtype='float32'
+FLOAT64_COLUMNS = [
+    'vol', 'volume', 'amount', 'turnover', 'effective_volume',
+    'nominal_volume', 'open_interest', 'timestamp',
+]
+# Object columns with fewer distinct values than this share of rows
+# are made categorical even if their name is not listed
+CATEGORY_RATIO = 0.5
+
+
+# --------------------------------------------------
+def _is_text(s:pd.Series) -> bool:
+    return s.dtype == object and pd.api.types.infer_dtype(s, skipna=True) == 'string'
+
+# --------------------------------------------------
+def apply_schema(df:pd.DataFrame, schema:dict = None,
+                 float_dtype:str = 'float64') -> pd.DataFrame:
+    """
+    Assign compact dtypes in place and return df.
+    :param schema: explicit {column: dtype}, applied before the rules
+    by column name and content
+    :param float_dtype: 'float32' to halve the float columns of frames
+    whose values fit in 7 digits
+    """
+    schema = schema or {}
+    for col in df.columns:
+        s = df[col]
+        if col in schema:
+            df[col] = s.astype(schema[col])
+        elif _is_text(s):
+            if col in STRING_COLUMNS:
+                df[col] = s.astype('string[pyarrow]')
+            elif col in CATEGORY_COLUMNS or s.nunique() < CATEGORY_RATIO * len(s):
+                df[col] = s.astype('category')
+            else:
+                df[col] = s.astype('string[pyarrow]')
+        elif s.dtype == np.float64 and float_dtype != 'float64' and (
+                col not in FLOAT64_COLUMNS):
+            df[col] = s.astype(float_dtype)
+        elif s.dtype == np.int64 and len(s) and (
+                s.min() >= np.iinfo(np.int32).min and s.max() <= np.iinfo(np.int32).max):
+            # Not below int32: smaller ints overflow on plain arithmetic
+            df[col] = s.astype(np.int32)
+    return df
+
+# --------------------------------------------------
+def to_storage_dtypes(df:pd.DataFrame) -> pd.DataFrame:
+    """Copy with plain object/float64 columns for SQL and Excel"""
+    df = df.copy()
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(s):
+            df[col] = s.astype(object).where(s.notna(), None)
+        elif s.dtype == np.float32:
+            df[col] = s.astype(np.float64)
+    return df
+
+# --------------------------------------------------
+def memory_usage(df:pd.DataFrame) -> int:
+    """Bytes used by df, strings included"""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Disk cache for daily, weekly and monthly bars that knows when
+    they are final. Bars up to the last settled session of the market
+    (see calendars.py) never change, so they are stored once, content
+    addressed (objects/<sha256>.parquet), and only the bars after it
+    are requested again. Between the settle and the next open there is
+    no request at all.
+Require package:
+    -   pip install pyarrow
+"""
+
+import datetime as dt
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .calendars import BYMA, NYSE, MarketCalendar, get_calendar
+
+# AlphaVantage compact output covers the last 100 sessions
+_ALPHA_COMPACT_DAYS = 140
+_ALPHA_FREQ = {
+    'stock_daily': 'D', 'stock_daily_adjusted': 'D',
+    'stock_weekly': 'W', 'stock_weekly_adjusted': 'W',
+    'stock_monthly': 'M', 'stock_monthly_adjusted': 'M',
+}
+
+
+# --------------------------------------------------
+def content_hash(df:pd.DataFrame) -> str:
+    """Same rows, columns and dtypes -> same hash"""
+    h = hashlib.sha256()
+    h.update(repr([(col, str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+# --------------------------------------------------
+class SettledCache():
+    """
+    :param calendar: MarketCalendar or its name (NYSE, BYMA)
+    :param root: directory of the cache. Defaults to settled_cache/
+    next to this module.
+    """
+
+    def __init__(self, calendar = 'NYSE', root:str = None):
+        if not isinstance(calendar, MarketCalendar):
+            calendar = get_calendar(calendar)
+        self.calendar = calendar
+        if root == None:
+            dir_path = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+            root = os.path.join(dir_path, 'settled_cache')
+        self.root = root
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.root, 'index.json')
+
+    def object_path(self, digest:str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest + '.parquet')
+
+    def _read_index(self) -> dict:
+        if not os.path.isfile(self.index_path):
+            return {}
+        with open(self.index_path) as json_file:
+            return json.load(json_file)
+
+    def _write_index(self, index:dict):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self.index_path + '.tmp', 'w') as json_file:
+            json.dump(index, json_file, indent=1, sort_keys=True)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def _read_object(self, digest:str) -> pd.DataFrame:
+        return pq.read_table(self.object_path(digest)).to_pandas()
+
+    def _write_object(self, df:pd.DataFrame) -> str:
+        digest = content_hash(df)
+        path = self.object_path(digest)
+        # Immutable: an object with this hash is already these bars
+        if not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=True), path + '.tmp')
+            os.replace(path + '.tmp', path)
+        return digest
+
+    # --------------------------------------------------
+    def settled_mask(self, dates:pd.DatetimeIndex, freq:str, settled:dt.date):
+        """Bars whose whole period (day, week or month) has settled"""
+        if freq == 'D':
+            return dates <= pd.Timestamp(settled)
+        # The period is over once the next session falls in a later one
+        next_period = pd.Period(self.calendar.next_session(settled), freq)
+        return (dates <= pd.Timestamp(settled)) & (dates.to_period(freq) < next_period)
+
+    # --------------------------------------------------
+    def get(self, key:str, fetch, freq:str = 'D', start:dt.date = None,
+            partial:bool = True, now:dt.datetime = None) -> pd.DataFrame:
+        """
+        Bars of key with a DatetimeIndex named date.
+        :param fetch: fetch(since) returns the bars from since (None for
+        all of them) as a DataFrame indexed by date
+        :param freq: D, W or M
+        :param start: first date needed. A cache starting later is
+        downloaded again from start.
+        :param partial: also bring the bar of the session still open
+        """
+        settled = self.calendar.last_settled(now)
+        with self._lock:
+            entry = self._read_index().get(key)
+        if entry != None and start != None and entry.get('start') != None and (
+                start < dt.date.fromisoformat(entry['start'])):
+            entry = None
+        cached = None if entry == None else self._read_object(entry['hash'])
+
+        if entry != None and entry['settled'] >= settled.isoformat() and not (
+                partial and self.calendar.is_open_session(now)):
+            return cached
+
+        since = None
+        if entry != None:
+            since = dt.date.fromisoformat(entry['settled']) + dt.timedelta(days=1)
+            if freq != 'D':
+                # The bar of the period after the last settled one
+                since = pd.Period(since, freq).start_time.date()
+        elif start != None:
+            since = start
+        new = fetch(since)
+        new.index = pd.to_datetime(new.index)
+        new.index.name = 'date'
+        if cached is not None:
+            df = pd.concat([cached[cached.index < pd.Timestamp(since)], new])
+        else:
+            df = new
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+
+        mask = self.settled_mask(df.index, freq, settled)
+        digest = self._write_object(df[mask])
+        with self._lock:
+            index = self._read_index()
+            index[key] = {
+                'hash': digest, 'settled': settled.isoformat(), 'freq': freq,
+                'start': start.isoformat() if start != None else (
+                    entry or {}).get('start'),
+            }
+            self._write_index(index)
+        return df if partial else df[mask]
+
+    # --------------------------------------------------
+    def gc(self) -> int:
+        """Delete objects no key points to. Returns how many"""
+        with self._lock:
+            used = {entry['hash'] for entry in self._read_index().values()}
+            removed = 0
+            objects = os.path.join(self.root, 'objects')
+            for dir_path, _, filenames in os.walk(objects):
+                for filename in filenames:
+                    if filename.endswith('.parquet') and filename[:-8] not in used:
+                        os.remove(os.path.join(dir_path, filename))
+                        removed += 1
+        return removed
+
+# --------------------------------------------------
+def alpha_series(client, symbol:str, function:str = 'stock_daily',
+                 cache:SettledCache = None, partial:bool = True) -> pd.DataFrame:
+    """
+    Alpha.stock_daily/weekly/monthly (and adjusted) through the cache.
+    Compact output is enough once the cache is less than 100 sessions old.
+    """
+    cache = cache or SettledCache(NYSE)
+    def fetch(since):
+        method = getattr(client, function)
+        if _ALPHA_FREQ[function] != 'D':
+            return method(symbol)
+        size = 'full'
+        if since != None and (dt.date.today() - since).days < _ALPHA_COMPACT_DAYS:
+            size = 'compact'
+        return method(symbol, size = size)
+    return cache.get(
+        f'alpha_vantage/{function}/{symbol}', fetch,
+        freq=_ALPHA_FREQ[function], partial=partial)
+
+def finnhub_candles(client, symbol:str, start:dt.date, resolution:str = 'D',
+                    cache:SettledCache = None, partial:bool = True) -> pd.DataFrame:
+    """Finnhub.stock_candles (D, W or M) from start through the cache"""
+    cache = cache or SettledCache(NYSE)
+    def fetch(since):
+        to_date = dt.date.today() + dt.timedelta(days=1)
+        return client.stock_candles(
+            symbol, (since or start).strftime('%Y-%m-%d'),
+            to_date.strftime('%Y-%m-%d'), resolution=resolution)
+    df = cache.get(
+        f'finnhub/{resolution}/{symbol}', fetch, freq=resolution,
+        start=start, partial=partial)
+    return df[df.index >= pd.Timestamp(start)]
+
+def iol_daily(client, symbol:str, start:dt.date, market:str = 'bCBA',
+              cache:SettledCache = None, partial:bool = True) -> pd.DataFrame:
+    """iol.symbol_daily.SymbolDaily from start through the cache"""
+    # Imported here: iol pulls datar, not needed by the other sources
+    from ..iol.symbol_daily import SymbolDaily
+    cache = cache or SettledCache(BYMA)
+    def fetch(since):
+        df = SymbolDaily(
+            iol=client, symbol=symbol, from_date=since or start,
+            to_date=dt.date.today(), market=market).df
+        return df.set_index(pd.to_datetime(df['date'])).drop(columns='date')
+    df = cache.get(
+        f'iol/{market}/{symbol}', fetch, freq='D', start=start, partial=partial)
+    return df[df.index >= pd.Timestamp(start)]
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Daily snapshots of reference catalogs (instruments, segments,
+    asset classes) stored in SQLite as compressed json, one row per
+    catalog and day. Each new snapshot is diffed against the previous
+    one so adds, removes and changes can be reported.
+"""
+
+import datetime as dt
+import json
+import sqlite3
+import zlib
+from contextlib import closing
+
+import pandas as pd
+
+
+# --------------------------------------------------
+def record_key(record:dict, key) -> tuple:
+    """Key of a record. key is a field name, a dotted path or a list of them"""
+    fields = key if isinstance(key, (list, tuple)) else [key]
+    values = []
+    for field in fields:
+        value = record
+        for part in field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        values.append(value)
+    return tuple(values)
+
+
+# --------------------------------------------------
+def diff_records(old:list, new:list, key) -> dict:
+    """
+    Compare two lists of records by key.
+    Returns a dict of DataFrames: added, removed and changed. changed
+    has one row per key and field that differs (old and new values).
+    """
+    old_by_key = {record_key(r, key): r for r in old}
+    new_by_key = {record_key(r, key): r for r in new}
+    added = [new_by_key[k] for k in new_by_key.keys() - old_by_key.keys()]
+    removed = [old_by_key[k] for k in old_by_key.keys() - new_by_key.keys()]
+    changes = []
+    for k in new_by_key.keys() & old_by_key.keys():
+        before, after = old_by_key[k], new_by_key[k]
+        if before == after:
+            continue
+        before = pd.json_normalize(before).iloc[0].to_dict()
+        after = pd.json_normalize(after).iloc[0].to_dict()
+        for field in sorted(before.keys() | after.keys()):
+            if before.get(field) != after.get(field):
+                changes.append({
+                    'key': k if len(k) > 1 else k[0], 'field': field,
+                    'old': before.get(field), 'new': after.get(field),
+                })
+    return {
+        'added': pd.json_normalize(added),
+        'removed': pd.json_normalize(removed),
+        'changed': pd.DataFrame(changes, columns=['key', 'field', 'old', 'new']),
+    }
+
+
+# --------------------------------------------------
+class SnapshotStore():
+    """
+    SQLite file with one table:
+        snapshots(catalog, date YYYYMMDD, payload zlib(json))
+    """
+
+    def __init__(self, sql_path:str):
+        self.sql_path = sql_path
+        with closing(self.connect()) as con, con:
+            con.execute(
+                'CREATE TABLE IF NOT EXISTS snapshots ('
+                'catalog TEXT NOT NULL, date TEXT NOT NULL, payload BLOB NOT NULL, '
+                'PRIMARY KEY (catalog, date))'
+            )
+
+    # --------------------------------------------------
+    def connect(self) -> sqlite3.Connection:
+        """New connection: the caller closes it (use contextlib.closing)"""
+        return sqlite3.connect(self.sql_path)
+
+    # --------------------------------------------------
+    @staticmethod
+    def today() -> str:
+        return dt.date.today().strftime('%Y%m%d')
+
+    # --------------------------------------------------
+    def dates(self, catalog:str) -> list:
+        with closing(self.connect()) as con, con:
+            rows = con.execute(
+                'SELECT date FROM snapshots WHERE catalog = ? ORDER BY date',
+                (catalog,)).fetchall()
+        return [row[0] for row in rows]
+
+    # --------------------------------------------------
+    def load(self, catalog:str, date:str = None):
+        """(date, records) of the snapshot at date or the latest one. (None, None) if missing"""
+        with closing(self.connect()) as con, con:
+            if date is None:
+                row = con.execute(
+                    'SELECT date, payload FROM snapshots WHERE catalog = ? '
+                    'ORDER BY date DESC LIMIT 1', (catalog,)).fetchone()
+            else:
+                row = con.execute(
+                    'SELECT date, payload FROM snapshots WHERE catalog = ? AND date = ?',
+                    (catalog, date)).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(zlib.decompress(row[1]))
+
+    # --------------------------------------------------
+    def save(self, catalog:str, records:list, date:str = None):
+        date = date or self.today()
+        payload = zlib.compress(json.dumps(records, separators=(',', ':')).encode())
+        with closing(self.connect()) as con, con:
+            con.execute(
+                'INSERT OR REPLACE INTO snapshots (catalog, date, payload) VALUES (?, ?, ?)',
+                (catalog, date, payload))
+
+    # --------------------------------------------------
+    def is_fresh(self, catalog:str, max_age_days:int = 0) -> bool:
+        """True if the latest snapshot is at most max_age_days old"""
+        dates = self.dates(catalog)
+        if not dates:
+            return False
+        age = dt.date.today() - dt.datetime.strptime(dates[-1], '%Y%m%d').date()
+        return age.days <= max_age_days
+
+    # --------------------------------------------------
+    def diff(self, catalog:str, key, date:str = None) -> dict:
+        """Changes of the snapshot at date (latest by default) against the previous one"""
+        dates = self.dates(catalog)
+        if date is None and dates:
+            date = dates[-1]
+        if date not in dates:
+            return diff_records([], [], key)
+        previous = [d for d in dates if d < date]
+        _, new = self.load(catalog, date)
+        old = self.load(catalog, previous[-1])[1] if previous else []
+        return diff_records(old, new, key)
+
+    # --------------------------------------------------
+    def get(self, catalog:str, fetch, key = None, refresh:bool = False,
+            max_age_days:int = 0, print_diff:bool = False) -> list:
+        """
+        Records of catalog. fetch() is only called when the latest
+        snapshot is stale (or refresh is True); its result is stored
+        as today's snapshot.
+        """
+        if not refresh and self.is_fresh(catalog, max_age_days):
+            return self.load(catalog)[1]
+        records = fetch()
+        self.save(catalog, records)
+        if print_diff and key is not None:
+            print_snapshot_diff(catalog, self.diff(catalog, key))
+        return records
+
+
+# --------------------------------------------------
+def print_snapshot_diff(catalog:str, diff:dict):
+    print(
+        f"{catalog}: {len(diff['added'])} added, "
+        f"{len(diff['removed'])} removed, "
+        f"{diff['changed']['key'].nunique() if len(diff['changed']) else 0} changed"
+    )
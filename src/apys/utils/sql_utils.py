@@ -6,6 +6,8 @@ Purpose: SQL methods
 import pandas as pd
 from sqlalchemy import MetaData, Table, and_, create_engine, delete, engine
 
+from .schema import to_storage_dtypes
+
 
 class SQLUtils():
     "Some generals methods"
@@ -32,11 +34,11 @@ class SQLUtils():
             if isinstance(self._FILTER_COL, list):
                 where_lst = []
                 for i in self._FILTER_COL:
-                    unique_col = self.df[i].unique()
+                    unique_col = list(self.df[i].unique())
                     where_lst.append(sql_table.c[i].in_(unique_col))
                 where_clause = and_(*where_lst)
             else:
-                unique_col = self.df[self._FILTER_COL].unique()
+                unique_col = list(self.df[self._FILTER_COL].unique())
                 where_clause = sql_table.c[self._FILTER_COL].in_(unique_col)
             
             u = delete(sql_table).where(where_clause)
@@ -71,7 +73,7 @@ class SQLUtils():
             exist_table = self.delete_rows_with_df_col(sql_path)
         
         if exist_table:
-            self.df.to_sql(
+            to_storage_dtypes(self.df).to_sql(
                 name = self._TABLE_NAME,
                 con = self.engine,
                 if_exists = 'append',
@@ -126,7 +128,7 @@ class SQLUtils():
     def test_sql(self, sql_path:str):
         """Create DB for testing purposes"""
         engine = create_engine(f'sqlite:///{sql_path}')
-        self.df.to_sql(
+        to_storage_dtypes(self.df).to_sql(
             name = 'test',
             con = engine,
             if_exists='replace',
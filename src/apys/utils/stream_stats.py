@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Per symbol statistics updated on every websocket tick:
+    time decayed EMA of the price, rolling (exponentially weighted)
+    VWAP, realized volatility and bid-ask spread stats. State lives in
+    one float64 row per symbol and every update is O(1). Rows can be
+    mirrored into a SharedQuoteBoard next to the quotes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .quote_board import SharedQuoteBoard
+
+STATS_COLUMNS = [
+    'ticks', 'last', 'ema', 'vwap', 'realized_vol',
+    'spread', 'spread_mean', 'spread_max', 'updated'
+]
+# Internal state kept after the published columns
+_STATE_COLUMNS = ['pv', 'volume', 'r2', 'elapsed', 'cum_volume']
+# Trading seconds per year, to annualize the realized volatility.
+# BYMA trades six hours a day
+SECONDS_PER_YEAR = 252 * 6 * 3600
+# NYSE and Nasdaq regular session: six and a half hours a day
+US_SECONDS_PER_YEAR = 252 * 6.5 * 3600
+# Crypto never closes
+CRYPTO_SECONDS_PER_YEAR = 365 * 24 * 3600
+
+
+# --------------------------------------------------
+class StreamStats():
+    """
+    :param symbols: initial symbols (more are added on first tick)
+    :param halflife: seconds for the weight of a tick to halve in the
+    EMA, VWAP, realized volatility and mean spread
+    :param seconds_per_year: trading seconds per year of the feed, to
+    annualize the realized volatility (SECONDS_PER_YEAR is BYMA's)
+    :param board: optional SharedQuoteBoard created with STATS_COLUMNS
+    """
+
+    def __init__(self, symbols:list = None, halflife:float = 300,
+                 seconds_per_year:float = SECONDS_PER_YEAR,
+                 board:SharedQuoteBoard = None):
+        self.halflife = halflife
+        self.seconds_per_year = seconds_per_year
+        self.board = board
+        self.rows = {}
+        self.values = np.full((0, len(STATS_COLUMNS) + len(_STATE_COLUMNS)), np.nan)
+        self._col = {c: i for i, c in enumerate(STATS_COLUMNS + _STATE_COLUMNS)}
+        self.add_symbols(symbols or [])
+
+    # --------------------------------------------------
+    def add_symbols(self, symbols:list):
+        new = [s for s in dict.fromkeys(symbols) if s not in self.rows]
+        if not new:
+            return
+        start = len(self.rows)
+        for i, symbol in enumerate(new):
+            self.rows[symbol] = start + i
+        block = np.full((len(new), self.values.shape[1]), np.nan)
+        for col in ['ticks', 'pv', 'volume', 'r2', 'elapsed']:
+            block[:, self._col[col]] = 0
+        self.values = np.concatenate([self.values, block])
+        if self.board is not None:
+            self.board.add_symbols(new)
+
+    # --------------------------------------------------
+    def update(self, symbol:str, timestamp:float, price:float = None,
+               volume:float = None, cum_volume:float = None,
+               bid:float = None, ask:float = None):
+        """
+        One tick. timestamp in epoch seconds. Trade volume is either
+        given (volume) or derived from a cumulative counter such as
+        pyRofex NV (cum_volume).
+        """
+        row = self.rows.get(symbol)
+        if row is None:
+            self.add_symbols([symbol])
+            row = self.rows[symbol]
+        v = self.values[row]
+        c = self._col
+        updated = v[c['updated']]
+        if np.isnan(updated):
+            dt = 0.0
+            v[c['updated']] = timestamp
+        else:
+            dt = max(timestamp - updated, 0.0)
+            v[c['updated']] = updated + dt
+        w = 0.5 ** (dt / self.halflife)
+        v[c['ticks']] += 1
+
+        # Time weighted: previous values held during dt are folded in
+        # and the sums decay, whatever kind of update this is
+        if dt > 0:
+            for col, held in [('ema', 'last'), ('spread_mean', 'spread')]:
+                if not np.isnan(v[c[col]]):
+                    v[c[col]] = w * v[c[col]] + (1 - w) * v[c[held]]
+            for col in ['pv', 'volume', 'r2']:
+                v[c[col]] *= w
+            v[c['elapsed']] = v[c['elapsed']] * w + dt
+
+        if cum_volume is not None:
+            previous = v[c['cum_volume']]
+            if volume is None:
+                # First value or a counter reset carry no volume
+                volume = cum_volume - previous if cum_volume >= previous else 0.0
+            v[c['cum_volume']] = cum_volume
+
+        # Quote only updates repeat the last trade price and carry no
+        # volume, so they don't feed the trade statistics
+        if price is not None and price > 0 and (volume is None or volume > 0):
+            if np.isnan(v[c['last']]):
+                v[c['ema']] = price
+            else:
+                r = np.log(price / v[c['last']])
+                v[c['r2']] += r * r
+            v[c['last']] = price
+            if volume:
+                v[c['pv']] += price * volume
+                v[c['volume']] += volume
+                v[c['vwap']] = v[c['pv']] / v[c['volume']]
+            if v[c['elapsed']] > 0:
+                v[c['realized_vol']] = np.sqrt(
+                    v[c['r2']] / v[c['elapsed']] * self.seconds_per_year)
+        elif price is not None and price > 0 and np.isnan(v[c['last']]):
+            v[c['last']] = v[c['ema']] = price
+
+        if bid and ask and bid > 0 and ask > 0:
+            spread = ask - bid
+            if np.isnan(v[c['spread_mean']]):
+                v[c['spread_mean']] = spread
+            v[c['spread']] = spread
+            v[c['spread_max']] = np.fmax(v[c['spread_max']], spread)
+
+        if self.board is not None:
+            board_row = self.board.row_of(symbol)
+            if board_row >= 0:
+                self.board.update(board_row, v[:len(STATS_COLUMNS)])
+
+    # --------------------------------------------------
+    def get(self, symbol:str) -> pd.Series:
+        return pd.Series(
+            self.values[self.rows[symbol], :len(STATS_COLUMNS)],
+            index=STATS_COLUMNS, name=symbol)
+
+    # --------------------------------------------------
+    def to_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame(
+            self.values[:, :len(STATS_COLUMNS)].copy(),
+            index=pd.Index(list(self.rows), name='symbol'),
+            columns=STATS_COLUMNS)
+        df['updated'] = pd.to_datetime(df['updated'], unit='s')
+        return df
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Author: Fernando Corrales <fscpython@gmail.com>
+Purpose: Offline symbol search instead of one Alpha.stock_search or
+    Finnhub.symbol_lookup request per keystroke. Symbols from
+    Finnhub.stock_symbols, pyRofex InstrumentsList and the IOL
+    symbol_info table are indexed in a prefix trie (tickers and
+    description words) and a trigram index for fuzzy matches.
+    Sources are refreshed incrementally: only added, changed or
+    removed symbols touch the indexes.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from collections import deque
+from itertools import islice
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from .pydyverse import PrintTibble
+
+FIELDS = ['symbol', 'description', 'source', 'market', 'type', 'currency']
+_TERMINAL = ''
+
+
+# --------------------------------------------------
+def normalize(text:str) -> str:
+    """Lower case without accents: 'Pampa Energía' -> 'pampa energia'"""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+def tokens(text:str) -> list:
+    return [t for t in re.split(r'[^0-9a-z]+', normalize(text)) if t]
+
+def trigrams(text:str) -> set:
+    text = ' ' + ' '.join(tokens(text)) + ' '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+# --------------------------------------------------
+class SymbolIndex():
+    """
+    :param path: json file where the records are saved. The indexes
+    are rebuilt on load.
+    """
+
+    def __init__(self, path:str = None):
+        self.path = path
+        self.records = {}
+        self._trie = {}
+        self._grams = {}
+        self._record_grams = {}
+        if path != None and os.path.isfile(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.records)
+
+    # --------------------------------------------------
+    @staticmethod
+    def _key(record:dict) -> str:
+        return f"{record['source']}:{record['symbol']}"
+
+    def _words(self, record:dict) -> set:
+        return {normalize(record['symbol'])} | set(tokens(record['symbol'])) | set(
+            tokens(record.get('description')))
+
+    def _add(self, key:str, record:dict):
+        self.records[key] = record
+        for word in self._words(record):
+            node = self._trie
+            for char in word:
+                node = node.setdefault(char, {})
+            # dicts as ordered sets: no sorting when reading them
+            node.setdefault(_TERMINAL, {})[key] = None
+        grams = trigrams(f"{record['symbol']} {record.get('description') or ''}")
+        self._record_grams[key] = grams
+        for gram in grams:
+            self._grams.setdefault(gram, {})[key] = None
+
+    def _remove(self, key:str):
+        record = self.records.pop(key)
+        for word in self._words(record):
+            path = [self._trie]
+            for char in word:
+                path.append(path[-1].get(char, {}))
+            path[-1].get(_TERMINAL, {}).pop(key, None)
+            # Drop the branches left empty
+            for i in range(len(word), 0, -1):
+                node = path[i]
+                if node.get(_TERMINAL) == {}:
+                    del node[_TERMINAL]
+                if node:
+                    break
+                del path[i - 1][word[i - 1]]
+        for gram in self._record_grams.pop(key, ()):
+            keys = self._grams.get(gram)
+            if keys is not None:
+                keys.pop(key, None)
+                if not keys:
+                    del self._grams[gram]
+
+    # --------------------------------------------------
+    def update(self, records:list, source:str) -> dict:
+        """
+        Replace the symbols of source with records (dicts with FIELDS).
+        Returns how many were added, changed and removed.
+        """
+        new = {}
+        for record in records:
+            record = {k: record.get(k) for k in FIELDS}
+            record['source'] = source
+            if record['symbol']:
+                new[self._key(record)] = record
+        old = {k for k, r in self.records.items() if r['source'] == source}
+        stats = {'added': 0, 'changed': 0, 'removed': 0}
+        for key in old - new.keys():
+            self._remove(key)
+            stats['removed'] += 1
+        for key, record in new.items():
+            if key not in self.records:
+                stats['added'] += 1
+            elif self.records[key] != record:
+                self._remove(key)
+                stats['changed'] += 1
+            else:
+                continue
+            self._add(key, record)
+        return stats
+
+    def add_finnhub(self, client, exchange:str = 'US') -> dict:
+        """client: Finnhub REST client (Finnhub.stock_symbols)"""
+        df = client.stock_symbols(exchange)
+        records = [{
+            'symbol': r.get('symbol'), 'description': r.get('description'),
+            'market': r.get('mic') or exchange, 'type': r.get('type'),
+            'currency': r.get('currency'),
+        } for r in df.to_dict('records')]
+        return self.update(records, f'finnhub_{exchange}')
+
+    def add_instruments(self, instruments:list) -> dict:
+        """Detailed pyRofex instruments (InstrumentsList.getCatalog().instruments)"""
+        records = [{
+            'symbol': (i.get('instrumentId') or {}).get('symbol'),
+            'description': i.get('securityDescription'),
+            'market': (i.get('instrumentId') or {}).get('marketId'),
+            'type': i.get('cficode'), 'currency': i.get('currency'),
+        } for i in instruments]
+        return self.update(records, 'pyrofex')
+
+    def add_iol(self, sql_path:str, table_name:str = 'symbol_info') -> dict:
+        """symbol_info table saved by iol.symbol_info.SymbolInfo.to_sql"""
+        engine = create_engine(f'sqlite:///{sql_path}')
+        df = pd.read_sql_table(table_name, con=engine)
+        engine.dispose()
+        records = [{
+            'symbol': r.get('symbol'), 'description': r.get('desc'),
+            'market': r.get('market'), 'type': r.get('type'),
+            'currency': r.get('currency'),
+        } for r in df.to_dict('records')]
+        return self.update(records, 'iol')
+
+    # --------------------------------------------------
+    def prefix(self, query:str, limit:int = 10) -> list:
+        """Records with a ticker or description word starting with query"""
+        query = normalize(query).strip()
+        node = self._trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return []
+        # Breadth first: exact and shorter words come first
+        found, queue = {}, deque([node])
+        while queue and len(found) < limit:
+            node = queue.popleft()
+            for key in islice(node.get(_TERMINAL, ()), limit):
+                found.setdefault(key, None)
+            queue.extend(child for char, child in node.items() if char != _TERMINAL)
+        return [self.records[key] for key in list(found)[:limit]]
+
+    def fuzzy(self, query:str, limit:int = 10, min_score:float = 0.4) -> list:
+        """
+        Records holding the most trigrams of query. The score is the
+        share of query trigrams found (a long description doesn't dilute
+        it); ties go to the closest record (Jaccard).
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        # A record reaching min_score shares at least `needed` trigrams,
+        # so it is in one of any len(grams) - needed + 1 postings: the
+        # rarest ones (common ones like 'ene' hit half the index)
+        needed = math.ceil(min_score * len(grams))
+        postings = sorted(
+            (self._grams.get(gram, {}) for gram in grams), key=len)
+        candidates = set()
+        for keys in postings[:len(grams) - needed + 1]:
+            candidates.update(keys)
+        scored = []
+        for key in candidates:
+            record_grams = self._record_grams[key]
+            common = len(grams & record_grams)
+            if common >= needed:
+                jaccard = common / (len(grams) + len(record_grams) - common)
+                scored.append((common / len(grams), jaccard, key))
+        scored.sort(key=lambda s: (-s[0], -s[1], s[2]))
+        return [{**self.records[key], 'score': round(score, 3)}
+                for score, _, key in scored[:limit]]
+
+    def search(self, query:str, limit:int = 10) -> list:
+        """Prefix matches, filled with fuzzy ones when fewer than limit"""
+        found = self.prefix(query, limit)
+        if len(found) < limit:
+            keys = {self._key(r) for r in found}
+            found += [
+                r for r in self.fuzzy(query, limit)
+                if self._key(r) not in keys][:limit - len(found)]
+        return found
+
+    def to_dataframe(self, query:str = None, limit:int = 10) -> pd.DataFrame:
+        records = self.search(query, limit) if query else list(self.records.values())
+        return pd.DataFrame(records, columns=FIELDS + (['score'] if query else []))
+
+    # --------------------------------------------------
+    def save(self, path:str = None):
+        path = path or self.path
+        with open(path + '.tmp', 'w') as json_file:
+            json.dump(list(self.records.values()), json_file)
+        os.replace(path + '.tmp', path)
+
+    def load(self, path:str = None):
+        path = path or self.path
+        with open(path) as json_file:
+            records = json.load(json_file)
+        self.records, self._trie, self._grams, self._record_grams = {}, {}, {}, {}
+        for record in records:
+            self._add(self._key(record), record)
+
+# --------------------------------------------------
+def get_args():
+    """Get needed params from user input"""
+    parser = argparse.ArgumentParser(
+        description = 'Search symbols in the local index',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument(
+        'query',
+        metavar = 'Query',
+        type=str,
+        help = "Ticker or description to look up")
+
+    parser.add_argument(
+        '-i', '--index',
+        metavar = 'index',
+        default = 'symbol_index.json',
+        type=str,
+        help = "Json file of the index")
+
+    parser.add_argument(
+        '--iol',
+        metavar = 'sql_path',
+        default = None,
+        type=str,
+        help = "IOL sqlite with the symbol_info table to refresh from")
+
+    return parser.parse_args()
+
+# --------------------------------------------------
+def main():
+    """Let's try it"""
+    args = get_args()
+    index = SymbolIndex(args.index)
+    if args.iol != None:
+        print(index.add_iol(args.iol))
+        index.save()
+    start = time.perf_counter()
+    index.search(args.query)
+    print(f'{(time.perf_counter() - start) * 1e6:.0f} µs over {len(index)} symbols')
+    print(PrintTibble(index.to_dataframe(args.query)))
+
+# --------------------------------------------------
+if __name__ == '__main__':
+    main()
+    # From apys.src
+    # python -m apys.utils.symbol_index galicia --iol apys/iol/iol.sqlite
+    # python -m apys.utils.symbol_index GGA